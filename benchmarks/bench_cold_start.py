@@ -0,0 +1,89 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold start of one worker per service, before and after moving schema
+work out of import:
+
+  before   import app.main, then every schema step the old import ran
+           (create_all + upgrade_schema / search index, i.e. the steps in
+           app/migrations.py, each reflecting the catalog first)
+  after    import app.main only; `python -m app.migrations` ran once beforehand
+
+Each sample is a fresh interpreter against an already migrated SQLite
+database, timed from process launch until the app object exists
+("start"), with the schema part of it on its own ("schema"). SQL
+statements issued during startup are counted too: on Postgres each of
+those is a catalog round trip, multiplied by every worker that starts.
+
+Run from the repo root:  python benchmarks/bench_cold_start.py [--runs 7]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = ["users_service", "bookings_service", "reviews_service", "notification_service"]
+
+WORKER = """
+import sys
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+import app.main
+t0 = time.perf_counter()
+if sys.argv[1] == "before":
+    from app.database import engine
+    from app import migrations
+    for _, _, step in migrations.MIGRATIONS:
+        step(engine)
+print(len(statements), (time.perf_counter() - t0) * 1000)
+"""
+
+
+def cold_start(service, db_url, mode):
+    env = dict(os.environ, DATABASE_URL=db_url, RABBITMQ_PUBLISHER="off", PYTHONWARNINGS="ignore")
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", WORKER, mode], cwd=os.path.join(ROOT, service), env=env,
+        capture_output=True, text=True, check=True,
+    )
+    count, schema_ms = out.stdout.split()[-2:]
+    return (time.perf_counter() - t0) * 1000, int(count), float(schema_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    print(f"{'':<22} {'before':^30} {'after':^30}")
+    print(f"{'service':<22}" + f"{'start':>10} {'schema':>10} {'SQL':>7}  " * 2)
+    for service in SERVICES:
+        db_url = f"sqlite:///{db_dir}/{service}.db"
+        subprocess.run(
+            [sys.executable, "-m", "app.migrations"], cwd=os.path.join(ROOT, service),
+            env=dict(os.environ, DATABASE_URL=db_url, PYTHONWARNINGS="ignore"), capture_output=True, check=True,
+        )
+        # This box is noisy: interleave before/after and report medians
+        samples = {"before": [], "after": []}
+        for _ in range(args.runs):
+            for mode in samples:
+                samples[mode].append(cold_start(service, db_url, mode))
+        row = f"{service:<22}"
+        for runs in samples.values():
+            start = statistics.median(r[0] for r in runs)
+            schema = statistics.median(r[2] for r in runs)
+            row += f"{start:7.0f} ms {schema:7.1f} ms {runs[0][1]:7d}  "
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_startup.py
+"""
+Worker cold start per service:
+
+1. import report: `python -X importtime -c "import app.main"`, summed
+   per top-level package (self time, so nothing is counted twice) and
+   the slowest ones listed
+2. time to first request: launch `uvicorn app.main:app` and poll
+   GET /health until it answers, median of --runs launches
+
+Every service runs against its own migrated SQLite database, with the
+broker pointed at a closed local port so background consumers fail fast
+instead of waiting on DNS, as a worker would see it during an outage.
+
+Run from the repo root:  python benchmarks/bench_startup.py [--runs 5] [--root DIR]
+(--root: measure another checkout of the repo, e.g. a `git worktree` of
+the previous commit, for a before / after comparison)
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = ["users_service", "bookings_service", "reviews_service", "notification_service"]
+
+
+def service_env(db_url):
+    return dict(
+        os.environ,
+        DATABASE_URL=db_url,
+        RABBITMQ_HOST="127.0.0.1",
+        RABBITMQ_PUBLISHER="off",
+        NOTIFICATION_EMBEDDED_CONSUMER="0",  # as in docker-compose: consumers run in app.worker
+        PYTHONWARNINGS="ignore",
+    )
+
+
+def import_report(cwd, env, top=8):
+    """(total ms, [(package, self ms)]) for importing app.main."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    )
+    per_package = Counter()
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        per_package[name.strip().split(".")[0]] += int(self_us)
+    total = sum(per_package.values()) / 1000
+    return total, [(name, us / 1000) for name, us in per_package.most_common(top)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(cwd, env, timeout=60.0):
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - t0) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"{cwd} did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--root", default=ROOT, help="checkout to measure")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    summary = []
+    for service in SERVICES:
+        cwd = os.path.join(args.root, service)
+        env = service_env(f"sqlite:///{db_dir}/{service}.db")
+        if os.path.exists(os.path.join(cwd, "app", "migrate.py")):
+            subprocess.run([sys.executable, "-m", "app.migrations"], cwd=cwd, env=env, capture_output=True, check=True)
+
+        reports = [import_report(cwd, env, args.top) for _ in range(args.runs)]
+        total, packages = min(reports, key=lambda r: r[0])
+        first = statistics.median(time_to_first_request(cwd, env) for _ in range(args.runs))
+        summary.append((service, total, first))
+
+        print(f"== {service}: import app.main {total:.0f} ms (fastest of {args.runs}), slowest packages:")
+        for name, ms in packages:
+            print(f"     {name:<24} {ms:7.1f} ms")
+
+    print(f"\n{'service':<22} {'import app.main':>16} {'first request':>15}")
+    for service, total, first in summary:
+        print(f"{service:<22} {total:13.0f} ms {first:12.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
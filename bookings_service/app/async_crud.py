@@ -0,0 +1,145 @@
+# bookings_service/app/async_crud.py
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, outbox, schemas
+from .crud import (
+    atomic_insert_statement, atomic_update_statement, booking_tag, created_event, updated_event, deleted_event,
+)
+from .availability_index import availability_index
+from smartmeeting_common.response_cache import response_cache
+
+
+async def create_booking(db: AsyncSession, user_username: str, booking: schemas.BookingCreate):
+    new_booking = models.Booking(
+        user_username=user_username,
+        room_id=booking.room_id,
+        start_time=booking.start_time,
+        end_time=booking.end_time
+    )
+    db.add(new_booking)
+    try:
+        await db.flush()  # assigns the id the event needs
+        outbox.enqueue(db, created_event(new_booking))
+        await db.commit()
+    except IntegrityError:
+        # Exclusion constraint: a concurrent request booked the room after our check
+        await db.rollback()
+        return None
+    outbox.notify()
+    await db.refresh(new_booking)
+    availability_index.add(
+        new_booking.id, new_booking.room_id, new_booking.start_time, new_booking.end_time
+    )
+    return new_booking
+
+
+async def get_booking(db: AsyncSession, booking_id: int):
+    return await db.get(models.Booking, booking_id)
+
+
+async def update_booking(db: AsyncSession, booking: models.Booking, data: schemas.BookingUpdate):
+    old_start = booking.start_time
+    data_dict = data.dict(exclude_unset=True)
+    for field, value in data_dict.items():
+        setattr(booking, field, value)
+
+    outbox.enqueue(db, updated_event(booking))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+    outbox.notify()
+    await db.refresh(booking)
+    availability_index.move(
+        booking.id, booking.room_id, old_start, booking.start_time, booking.end_time
+    )
+    response_cache.invalidate(booking_tag(booking.id))
+    return booking
+
+
+async def delete_booking(db: AsyncSession, booking: models.Booking):
+    outbox.enqueue(db, deleted_event(booking))
+    await db.delete(booking)
+    await db.commit()
+    outbox.notify()
+    availability_index.remove(booking.id, booking.room_id, booking.start_time)
+    response_cache.invalidate(booking_tag(booking.id))
+    return True
+
+
+async def check_room_availability(db: AsyncSession, room_id: int, start_time, end_time, exclude_booking_id: int = None):
+    """Check if a room is already booked for the given time range"""
+    query = select(models.Booking.id).where(
+        models.Booking.room_id == room_id,
+        models.Booking.start_time < end_time,
+        models.Booking.end_time > start_time,
+    )
+    if exclude_booking_id is not None:
+        query = query.where(models.Booking.id != exclude_booking_id)
+
+    result = await db.execute(query.limit(1))
+    return result.first() is None
+
+
+async def create_booking_atomic(db: AsyncSession, user_username: str, booking: schemas.BookingCreate):
+    """Insert and return the booking in one round trip, or None on conflict."""
+    try:
+        result = await db.execute(atomic_insert_statement(user_username, booking))
+        row = result.first()
+        if row is not None:
+            outbox.enqueue(db, created_event(row))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+
+    if row is not None:
+        outbox.notify()
+        availability_index.add(row.id, row.room_id, row.start_time, row.end_time)
+    return row
+
+
+async def update_booking_atomic(db: AsyncSession, booking: models.Booking, start_time, end_time):
+    """Move a booking in one statement, or return None on conflict."""
+    old_start = booking.start_time
+    try:
+        result = await db.execute(
+            atomic_update_statement(booking.id, booking.room_id, start_time, end_time)
+        )
+        row = result.first()
+        if row is not None:
+            outbox.enqueue(db, updated_event(row))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+
+    if row is not None:
+        outbox.notify()
+        availability_index.move(row.id, row.room_id, old_start, row.start_time, row.end_time)
+        response_cache.invalidate(booking_tag(row.id))
+    return row
+
+
+# Trusts the availability index the same way as crud.create_booking_checked
+async def create_booking_checked(db: AsyncSession, user_username: str, booking: schemas.BookingCreate):
+    """BOOKING_MODE=check: availability check, then insert. None if the room is taken."""
+    available = availability_index.is_available(booking.room_id, booking.start_time, booking.end_time)
+    if available is None:
+        if not await check_room_availability(db, booking.room_id, booking.start_time, booking.end_time):
+            return None
+        return await create_booking(db, user_username, booking)
+    return await create_booking_atomic(db, user_username, booking) if available else None
+
+
+async def update_booking_checked(db: AsyncSession, booking: models.Booking, data: schemas.BookingUpdate, start_time, end_time):
+    """BOOKING_MODE=check: move a booking after an availability check. None on conflict."""
+    available = availability_index.is_available(booking.room_id, start_time, end_time, booking.id)
+    if available is None:
+        if not await check_room_availability(db, booking.room_id, start_time, end_time, exclude_booking_id=booking.id):
+            return None
+        return await update_booking(db, booking, data)
+    return await update_booking_atomic(db, booking, start_time, end_time) if available else None
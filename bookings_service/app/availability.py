@@ -0,0 +1,77 @@
+# bookings_service/app/availability.py
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+
+
+def naive_utc(value: datetime) -> datetime:
+    # Booking columns are timestamp without time zone
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def merge_intervals(intervals, window_start, window_end):
+    """Clip (start, end) pairs sorted by start to the window and merge overlaps."""
+    merged = []
+    for start, end in intervals:
+        start = max(start, window_start)
+        end = min(end, window_end)
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def free_gaps(busy, window_start, window_end, min_free=None):
+    """Complement of merged busy intervals within the window."""
+    free, cursor = [], window_start
+    for start, end in busy:
+        if start > cursor:
+            free.append([cursor, start])
+        cursor = end
+    if cursor < window_end:
+        free.append([cursor, window_end])
+    if min_free is not None:
+        free = [gap for gap in free if gap[1] - gap[0] >= min_free]
+    return free
+
+
+def _room_entry(room_id, intervals, window_start, window_end, min_free):
+    busy = merge_intervals(intervals, window_start, window_end)
+    free = free_gaps(busy, window_start, window_end, min_free)
+    return {
+        "room_id": room_id,
+        "busy": [[s.isoformat(), e.isoformat()] for s, e in busy],
+        "free": [[s.isoformat(), e.isoformat()] for s, e in free],
+    }
+
+
+def free_busy(rows, room_ids, window_start, window_end, min_free=None):
+    """
+    Yield one {room_id, busy, free} dict per requested room.
+
+    `rows` are (room_id, start_time, end_time) tuples ordered by room_id and
+    start_time, i.e. the output of one range scan over all requested rooms.
+    Each room is handled in a single linear pass; rooms without rows are
+    entirely free.
+    """
+    pending = iter(sorted(set(room_ids)))
+    next_room = next(pending, None)
+
+    for room_id, group in groupby(rows, key=itemgetter(0)):
+        while next_room is not None and next_room < room_id:
+            yield _room_entry(next_room, (), window_start, window_end, min_free)
+            next_room = next(pending, None)
+        if next_room == room_id:
+            next_room = next(pending, None)
+        intervals = ((start, end) for _, start, end in group)
+        yield _room_entry(room_id, intervals, window_start, window_end, min_free)
+
+    while next_room is not None:
+        yield _room_entry(next_room, (), window_start, window_end, min_free)
+        next_room = next(pending, None)
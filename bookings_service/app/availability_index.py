@@ -0,0 +1,231 @@
+# bookings_service/app/availability_index.py
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+# Only for deployments where this process is the sole writer of bookings
+# (one uvicorn worker, one replica): it then sees every write and crud
+# trusts its answers. Ignored when WEB_CONCURRENCY asks for more workers.
+AVAILABILITY_INDEX = os.getenv("AVAILABILITY_INDEX", "0") == "1"
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Periodic full rebuild, only needed if something else edits the table
+# (admin scripts, restores); 0 = never
+AVAILABILITY_INDEX_REFRESH = float(os.getenv("AVAILABILITY_INDEX_REFRESH", "0"))
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _ts(value: datetime) -> float:
+    # Columns are naive; aware inputs are compared in UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH).total_seconds()
+
+
+class RoomSchedule:
+    """Bookings of one room as parallel arrays sorted by start time."""
+
+    __slots__ = ("starts", "ends", "ids")
+
+    def __init__(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.ids = array("q")
+
+    def insert(self, booking_id: int, start: float, end: float):
+        i = bisect_left(self.starts, start)
+        j = i
+        while j < len(self.ids) and self.starts[j] == start:
+            if self.ids[j] == booking_id:
+                return  # already present (replayed write)
+            j += 1
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, booking_id)
+
+    def remove(self, booking_id: int, start: float) -> bool:
+        i = bisect_left(self.starts, start)
+        while i < len(self.ids) and self.starts[i] == start:
+            if self.ids[i] == booking_id:
+                del self.starts[i], self.ends[i], self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def is_free(self, start: float, end: float, exclude_id: int = None) -> bool:
+        # Bookings never overlap each other, so ends are sorted as well and
+        # only the latest booking starting before `end` can reach past `start`.
+        i = bisect_left(self.starts, end) - 1
+        if i >= 0 and self.ids[i] == exclude_id:
+            i -= 1
+        return i < 0 or self.ends[i] <= start
+
+    def overlaps_neighbours(self, booking_id: int, start: float) -> bool:
+        i = bisect_left(self.starts, start)
+        while self.ids[i] != booking_id:
+            i += 1
+        before = i > 0 and self.ends[i - 1] > self.starts[i]
+        after = i + 1 < len(self.ids) and self.ends[i] > self.starts[i + 1]
+        return before or after
+
+
+class AvailabilityIndex:
+    """
+    Per-room, in-memory view of the bookings table for O(log n) conflict checks.
+
+    Rooms whose stored bookings overlap (legacy data) are marked dirty and
+    answered by the database instead. The index is per process, so it is
+    only enabled where this process makes every booking write (see
+    AVAILABILITY_INDEX); crud.create_booking_checked then rejects on "busy"
+    without a query.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._journal = None
+        self.ready = False
+
+    @property
+    def size(self) -> int:
+        return sum(len(schedule.ids) for schedule in self._rooms.values())
+
+    def warm(self, db: Session, batch_size: int = 50_000):
+        """Rebuild from the bookings table and swap it in atomically."""
+        with self._lock:
+            # Writes made while the table is scanned are replayed after the swap
+            self._journal = []
+
+        rooms, dirty = {}, set()
+        rows = (
+            db.query(
+                models.Booking.id,
+                models.Booking.room_id,
+                models.Booking.start_time,
+                models.Booking.end_time,
+            )
+            .order_by(models.Booking.room_id, models.Booking.start_time)
+            .yield_per(batch_size)
+        )
+        try:
+            for booking_id, room_id, start, end in rows:
+                schedule = rooms.get(room_id)
+                if schedule is None:
+                    schedule = rooms[room_id] = RoomSchedule()
+                start, end = _ts(start), _ts(end)
+                if schedule.ends and schedule.ends[-1] > start:
+                    dirty.add(room_id)
+                # Rows arrive sorted, so appending keeps the arrays ordered
+                schedule.starts.append(start)
+                schedule.ends.append(end)
+                schedule.ids.append(booking_id)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._rooms, self._dirty = rooms, dirty
+            for op, args in journal:
+                op(*args)
+            self.ready = True
+
+    def is_available(self, room_id: int, start_time, end_time, exclude_booking_id: int = None):
+        """True/False, or None when the index cannot answer for this room."""
+        if not self.ready:
+            return None
+        with self._lock:
+            if room_id in self._dirty:
+                return None
+            schedule = self._rooms.get(room_id)
+            if schedule is None:
+                return True
+            return schedule.is_free(_ts(start_time), _ts(end_time), exclude_booking_id)
+
+    def add(self, booking_id: int, room_id: int, start_time, end_time):
+        args = (booking_id, room_id, _ts(start_time), _ts(end_time))
+        self._apply(self._add_locked, args)
+
+    def remove(self, booking_id: int, room_id: int, start_time):
+        self._apply(self._remove_locked, (booking_id, room_id, _ts(start_time)))
+
+    def _apply(self, op, args):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((op, args))
+            if self.ready:
+                op(*args)
+
+    def _add_locked(self, booking_id, room_id, start, end):
+        schedule = self._rooms.get(room_id)
+        if schedule is None:
+            schedule = self._rooms[room_id] = RoomSchedule()
+        schedule.insert(booking_id, start, end)
+        if schedule.overlaps_neighbours(booking_id, start):
+            self._dirty.add(room_id)
+
+    def _remove_locked(self, booking_id, room_id, start):
+        schedule = self._rooms.get(room_id)
+        if schedule is not None:
+            schedule.remove(booking_id, start)
+
+    def move(self, booking_id: int, room_id: int, old_start, start_time, end_time):
+        self.remove(booking_id, room_id, old_start)
+        self.add(booking_id, room_id, start_time, end_time)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": AVAILABILITY_INDEX,
+                "ready": self.ready,
+                "rooms": len(self._rooms),
+                "bookings": self.size,
+                "dirty_rooms": len(self._dirty),
+            }
+
+
+availability_index = AvailabilityIndex()
+
+
+def _refresh_loop(session_factory, interval: float):
+    while True:
+        time.sleep(interval)
+        db = session_factory()
+        try:
+            availability_index.warm(db)
+        except Exception as e:
+            print("❌ Availability index refresh failed:", e, flush=True)
+        finally:
+            db.close()
+
+
+def start_availability_index(session_factory):
+    """Warm the index at startup (and refresh it, if configured)."""
+    if not AVAILABILITY_INDEX:
+        return
+    if WEB_CONCURRENCY > 1:
+        # Other workers' writes would never reach this index
+        print(f"❌ AVAILABILITY_INDEX ignored: {WEB_CONCURRENCY} workers write bookings", flush=True)
+        return
+    db = session_factory()
+    try:
+        availability_index.warm(db)
+    finally:
+        db.close()
+
+    if AVAILABILITY_INDEX_REFRESH > 0:
+        threading.Thread(
+            target=_refresh_loop,
+            args=(session_factory, AVAILABILITY_INDEX_REFRESH),
+            daemon=True,
+        ).start()
@@ -1,11 +1,40 @@
 # bookings_service/app/crud.py
+import os
+
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select, insert, update, exists, literal, DateTime, Integer, String
+from sqlalchemy.exc import IntegrityError
+
+from . import events, models, outbox, schemas, series
+from .availability_index import availability_index
+from smartmeeting_common.pagination import keyset
+from smartmeeting_common.response_cache import response_cache
+
+# "check" = availability query then insert, "atomic" = one conditional
+# INSERT ... RETURNING guarded by the database
+BOOKING_MODE = os.getenv("BOOKING_MODE", "check")
+
 
-from . import models, schemas
+def created_event(booking):
+    return events.booking_event(
+        "booking_created", booking.user_username, booking.room_id, booking.id,
+        start=booking.start_time, end=booking.end_time,
+    )
+
+
+def updated_event(booking):
+    return events.booking_event(
+        "booking_updated", booking.user_username, booking.room_id, booking.id,
+        start=booking.start_time, end=booking.end_time,
+    )
+
+
+def deleted_event(booking):
+    return events.booking_event("booking_deleted", booking.user_username, booking.room_id, booking.id)
 
 
 def create_booking(db: Session, user_username: str, booking: schemas.BookingCreate):
+    """Insert the booking, or return None if the database rejects it as overlapping."""
     new_booking = models.Booking(
         user_username=user_username,
         room_id=booking.room_id,
@@ -13,34 +42,71 @@ def create_booking(db: Session, user_username: str, booking: schemas.BookingCrea
         end_time=booking.end_time
     )
     db.add(new_booking)
-    db.commit()
+    try:
+        db.flush()  # assigns the id the event needs
+        outbox.enqueue(db, created_event(new_booking))
+        db.commit()
+    except IntegrityError:
+        # Exclusion constraint: a concurrent request booked the room after our check
+        db.rollback()
+        return None
+    outbox.notify()
     db.refresh(new_booking)
+    availability_index.add(
+        new_booking.id, new_booking.room_id, new_booking.start_time, new_booking.end_time
+    )
     return new_booking
 
 
+def booking_tag(booking_id: int) -> str:
+    """Response cache tag of GET /bookings/{booking_id}."""
+    return f"booking:{booking_id}"
+
+
 def get_booking(db: Session, booking_id: int):
     return db.query(models.Booking).filter(models.Booking.id == booking_id).first()
 
 
-def get_user_bookings(db: Session, username: str):
-    return db.query(models.Booking).filter(models.Booking.user_username == username).all()
+def user_bookings_query(db: Session, username: str, limit: int = None, after_id: int = None):
+    query = db.query(models.Booking).filter(models.Booking.user_username == username)
+    return keyset(query, models.Booking.id, limit, after_id)
 
 
-def get_all_bookings(db: Session):
-    return db.query(models.Booking).all()
+def get_user_bookings(db: Session, username: str, limit: int = None, after_id: int = None):
+    return user_bookings_query(db, username, limit, after_id).all()
+
+
+def all_bookings_query(db: Session, limit: int = None, after_id: int = None):
+    return keyset(db.query(models.Booking), models.Booking.id, limit, after_id)
+
+
+def get_all_bookings(db: Session, limit: int = None, after_id: int = None):
+    return all_bookings_query(db, limit, after_id).all()
 
 
 def update_booking(db: Session, booking_id: int, data: schemas.BookingUpdate):
+    """The updated booking, or None if it does not exist or now overlaps another one."""
     booking = get_booking(db, booking_id)
     if not booking:
         return None
 
+    old_start = booking.start_time
     data_dict = data.dict(exclude_unset=True)
     for field, value in data_dict.items():
         setattr(booking, field, value)
 
-    db.commit()
+    outbox.enqueue(db, updated_event(booking))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    outbox.notify()
     db.refresh(booking)
+    availability_index.move(
+        booking.id, booking.room_id, old_start, booking.start_time, booking.end_time
+    )
+    response_cache.invalidate(booking_tag(booking.id))
     return booking
 
 
@@ -49,19 +115,219 @@ def delete_booking(db: Session, booking_id: int):
     if not booking:
         return False
 
+    key = (booking.id, booking.room_id, booking.start_time)
+    outbox.enqueue(db, deleted_event(booking))
     db.delete(booking)
     db.commit()
+    outbox.notify()
+    availability_index.remove(*key)
+    response_cache.invalidate(booking_tag(booking_id))
     return True
 
 
-def check_room_availability(db: Session, room_id: int, start_time, end_time):
+def check_room_availability(db: Session, room_id: int, start_time, end_time, exclude_booking_id: int = None):
     """Check if a room is already booked for the given time range"""
-    conflict = db.query(models.Booking).filter(
+    query = db.query(models.Booking).filter(
         models.Booking.room_id == room_id,
         and_(
             models.Booking.start_time < end_time,
             models.Booking.end_time > start_time
         )
-    ).first()
+    )
+    if exclude_booking_id is not None:
+        # Updates must not conflict with the booking being moved
+        query = query.filter(models.Booking.id != exclude_booking_id)
+
+    return query.first() is None
+
+
+# With AVAILABILITY_INDEX=1 this process makes every booking write, so the
+# index is exact: "busy" is rejected without touching the database, and
+# "free" skips the availability query and goes straight to the conditional
+# INSERT/UPDATE (which still stops a concurrent request in this process).
+# None (index off or not warmed, room with legacy overlaps) asks the database.
+def create_booking_checked(db: Session, user_username: str, booking: schemas.BookingCreate):
+    """BOOKING_MODE=check: availability check, then insert. None if the room is taken."""
+    available = availability_index.is_available(booking.room_id, booking.start_time, booking.end_time)
+    if available is None:
+        if not check_room_availability(db, booking.room_id, booking.start_time, booking.end_time):
+            return None
+        return create_booking(db, user_username, booking)
+    return create_booking_atomic(db, user_username, booking) if available else None
+
+
+def update_booking_checked(db: Session, booking: models.Booking, data: schemas.BookingUpdate, start_time, end_time):
+    """BOOKING_MODE=check: move a booking after an availability check. None on conflict."""
+    available = availability_index.is_available(booking.room_id, start_time, end_time, booking.id)
+    if available is None:
+        if not check_room_availability(db, booking.room_id, start_time, end_time, exclude_booking_id=booking.id):
+            return None
+        return update_booking(db, booking.id, data)
+    return update_booking_atomic(db, booking, start_time, end_time) if available else None
+
+
+def iter_bookings_in_window(db: Session, room_ids, start_time, end_time, batch_size: int = 5000):
+    """(room_id, start, end) of every booking overlapping the window, in one range scan."""
+    return (
+        db.query(models.Booking.room_id, models.Booking.start_time, models.Booking.end_time)
+        .filter(
+            models.Booking.room_id.in_(room_ids),
+            models.Booking.start_time < end_time,
+            models.Booking.end_time > start_time,
+        )
+        .order_by(models.Booking.room_id, models.Booking.start_time)
+        .yield_per(batch_size)
+    )
+
+# ------------------------------------------------
+# ATOMIC BOOKING (BOOKING_MODE=atomic)
+# ------------------------------------------------
+bookings = models.Booking.__table__
+
+
+def _overlap(room_id, start_time, end_time, exclude_booking_id=None):
+    condition = and_(
+        bookings.c.room_id == room_id,
+        bookings.c.start_time < end_time,
+        bookings.c.end_time > start_time,
+    )
+    if exclude_booking_id is not None:
+        condition = and_(condition, bookings.c.id != exclude_booking_id)
+    return exists().where(condition)
+
+
+def atomic_insert_statement(user_username: str, booking: schemas.BookingCreate):
+    """
+    INSERT ... SELECT ... WHERE NOT EXISTS (overlap) RETURNING *.
+
+    SQLite takes its write lock before the statement reads anything, so the
+    check and the insert cannot interleave with another writer. On Postgres
+    the bookings_no_overlap exclusion constraint rejects the races that
+    READ COMMITTED lets through.
+    """
+    values = select(
+        literal(user_username, String),
+        literal(booking.room_id, Integer),
+        literal(booking.start_time, DateTime),
+        literal(booking.end_time, DateTime),
+    ).where(~_overlap(booking.room_id, booking.start_time, booking.end_time))
+
+    return (
+        insert(bookings)
+        .from_select(["user_username", "room_id", "start_time", "end_time"], values)
+        .returning(*bookings.c)
+    )
+
+
+def atomic_update_statement(booking_id: int, room_id: int, start_time, end_time):
+    return (
+        update(bookings)
+        .where(
+            bookings.c.id == booking_id,
+            ~_overlap(room_id, start_time, end_time, exclude_booking_id=booking_id),
+        )
+        .values(start_time=start_time, end_time=end_time)
+        .returning(*bookings.c)
+    )
+
+
+def create_booking_atomic(db: Session, user_username: str, booking: schemas.BookingCreate):
+    """Insert and return the booking in one round trip, or None on conflict."""
+    try:
+        row = db.execute(atomic_insert_statement(user_username, booking)).first()
+        if row is not None:
+            outbox.enqueue(db, created_event(row))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+
+    if row is not None:
+        outbox.notify()
+        availability_index.add(row.id, row.room_id, row.start_time, row.end_time)
+    return row
+
+
+def update_booking_atomic(db: Session, booking: models.Booking, start_time, end_time):
+    """Move a booking in one statement, or return None on conflict."""
+    old_start = booking.start_time
+    try:
+        row = db.execute(
+            atomic_update_statement(booking.id, booking.room_id, start_time, end_time)
+        ).first()
+        if row is not None:
+            outbox.enqueue(db, updated_event(row))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+
+    if row is not None:
+        outbox.notify()
+        availability_index.move(row.id, row.room_id, old_start, row.start_time, row.end_time)
+        response_cache.invalidate(booking_tag(row.id))
+    return row
+
+
+# ------------------------------------------------
+# BULK / RECURRING BOOKINGS
+# ------------------------------------------------
+def create_booking_series(db: Session, user_username: str, room_id: int, occurrences, all_or_nothing: bool = False):
+    """
+    Validate all occurrences with one range query for the room, then insert
+    the valid ones with one batched INSERT in a single transaction.
+    Returns one result dict per occurrence, in request order.
+    """
+    window_start = min(start for start, _ in occurrences)
+    window_end = max(end for _, end in occurrences)
+    existing = [
+        (start, end)
+        for _, start, end in iter_bookings_in_window(db, [room_id], window_start, window_end)
+    ]
+    statuses = series.find_conflicts(occurrences, existing)
+
+    results = [
+        {"start_time": start, "end_time": end, "status": status, "booking_id": None, "detail": detail}
+        for (start, end), (status, detail) in zip(occurrences, statuses)
+    ]
+    accepted = [r for r in results if r["status"] == "ok"]
+
+    if all_or_nothing and len(accepted) < len(results):
+        for r in accepted:
+            r["status"], r["detail"] = "skipped", "Another occurrence failed"
+        return results
+
+    if accepted:
+        try:
+            rows = db.execute(
+                insert(bookings).returning(bookings.c.id, sort_by_parameter_order=True),
+                [
+                    {"user_username": user_username, "room_id": room_id,
+                     "start_time": r["start_time"], "end_time": r["end_time"]}
+                    for r in accepted
+                ],
+            ).all()
+            # One aggregated event instead of one per occurrence
+            outbox.enqueue(db, events.booking_event(
+                "booking_series_created", user_username, room_id,
+                start=accepted[0]["start_time"], end=accepted[-1]["end_time"],
+                count=len(rows),
+                occurrences=[
+                    [row.id, events.epoch(r["start_time"]), events.epoch(r["end_time"])]
+                    for r, row in zip(accepted, rows)
+                ],
+            ))
+            db.commit()
+        except IntegrityError:
+            # Exclusion constraint: someone booked the room in the meantime
+            db.rollback()
+            for r in accepted:
+                r["status"], r["detail"] = "conflict", "Concurrent booking, please retry"
+            return results
+
+        outbox.notify()
+        for r, row in zip(accepted, rows):
+            r["status"], r["booking_id"] = "booked", row.id
+            availability_index.add(row.id, room_id, r["start_time"], r["end_time"])
 
-    return conflict is None
+    return results
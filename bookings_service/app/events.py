@@ -0,0 +1,73 @@
+# bookings_service/app/events.py
+"""
+Versioned booking events as published to booking_notifications.
+
+Every event is a flat map:
+    v           schema version (EVENT_SCHEMA_VERSION)
+    type        booking_created | booking_updated | booking_deleted | booking_series_created
+    ts          when it happened, epoch seconds (UTC)
+    username, room_id, booking_id
+    start, end  epoch seconds (UTC), when the event concerns one slot
+plus type-specific fields (e.g. count/occurrences for series).
+
+Bodies are msgpack with content_type application/msgpack; EVENT_ENCODING=json
+(or msgpack not being installed) publishes the same map as JSON instead.
+Consumers must ignore fields they do not know and treat a higher v as
+"newer producer", not as an error.
+"""
+import os
+import json
+import time
+from datetime import datetime, timezone
+
+try:
+    import msgpack
+except ImportError:  # optional: fall back to JSON bodies
+    msgpack = None
+
+
+EVENT_SCHEMA_VERSION = 1
+EVENT_ENCODING = os.getenv("EVENT_ENCODING", "msgpack")
+
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+JSON_CONTENT_TYPE = "application/json"
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def epoch(value: datetime) -> float:
+    """Naive datetimes are UTC (as stored in bookings)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH).total_seconds()
+
+
+def booking_event(event_type: str, username: str, room_id: int, booking_id: int = None,
+                  start: datetime = None, end: datetime = None, **extra) -> dict:
+    event = {
+        "v": EVENT_SCHEMA_VERSION,
+        "type": event_type,
+        "ts": time.time(),
+        "username": username,
+        "room_id": room_id,
+        "booking_id": booking_id,
+    }
+    if start is not None:
+        event["start"] = epoch(start)
+    if end is not None:
+        event["end"] = epoch(end)
+    event.update(extra)
+    return event
+
+
+def encode(event: dict):
+    """(body, content_type)"""
+    if EVENT_ENCODING == "msgpack" and msgpack is not None:
+        return msgpack.packb(event, use_bin_type=True), MSGPACK_CONTENT_TYPE
+    return json.dumps(event, separators=(",", ":")).encode(), JSON_CONTENT_TYPE
+
+
+def decode(body: bytes, content_type: str = None) -> dict:
+    if content_type == MSGPACK_CONTENT_TYPE:
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
@@ -1,20 +1,28 @@
 import os
 import json
-import requests
-import jwt
-import pika  # RABBITMQ
-from memory_profiler import profile
-import cProfile
-import pstats
-
-from fastapi import FastAPI, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 #from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import models, schemas, crud
-from .database import Base, engine, get_db
+from . import models, schemas, crud, async_crud, messaging, availability, series
+from . import database
+from .database import engine, get_db, get_async_db, SessionLocal
+from smartmeeting_common.db_pool import pool_stats
+from smartmeeting_common import metrics, profiler
+from .outbox import outbox_relay
+from .room_cache import room_cache, MISSING, start_room_event_listener
+from .availability_index import availability_index, start_availability_index
+from smartmeeting_common.pagination import set_next_cursor, stream_ndjson
+from smartmeeting_common.auth import SECRET_KEY, decode_token, token_cache
+from smartmeeting_common.response_cache import respond, response_cache
 
 
 # ------------------------------------------------
@@ -22,39 +30,26 @@ from .database import Base, engine, get_db
 # ------------------------------------------------
 app = FastAPI(title="Bookings Service - Ranim Tahmoush")
 
-Base.metadata.create_all(bind=engine)
+# Per-route request, DB and outbound call metrics, scraped from /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
+
+# Schema changes are applied by `python -m app.migrations`, not at import
+
+ROOMS_SERVICE_URL = os.getenv("ROOMS_SERVICE_URL", "http://rooms_service:8002")
 
-SECRET_KEY = "supersecret_ranim_key"
-ALGORITHM = "HS256"
+AVAILABILITY_MAX_ROOMS = int(os.getenv("AVAILABILITY_MAX_ROOMS", "5000"))
+AVAILABILITY_MAX_DAYS = int(os.getenv("AVAILABILITY_MAX_DAYS", "92"))
 
+
+# ------------------------------------------------
+# SECURITY / JWT
+# ------------------------------------------------
 #oauth2_scheme = OAuth2PasswordBearer(
 #    tokenUrl="https://shiny-train-g47pjxrpjpr6c9r65-8001.app.github.dev/login"
 #)
 auth_scheme = HTTPBearer()  
 
-# ------------------------------------------------
-# JWT DECODE
-# ------------------------------------------------
-def decode_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        role = payload.get("role")
-
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid token: no subject")
-
-        return username, role
-
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-
-    except jwt.DecodeError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    except Exception:
-        raise HTTPException(status_code=500, detail="Internal server error")
-
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(auth_scheme)):
     token = credentials.credentials  # extract raw token
@@ -62,6 +57,12 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(auth_sc
     return {"username": username, "role": role}
 
 
+async def get_current_user_async(credentials: HTTPAuthorizationCredentials = Depends(auth_scheme)):
+    # Same as get_current_user, but keeps async routes off the threadpool
+    username, role = decode_token(credentials.credentials)
+    return {"username": username, "role": role}
+
+
 def require_admin(current=Depends(get_current_user)):
     if current["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
@@ -69,41 +70,31 @@ def require_admin(current=Depends(get_current_user)):
 
 
 # ------------------------------------------------
-# RABBITMQ HELPER
+# ROOM SERVICE CHECK
 # ------------------------------------------------
-def publish_booking_message(booking_data: dict):
-    """Publish a booking event to RabbitMQ queue."""
+def _room_metadata(response):
     try:
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=os.getenv("RABBITMQ_HOST", "rabbitmq"))
-        )
-        channel = connection.channel()
-
-        channel.queue_declare(queue="booking_notifications")
-
-        channel.basic_publish(
-            exchange="",
-            routing_key="booking_notifications",
-            body=json.dumps(booking_data),
-        )
+        return response.json()
+    except ValueError:
+        return {"id": None}
 
-        connection.close()
 
-    except Exception as e:
-        print("❌ RabbitMQ publish error:", e)
-        # (We do NOT raise; booking should succeed even without MQ)
+def room_exists(room_id: int):
+    cached = room_cache.get(room_id)
+    if cached is not MISSING:
+        return cached is not None
 
+    import requests  # ~100 ms to import; only booking writes need it
 
-# ------------------------------------------------
-# ROOM SERVICE CHECK
-# ------------------------------------------------
-def room_exists(room_id: int):
     try:
-        response = requests.get(f"http://rooms_service:8002/rooms/{room_id}", timeout=3)
+        with metrics.timed_call("http", "rooms_service"):
+            response = requests.get(f"{ROOMS_SERVICE_URL}/rooms/{room_id}", timeout=3)
 
         if response.status_code == 200:
+            room_cache.put(room_id, _room_metadata(response))
             return True
         if response.status_code == 404:
+            room_cache.put(room_id, None)
             return False
 
         return False
@@ -115,6 +106,65 @@ def room_exists(room_id: int):
         )
 
 
+# Shared keep-alive client for the async routes, created on first use
+_http_client = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    global _http_client
+    if _http_client is None:
+        import httpx
+
+        _http_client = httpx.AsyncClient(
+            base_url=ROOMS_SERVICE_URL,
+            timeout=3,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        )
+    return _http_client
+
+
+async def room_exists_async(room_id: int):
+    import httpx
+
+    cached = room_cache.get(room_id)
+    if cached is not MISSING:
+        return cached is not None
+
+    try:
+        with metrics.timed_call("http", "rooms_service"):
+            response = await get_http_client().get(f"/rooms/{room_id}")
+    except httpx.HTTPError:
+        raise HTTPException(
+            status_code=502,
+            detail="Rooms service unavailable",
+        )
+
+    if response.status_code == 200:
+        room_cache.put(room_id, _room_metadata(response))
+        return True
+    if response.status_code == 404:
+        room_cache.put(room_id, None)
+    return False
+
+
+@app.on_event("startup")
+def startup_event():
+    start_room_event_listener(messaging.RABBITMQ_HOST)
+    start_availability_index(SessionLocal)
+    outbox_relay.start(SessionLocal)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    global _http_client
+    # Relay committed booking events before the worker exits
+    outbox_relay.stop()
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 @app.get("/")
 def home():
     return {"service": "bookings", "status": "running"}
@@ -139,28 +189,112 @@ def create_booking(
     if not room_exists(booking.room_id):
         raise HTTPException(status_code=404, detail="Room not found")
 
-    # Validate availability
-    available = crud.check_room_availability(
-        db, booking.room_id, booking.start_time, booking.end_time
+    if crud.BOOKING_MODE == "atomic":
+        # Availability check and insert in one statement, enforced by the DB
+        created = crud.create_booking_atomic(db, current["username"], booking)
+        if created is None:
+            raise HTTPException(status_code=400, detail="Room already booked")
+    else:
+        # Availability check, then insert (its booking_created event goes out via the outbox)
+        created = crud.create_booking_checked(db, current["username"], booking)
+        if created is None:
+            raise HTTPException(status_code=400, detail="Room already booked")
+
+    return created
+
+
+# ------------------------------------------------
+# BULK / RECURRING BOOKINGS
+# ------------------------------------------------
+@app.post("/bookings/bulk", response_model=schemas.BookingSeriesOut, status_code=201)
+def create_booking_series(
+    booking_series: schemas.BookingSeriesCreate,
+    current=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Book an explicit list or a daily/weekly series; reports the outcome per occurrence."""
+    try:
+        occurrences = series.expand(booking_series)
+    except series.SeriesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One rooms_service lookup for the whole series
+    if not room_exists(booking_series.room_id):
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    results = crud.create_booking_series(
+        db, current["username"], booking_series.room_id, occurrences,
+        all_or_nothing=booking_series.all_or_nothing,
     )
-    if not available:
-        raise HTTPException(status_code=400, detail="Room already booked")
-
-    # Create booking
-    created = crud.create_booking(db, current["username"], booking)
-
-    # Publish async MQ event
-    publish_booking_message(
-        {
-            "event": "booking_created",
-            "username": current["username"],
-            "room_id": booking.room_id,
-            "start": str(booking.start_time),
-            "end": str(booking.end_time),
-        }
+    booked = [r for r in results if r["status"] == "booked"]
+
+    report = schemas.BookingSeriesOut(
+        room_id=booking_series.room_id,
+        booked=len(booked),
+        failed=len(results) - len(booked),
+        results=results,
     )
+    if not booked:
+        return JSONResponse(status_code=409, content=jsonable_encoder(report))
+    return report
 
-    return created
+
+# ------------------------------------------------
+# FREE/BUSY AVAILABILITY SEARCH
+# ------------------------------------------------
+def _parse_room_ids(raw: str) -> list[int]:
+    try:
+        room_ids = sorted({int(part) for part in raw.split(",") if part.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="room_ids must be comma-separated integers")
+
+    if not room_ids:
+        raise HTTPException(status_code=400, detail="room_ids is required")
+    if len(room_ids) > AVAILABILITY_MAX_ROOMS:
+        raise HTTPException(status_code=400, detail=f"At most {AVAILABILITY_MAX_ROOMS} rooms per request")
+    return room_ids
+
+
+@app.get("/availability", response_model=schemas.AvailabilityOut)
+def get_availability(
+    room_ids: str = Query(..., description="Comma-separated room IDs, e.g. 1,2,7"),
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    min_free_minutes: int = Query(0, ge=0, description="Hide free gaps shorter than this"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Free and busy intervals for many rooms over one window, from a single range scan."""
+    start = availability.naive_utc(start)
+    end = availability.naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=AVAILABILITY_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window is limited to {AVAILABILITY_MAX_DAYS} days")
+
+    rooms = _parse_room_ids(room_ids)
+    min_free = timedelta(minutes=min_free_minutes) if min_free_minutes else None
+
+    if format == "ndjson":
+        bind = db.get_bind()
+
+        def generate():
+            # Own session: the request-scoped one may be closed while streaming
+            with Session(bind=bind) as stream_db:
+                rows = crud.iter_bookings_in_window(stream_db, rooms, start, end)
+                for entry in availability.free_busy(rows, rooms, start, end, min_free):
+                    yield json.dumps(entry) + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    rows = crud.iter_bookings_in_window(db, rooms, start, end)
+    # Already plain JSON types; skip response_model re-validation
+    return JSONResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "rooms": list(availability.free_busy(rows, rooms, start, end, min_free)),
+    })
 
 
 # ------------------------------------------------
@@ -169,13 +303,46 @@ def create_booking(
 @app.get("/users/{username}/bookings", response_model=list[schemas.BookingOut])
 def get_user_bookings(
     username: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    stream: bool = False,
     current=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if current["username"] != username and current["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    return crud.get_user_bookings(db, username)
+    if stream:
+        return stream_ndjson(
+            db, lambda s: crud.user_bookings_query(s, username, after_id=after_id), schemas.BookingOut
+        )
+
+    bookings = crud.get_user_bookings(db, username, limit, after_id)
+    set_next_cursor(response, bookings, limit)
+    return bookings
+
+
+# ------------------------------------------------
+# ADMIN: ALL BOOKINGS (paginated / NDJSON export)
+# ------------------------------------------------
+@app.get("/admin/bookings", response_model=list[schemas.BookingOut])
+def list_all_bookings(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    stream: bool = False,
+    admin=Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    if stream:
+        return stream_ndjson(
+            db, lambda s: crud.all_bookings_query(s, after_id=after_id), schemas.BookingOut
+        )
+
+    bookings = crud.get_all_bookings(db, limit, after_id)
+    set_next_cursor(response, bookings, limit)
+    return bookings
 
 
 # ------------------------------------------------
@@ -184,17 +351,26 @@ def get_user_bookings(
 @app.get("/bookings/{booking_id}", response_model=schemas.BookingOut)
 def get_booking(
     booking_id: int,
+    request: Request,
     current=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    booking = crud.get_booking(db, booking_id)
-    if not booking:
+    entry = response_cache.load(
+        "booking",
+        crud.booking_tag(booking_id),
+        "",
+        lambda: crud.get_booking(db, booking_id),
+        schemas.BookingOut,
+        meta=lambda booking: {"owner": booking.user_username},
+    )
+    if entry is None:
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    if booking.user_username != current["username"] and current["role"] != "admin":
+    # Checked on every request, hit or miss: one cached entry serves all callers
+    if entry.meta["owner"] != current["username"] and current["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    return booking
+    return respond(request, entry)
 
 
 # ------------------------------------------------
@@ -220,24 +396,14 @@ def update_booking(
     if new_end <= new_start:
         raise HTTPException(status_code=400, detail="end_time must be after start_time")
 
-    available = crud.check_room_availability(
-        db, booking.room_id, new_start, new_end
-    )
-    if not available:
-        raise HTTPException(status_code=400, detail="Time conflict")
-
-    updated = crud.update_booking(db, booking_id, booking_update)
-
-    # Publish update event
-    publish_booking_message(
-        {
-            "event": "booking_updated",
-            "username": booking.user_username,
-            "room_id": booking.room_id,
-            "start": str(new_start),
-            "end": str(new_end),
-        }
-    )
+    if crud.BOOKING_MODE == "atomic":
+        updated = crud.update_booking_atomic(db, booking, new_start, new_end)
+        if updated is None:
+            raise HTTPException(status_code=400, detail="Time conflict")
+    else:
+        updated = crud.update_booking_checked(db, booking, booking_update, new_start, new_end)
+        if updated is None:
+            raise HTTPException(status_code=400, detail="Time conflict")
 
     return updated
 
@@ -260,27 +426,122 @@ def delete_booking(
 
     crud.delete_booking(db, booking_id)
 
-    # Publish deletion event
-    publish_booking_message(
-        {
-            "event": "booking_deleted",
-            "username": booking.user_username,
-            "room_id": booking.room_id,
-        }
-    )
+    return {"message": "Booking deleted"}
+
+
+# ------------------------------------------------
+# ASYNC BOOKING PIPELINE
+# Same behaviour as the routes above, but non-blocking end to end:
+# httpx for rooms_service and an async DB engine; events go through the
+# same outbox as the sync routes.
+# ------------------------------------------------
+@app.post("/async/bookings", response_model=schemas.BookingOut, status_code=201)
+async def create_booking_async(
+    booking: schemas.BookingCreate,
+    current=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if booking.end_time <= booking.start_time:
+        raise HTTPException(
+            status_code=400, detail="end_time must be after start_time"
+        )
+
+    if not await room_exists_async(booking.room_id):
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    if crud.BOOKING_MODE == "atomic":
+        created = await async_crud.create_booking_atomic(db, current["username"], booking)
+        if created is None:
+            raise HTTPException(status_code=400, detail="Room already booked")
+    else:
+        created = await async_crud.create_booking_checked(db, current["username"], booking)
+        if created is None:
+            raise HTTPException(status_code=400, detail="Room already booked")
+
+    return created
+
+
+@app.put("/async/bookings/{booking_id}", response_model=schemas.BookingOut)
+async def update_booking_async(
+    booking_id: int,
+    booking_update: schemas.BookingUpdate,
+    current=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    booking = await async_crud.get_booking(db, booking_id)
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+
+    if booking.user_username != current["username"] and current["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    new_start = booking_update.start_time or booking.start_time
+    new_end = booking_update.end_time or booking.end_time
+
+    if new_end <= new_start:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+
+    if crud.BOOKING_MODE == "atomic":
+        updated = await async_crud.update_booking_atomic(db, booking, new_start, new_end)
+        if updated is None:
+            raise HTTPException(status_code=400, detail="Time conflict")
+    else:
+        updated = await async_crud.update_booking_checked(db, booking, booking_update, new_start, new_end)
+        if updated is None:
+            raise HTTPException(status_code=400, detail="Time conflict")
+
+    return updated
+
+
+@app.delete("/async/bookings/{booking_id}")
+async def delete_booking_async(
+    booking_id: int,
+    current=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    booking = await async_crud.get_booking(db, booking_id)
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+
+    if booking.user_username != current["username"] and current["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    await async_crud.delete_booking(db, booking)
 
     return {"message": "Booking deleted"}
 
 
 # ------------------------------------------------
-# CPU PROFILER
+# ROOM CACHE ADMIN
+# ------------------------------------------------
+@app.get("/admin/cache/rooms")
+def room_cache_stats(admin=Depends(require_admin)):
+    return room_cache.stats()
+
+
+@app.delete("/admin/cache/rooms")
+def invalidate_room_cache(room_id: int = None, admin=Depends(require_admin)):
+    room_cache.invalidate(room_id)
+    return {"message": "Room cache invalidated", "room_id": room_id}
+
+
+# ------------------------------------------------
+# ON-DEMAND PROFILER (admin)
 # ------------------------------------------------
-def run_profiler():
-    profiler = cProfile.Profile()
-    profiler.enable()
-    profiler.disable()
-    stats = pstats.Stats(profiler)
-    stats.strip_dirs().sort_stats("cumulative").print_stats()
+@app.post("/admin/profile", response_class=PlainTextResponse)
+def admin_profile(
+    mode: str = Query("cpu", pattern="^(cpu|alloc)$"),
+    seconds: float = Query(10, gt=0, le=profiler.PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    admin=Depends(require_admin),
+):
+    """Profile this worker for `seconds`; folded stacks for flamegraph.pl / speedscope."""
+    try:
+        if mode == "alloc":
+            return profiler.sample_alloc(seconds)
+        return profiler.sample_cpu(seconds, interval_ms)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 @app.get("/health")
@@ -291,9 +552,30 @@ def health(db: Session = Depends(get_db)):
     except Exception:
         db_ok = False
 
+    outbox = None
+    if messaging.PUBLISHER_MODE != "off":
+        outbox = dict(outbox_relay.stats(), pending=outbox_relay.pending(db))
+
     return {
         "service": "bookings_service",
         "status": "ok",
         "database": db_ok,
-        "rabbitmq_host": os.getenv("RABBITMQ_HOST", "rabbitmq")
+        "rabbitmq_host": messaging.RABBITMQ_HOST,
+        "booking_mode": crud.BOOKING_MODE,
+        "publisher_mode": messaging.PUBLISHER_MODE,
+        "outbox": outbox,
+        "room_cache": room_cache.stats(),
+        "availability_index": availability_index.stats(),
+        "token_cache": token_cache.stats(),
+        "response_cache": response_cache.stats(),
+    }
+
+
+@app.get("/health/pool")
+def health_pool():
+    """Connection pool occupancy and checkout wait histogram."""
+    return {
+        "service": "bookings_service",
+        "sync": pool_stats(engine),
+        "async": pool_stats(database.async_engine) if database.async_engine is not None else None,
     }
@@ -0,0 +1,379 @@
+# bookings_service/app/messaging.py
+"""
+RabbitMQ transports for the outbox relay.
+
+Requests never publish: they stage events in booking_outbox and the relay
+hands each batch to one of these publishers (RABBITMQ_PUBLISHER):
+
+  pooled  long-lived connections, one confirm-mode channel per I/O thread;
+          a room always goes through the same channel (default)
+  direct  one connection per message, the original path; kept as the
+          baseline the benchmarks compare against
+  async   aio-pika on the relay's own event loop; different rooms are in
+          flight at once, so the broker round trips overlap
+  off     events are not staged at all (local runs without a broker)
+
+All of them publish with confirms and keep each room's messages in order:
+send() returns one result per message, None once the broker confirmed it
+or the exception that stopped it. After a failure the rest of that room
+(after a connection error: the rest of the batch) is returned as Skipped.
+"""
+import os
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+
+from smartmeeting_common import metrics
+
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+BOOKING_QUEUE = "booking_notifications"
+
+PUBLISHER_MODE = os.getenv("RABBITMQ_PUBLISHER", "pooled")
+if PUBLISHER_MODE not in ("pooled", "direct", "async", "off"):
+    raise ValueError(f"Unknown RABBITMQ_PUBLISHER {PUBLISHER_MODE!r} (pooled, direct, async or off)")
+PUBLISHER_CHANNELS = int(os.getenv("RABBITMQ_PUBLISHER_CHANNELS", "2"))
+# async: unconfirmed publishes allowed at once
+PUBLISHER_MAX_IN_FLIGHT = int(os.getenv("RABBITMQ_PUBLISHER_IN_FLIGHT", "64"))
+
+
+class Skipped(Exception):
+    """Not sent: an earlier message of the room, or the connection, failed."""
+
+
+def default_connection_factory():
+    import pika  # RABBITMQ; imported on first connect, not by every worker at startup
+
+    return pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
+
+
+def declare(channel):
+    # durable=True must match the declaration in notification_service
+    channel.queue_declare(queue=BOOKING_QUEUE, durable=True)
+
+
+def close_quietly(connection):
+    """Close a connection that may already be broken; returns None."""
+    try:
+        if connection is not None and connection.is_open:
+            connection.close()
+    except Exception:
+        pass
+    return None
+
+
+_rejections = None
+
+
+def is_rejection(error: Exception) -> bool:
+    """True if the broker refused this one message; anything else is a connection problem."""
+    global _rejections
+    if _rejections is None:
+        import pika
+
+        types = [pika.exceptions.NackError, pika.exceptions.UnroutableError]
+        try:
+            import aio_pika
+
+            types.append(aio_pika.exceptions.DeliveryError)
+        except ImportError:
+            pass
+        _rejections = tuple(types)
+    return isinstance(error, _rejections)
+
+
+def publish(channel, message):
+    """Blocking publish of one outbox row; returns once the broker confirmed it."""
+    import pika
+
+    with metrics.timed_call("amqp", BOOKING_QUEUE):
+        channel.basic_publish(
+            exchange="",
+            routing_key=BOOKING_QUEUE,
+            body=message.body,
+            properties=pika.BasicProperties(
+                delivery_mode=2, content_type=message.content_type, type=message.event_type
+            ),
+        )
+
+
+def connection_error(results):
+    """The first result that was neither a confirm, a rejection nor a skip, else None."""
+    for result in results:
+        if result is not None and not isinstance(result, Skipped) and not is_rejection(result):
+            return result
+    return None
+
+
+def send_in_order(messages, publish_one) -> list:
+    """Call publish_one per message with the skip rules above; returns the results."""
+    results, blocked = [], set()
+    for i, message in enumerate(messages):
+        if message.room_id in blocked:
+            results.append(Skipped())
+            continue
+        try:
+            publish_one(message)
+        except Exception as e:
+            results.append(e)
+            if not is_rejection(e):
+                results += [Skipped()] * (len(messages) - i - 1)
+                break
+            blocked.add(message.room_id)
+            continue
+        results.append(None)
+    return results
+
+
+# ------------------------------------------------
+# DIRECT (ONE CONNECTION PER MESSAGE)
+# ------------------------------------------------
+class DirectPublisher:
+    def __init__(self, connection_factory=default_connection_factory):
+        self.connection_factory = connection_factory
+        self._stats = {"published": 0, "connections": 0}
+
+    def _publish_one(self, message):
+        connection = None
+        try:
+            connection = self.connection_factory()
+            self._stats["connections"] += 1
+            channel = connection.channel()
+            channel.confirm_delivery()
+            declare(channel)
+            publish(channel, message)
+        finally:
+            close_quietly(connection)
+        self._stats["published"] += 1
+
+    def send(self, messages) -> list:
+        return send_in_order(messages, self._publish_one)
+
+    def stats(self) -> dict:
+        return dict(self._stats, mode="direct")
+
+    def close(self):
+        pass
+
+
+# ------------------------------------------------
+# POOLED PUBLISHER
+# ------------------------------------------------
+class BookingPublisher:
+    """
+    Long-lived publisher with a pool of I/O threads.
+
+    Each thread owns its own connection and confirm-mode channel (pika
+    connections are not thread-safe). send() splits a batch by room over
+    the threads, so the channels publish in parallel while every room stays
+    on one channel, and waits for all of them. A thread whose connection
+    failed drops it and reconnects on the next batch; the relay backs off.
+    """
+
+    def __init__(self, connection_factory=default_connection_factory, channels: int = PUBLISHER_CHANNELS):
+        self.connection_factory = connection_factory
+        self.channels = max(1, channels)
+        self._inboxes = []
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stats = {"published": 0, "connections": 0}
+
+    # ---- lifecycle ----
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.channels):
+                inbox = queue.Queue()
+                t = threading.Thread(target=self._run, args=(inbox,), name=f"booking-publisher-{i}", daemon=True)
+                t.start()
+                self._inboxes.append(inbox)
+                self._threads.append(t)
+
+    def close(self, timeout: float = 5.0):
+        with self._lock:
+            inboxes, threads = self._inboxes, self._threads
+            self._inboxes, self._threads = [], []
+        for inbox in inboxes:
+            inbox.put(None)
+        for t in threads:
+            t.join(timeout)
+
+    # ---- relay path ----
+    def send(self, messages) -> list:
+        self.start()
+        shards = defaultdict(list)
+        for i, message in enumerate(messages):
+            shards[hash(message.room_id) % self.channels].append(i)
+
+        results = [None] * len(messages)
+        jobs = []
+        for shard, indexes in shards.items():
+            job = ([messages[i] for i in indexes], threading.Event(), [])
+            self._inboxes[shard].put(job)
+            jobs.append((indexes, job))
+        for indexes, (_, done, shard_results) in jobs:
+            done.wait()
+            for i, result in zip(indexes, shard_results):
+                results[i] = result
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, mode="pooled", channels=self.channels)
+
+    # ---- I/O threads ----
+    def _incr(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _run(self, inbox):
+        state = {"connection": None, "channel": None}
+
+        def publish_one(message):
+            if state["channel"] is None:
+                state["connection"] = self.connection_factory()
+                self._incr("connections")
+                channel = state["connection"].channel()
+                channel.confirm_delivery()
+                declare(channel)
+                state["channel"] = channel
+            publish(state["channel"], message)
+            self._incr("published")
+
+        while True:
+            job = inbox.get()
+            if job is None:
+                break
+            messages, done, results = job
+            try:
+                results += send_in_order(messages, publish_one)
+                if connection_error(results) is not None:
+                    state["connection"] = state["channel"] = close_quietly(state["connection"])
+            finally:
+                done.set()
+
+        close_quietly(state["connection"])
+
+
+# ------------------------------------------------
+# ASYNC PUBLISHER (aio-pika)
+# ------------------------------------------------
+class AsyncBookingPublisher:
+    """
+    aio-pika publisher on a private event loop, driven by the relay thread.
+
+    Rooms are published concurrently (each room's messages one after the
+    other), with at most max_in_flight unconfirmed at a time. Any
+    connection error closes the connection; the next batch reconnects.
+    """
+
+    def __init__(self, connect=None, max_in_flight: int = PUBLISHER_MAX_IN_FLIGHT):
+        self.connect = connect
+        self.max_in_flight = max(1, max_in_flight)
+        self._loop = None
+        self._connection = None
+        self._channel = None
+        self._stats = {"published": 0, "connections": 0, "max_in_flight_seen": 0}
+
+    async def _get_channel(self):
+        if self._channel is None:
+            import aio_pika
+
+            connect = self.connect or (lambda: aio_pika.connect(host=RABBITMQ_HOST))
+            self._connection = await connect()
+            self._stats["connections"] += 1
+            self._channel = await self._connection.channel(publisher_confirms=True)
+            await self._channel.declare_queue(BOOKING_QUEUE, durable=True)
+        return self._channel
+
+    async def _publish(self, channel, message):
+        import aio_pika
+        from pamqp.commands import Basic
+
+        with metrics.timed_call("amqp", BOOKING_QUEUE):
+            confirmation = await channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=message.body,
+                    content_type=message.content_type,
+                    type=message.event_type,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=BOOKING_QUEUE,
+            )
+        if isinstance(confirmation, Basic.Nack):
+            raise aio_pika.exceptions.DeliveryError(None, confirmation)
+
+    async def send_async(self, messages) -> list:
+        results = [Skipped() for _ in messages]
+        if not messages:
+            return results
+        try:
+            channel = await self._get_channel()
+        except Exception as e:
+            results[0] = e
+            return results
+
+        rooms = defaultdict(list)
+        for i, message in enumerate(messages):
+            rooms[message.room_id].append(i)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        in_flight = [0]
+        lost = []
+
+        async def publish_room(indexes):
+            for i in indexes:
+                if lost:
+                    return
+                try:
+                    async with slots:
+                        in_flight[0] += 1
+                        self._stats["max_in_flight_seen"] = max(self._stats["max_in_flight_seen"], in_flight[0])
+                        try:
+                            await self._publish(channel, messages[i])
+                        finally:
+                            in_flight[0] -= 1
+                except Exception as e:
+                    results[i] = e
+                    if not is_rejection(e):
+                        lost.append(e)
+                    return
+                results[i] = None
+                self._stats["published"] += 1
+
+        await asyncio.gather(*(publish_room(indexes) for indexes in rooms.values()))
+        if lost:
+            await self._close_connection()
+        return results
+
+    async def _close_connection(self):
+        connection, self._connection, self._channel = self._connection, None, None
+        if connection is not None:
+            try:
+                await connection.close()
+            except Exception:
+                pass
+
+    def send(self, messages) -> list:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(self.send_async(messages))
+
+    def stats(self) -> dict:
+        return dict(self._stats, mode="async", max_in_flight=self.max_in_flight)
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.run_until_complete(self._close_connection())
+            self._loop.close()
+            self._loop = None
+
+
+def make_publisher(mode: str = PUBLISHER_MODE, connection_factory=None):
+    """The relay's transport for RABBITMQ_PUBLISHER (connection_factory: pika modes only)."""
+    if mode == "async":
+        return AsyncBookingPublisher()
+    if mode == "direct":
+        return DirectPublisher(connection_factory or default_connection_factory)
+    return BookingPublisher(connection_factory or default_connection_factory)
@@ -0,0 +1,29 @@
+# bookings_service/app/migrations.py
+"""Schema steps for bookings_service, applied in order by python -m app.migrations."""
+from . import models
+from .database import Base
+
+
+SERVICE = "bookings_service"
+
+
+def create_tables(engine):
+    Base.metadata.create_all(bind=engine)
+
+
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    # New Postgres tables get it from create_all; older ones are altered here
+    (2, "booking overlap exclusion constraint", models.install_overlap_constraint),
+    (3, "outbox retry schedule and dead-letter table", models.upgrade_outbox),
+]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from smartmeeting_common import migrate
+
+    from .database import engine
+
+    migrate.main(engine, sys.modules[__name__])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Index, DDL, event, inspect, text
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -13,6 +13,39 @@ class Booking(Base):
     end_time = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class OutboxEvent(Base):
+    """Booking event waiting to be relayed to RabbitMQ (see app/outbox.py)."""
+    __tablename__ = "booking_outbox"
+
+    id = Column(Integer, primary_key=True)
+    room_id = Column(Integer, nullable=True)
+    event_type = Column(String(64), nullable=False)
+    body = Column(LargeBinary, nullable=False)
+    content_type = Column(String(64), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    # Set after a rejection: the room's events wait until then
+    next_attempt_at = Column(DateTime, nullable=True)
+
+    # The relay's "is an earlier event of this room waiting?" probe
+    __table_args__ = (Index("ix_booking_outbox_room_id_id", "room_id", "id"),)
+
+
+class OutboxDeadLetter(Base):
+    """Event the broker kept rejecting, moved out so its room can move on."""
+    __tablename__ = "booking_outbox_dead"
+
+    id = Column(Integer, primary_key=True)  # the booking_outbox id
+    room_id = Column(Integer, nullable=True)
+    event_type = Column(String(64), nullable=False)
+    body = Column(LargeBinary, nullable=False)
+    content_type = Column(String(64), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(String, nullable=True)
+    dead_at = Column(DateTime, nullable=False)
+
 # Index to speed up "is this room booked in this time window?"
 Index(
     "ix_bookings_room_time_window",
@@ -20,3 +53,56 @@ Index(
     Booking.start_time,
     Booking.end_time,
 )
+
+# Postgres: make overlapping bookings of one room impossible at the database
+# level. Columns are timestamp without time zone, hence tsrange; '[)' bounds
+# allow back-to-back bookings like the overlap query does.
+OVERLAP_CONSTRAINT = "bookings_no_overlap"
+
+overlap_constraint_ddl = [
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"),
+    DDL(
+        f"ALTER TABLE bookings ADD CONSTRAINT {OVERLAP_CONSTRAINT} "
+        "EXCLUDE USING gist (room_id WITH =, tsrange(start_time, end_time) WITH &&)"
+    ),
+]
+
+for ddl in overlap_constraint_ddl:
+    event.listen(Booking.__table__, "after_create", ddl.execute_if(dialect="postgresql"))
+
+
+def install_overlap_constraint(engine):
+    """Add the exclusion constraint to an existing Postgres bookings table."""
+    if engine.dialect.name != "postgresql":
+        return True
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+                {"name": OVERLAP_CONSTRAINT},
+            ).first()
+            if not exists:
+                for ddl in overlap_constraint_ddl:
+                    conn.execute(text(ddl.statement))
+        return True
+    except Exception as e:
+        # e.g. legacy overlapping rows; the conditional insert still applies
+        print("❌ Could not install booking overlap constraint:", e, flush=True)
+        return False
+
+
+def upgrade_outbox(engine):
+    """Retry schedule column, room index and dead-letter table for older outboxes."""
+    table = OutboxEvent.__table__
+    inspector = inspect(engine)
+    existing = {c["name"] for c in inspector.get_columns(table.name)}
+    indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+
+    with engine.begin() as conn:
+        if "next_attempt_at" not in existing:
+            col_type = table.c.next_attempt_at.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN next_attempt_at {col_type}"))
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
+        OutboxDeadLetter.__table__.create(conn, checkfirst=True)
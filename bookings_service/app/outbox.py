@@ -0,0 +1,273 @@
+# bookings_service/app/outbox.py
+"""
+Transactional outbox for booking events.
+
+crud writes the event into booking_outbox in the same transaction as the
+booking change (enqueue), so an event exists if and only if the change
+was committed, and no request waits on RabbitMQ. OutboxRelay drains the
+table in id order on a background thread, publishing through one of the
+messaging transports with confirms, and deletes what the broker accepted:
+
+- the broker is down / the connection drops: the batch stays in the
+  table, the relay reconnects with backoff and resumes from the same row
+- the broker nacks one event: the row is kept for retry with backoff and
+  the rest of that room's events wait behind it; the relay leaves that
+  room out of its batches meanwhile, so other rooms carry on. Events of
+  one room are published in commit order. After OUTBOX_MAX_ATTEMPTS the
+  event is moved to booking_outbox_dead and its room resumes
+
+With several workers on Postgres only the holder of an advisory lock
+relays; the others stand by. Delivery is at least once (a crash between
+publish and delete republishes), events carry booking_id/ts for dedupe.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, delete, exists, insert, literal, select, text, update
+from sqlalchemy.orm import aliased
+
+from . import events, messaging, models
+
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+# Fallback poll; commits in this process wake the relay immediately
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_MS", "500")) / 1000
+OUTBOX_MAX_BACKOFF = 10.0
+# A rejected event is retried after OUTBOX_RETRY_DELAY_MS, doubling per
+# attempt, and dead-lettered after OUTBOX_MAX_ATTEMPTS rejections
+OUTBOX_RETRY_DELAY = float(os.getenv("OUTBOX_RETRY_DELAY_MS", "1000")) / 1000
+OUTBOX_MAX_RETRY_DELAY = 300.0
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_LOCK_KEY = 0x6F7574626F78  # pg advisory lock id, any constant shared by all workers
+
+
+def enqueue(db, event: dict):
+    """Stage an event in the caller's transaction (Session or AsyncSession)."""
+    if messaging.PUBLISHER_MODE == "off":
+        return
+    body, content_type = events.encode(event)
+    db.add(models.OutboxEvent(
+        room_id=event.get("room_id"),
+        event_type=event["type"],
+        body=body,
+        content_type=content_type,
+        created_at=datetime.utcnow(),
+        attempts=0,
+    ))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), OUTBOX_MAX_RETRY_DELAY))
+
+
+def pending_query(batch_size: int, now: datetime):
+    """The first batch_size events, in id order, of rooms not waiting for a retry."""
+    Outbox = models.OutboxEvent
+    waiting = aliased(Outbox)
+    return (
+        select(Outbox.id, Outbox.room_id, Outbox.event_type, Outbox.body, Outbox.content_type, Outbox.attempts)
+        .where(~exists().where(
+            waiting.room_id == Outbox.room_id,
+            waiting.id <= Outbox.id,
+            waiting.next_attempt_at > now,
+        ))
+        .order_by(Outbox.id)
+        .limit(batch_size)
+    )
+
+
+def dead_letter(db, row, error: Exception, now: datetime):
+    Outbox, Dead = models.OutboxEvent, models.OutboxDeadLetter
+    columns = ["id", "room_id", "event_type", "body", "content_type", "created_at"]
+    db.execute(
+        insert(Dead).from_select(
+            columns + ["attempts", "last_error", "dead_at"],
+            select(
+                *(getattr(Outbox, c) for c in columns),
+                literal(row.attempts + 1), literal(repr(error)[:500]), literal(now, DateTime),
+            ).where(Outbox.id == row.id),
+        )
+    )
+    db.execute(delete(Outbox).where(Outbox.id == row.id))
+
+
+def relay_batch(db, publisher, batch_size: int = OUTBOX_BATCH_SIZE, now: datetime = None) -> dict:
+    """
+    Hand up to batch_size pending events to the publisher (a messaging
+    transport) and delete the confirmed ones; schedule a retry for, or
+    dead-letter, the rejected ones. A connection error is raised after the
+    rows confirmed so far have been deleted.
+    """
+    Outbox = models.OutboxEvent
+    now = now or datetime.utcnow()
+    rows = db.execute(pending_query(batch_size, now)).all()
+    results = publisher.send(rows) if rows else []
+
+    published, failed, dead = [], 0, 0
+    try:
+        for row, result in zip(rows, results):
+            if result is None:
+                published.append(row.id)
+            elif messaging.is_rejection(result):
+                failed += 1
+                if row.attempts + 1 >= OUTBOX_MAX_ATTEMPTS:
+                    dead_letter(db, row, result, now)
+                    dead += 1
+                    print(f"❌ Outbox event {row.id} ({row.event_type}) dead-lettered after "
+                          f"{row.attempts + 1} attempts: {result}", flush=True)
+                    continue
+                db.execute(
+                    update(Outbox)
+                    .where(Outbox.id == row.id)
+                    .values(
+                        attempts=Outbox.attempts + 1,
+                        last_error=repr(result)[:500],
+                        next_attempt_at=now + retry_delay(row.attempts + 1),
+                    )
+                )
+                print(f"❌ Outbox event {row.id} ({row.event_type}) rejected: {result}", flush=True)
+    finally:
+        if published:
+            db.execute(delete(Outbox).where(Outbox.id.in_(published)))
+        db.commit()
+
+    lost = messaging.connection_error(results)
+    if lost is not None:
+        raise lost
+    return {"fetched": len(rows), "published": len(published), "failed": failed, "dead": dead}
+
+
+class OutboxRelay:
+    """
+    Background thread draining booking_outbox to RabbitMQ through a
+    messaging transport (RABBITMQ_PUBLISHER unless one is passed in).
+    """
+
+    def __init__(
+        self,
+        publisher=None,
+        connection_factory=None,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+    ):
+        self.publisher = publisher
+        self.connection_factory = connection_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.session_factory = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_conn = None
+        self.leader = False
+        self._stats = {"published": 0, "failed": 0, "dead": 0, "reconnects": 0, "last_error": None}
+
+    # ---- lifecycle ----
+    def start(self, session_factory):
+        if self._thread is not None or messaging.PUBLISHER_MODE == "off":
+            return
+        self.session_factory = session_factory
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Publish what is pending (up to timeout), then stop."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self):
+        self._wake.set()
+
+    def pending(self, db) -> int:
+        return db.query(models.OutboxEvent).count()
+
+    def stats(self) -> dict:
+        publisher = self.publisher.stats() if self.publisher is not None else None
+        return dict(self._stats, leader=self.leader, running=self._thread is not None, publisher=publisher)
+
+    # ---- leadership ----
+    def _is_leader(self, engine) -> bool:
+        """Postgres: hold a session advisory lock; other databases have one writer anyway."""
+        if engine.dialect.name != "postgresql":
+            return True
+        try:
+            if self._lock_conn is None:
+                self._lock_conn = engine.connect()
+            if not self.leader:
+                self.leader = bool(self._lock_conn.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": OUTBOX_LOCK_KEY}
+                ).scalar())
+                self._lock_conn.commit()
+            else:
+                self._lock_conn.execute(text("SELECT 1"))  # still connected, still ours
+                self._lock_conn.commit()
+        except Exception:
+            self._release_lock()
+        return self.leader
+
+    def _release_lock(self):
+        self.leader = False
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.close()
+            except Exception:
+                pass
+            self._lock_conn = None
+
+    # ---- relay loop ----
+    def _run(self):
+        if self.publisher is None:
+            self.publisher = messaging.make_publisher(connection_factory=self.connection_factory)
+        backoff = 0.1
+
+        while True:
+            stopping = self._stop.is_set()
+            db = self.session_factory()
+            try:
+                if not self._is_leader(db.get_bind()):
+                    result = None
+                else:
+                    result = relay_batch(db, self.publisher, self.batch_size)
+                    self._stats["published"] += result["published"]
+                    self._stats["failed"] += result["failed"]
+                    self._stats["dead"] += result["dead"]
+                    backoff = 0.1
+            except Exception as e:
+                db.rollback()
+                result = None
+                self._stats["reconnects"] += 1
+                self._stats["last_error"] = repr(e)
+                print(f"❌ Outbox relay error: {e}. Retrying in {backoff:.1f}s", flush=True)
+                if stopping:
+                    break
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, OUTBOX_MAX_BACKOFF)
+                continue
+            finally:
+                db.close()
+
+            # More may be waiting; rejected rows come back once their retry is due
+            full = result is not None and result["fetched"] >= self.batch_size and result["published"] > 0
+            if stopping and not full:
+                break
+            if not full:
+                # Idle: sleep until a local commit wakes us or the poll interval passes
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+        self.publisher.close()
+        self._release_lock()
+
+
+outbox_relay = OutboxRelay()
+
+
+def notify():
+    """Call after committing a transaction that enqueued events."""
+    outbox_relay.wake()
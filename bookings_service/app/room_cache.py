@@ -0,0 +1,153 @@
+# bookings_service/app/room_cache.py
+import os
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+ROOM_CACHE_TTL = float(os.getenv("ROOM_CACHE_TTL", "300"))  # 0 disables the cache
+ROOM_CACHE_NEGATIVE_TTL = float(os.getenv("ROOM_CACHE_NEGATIVE_TTL", "30"))
+ROOM_CACHE_SIZE = int(os.getenv("ROOM_CACHE_SIZE", "10000"))
+
+# Fanout exchange rooms_service publishes room changes to ("" = no listener)
+ROOM_EVENTS_EXCHANGE = os.getenv("ROOM_EVENTS_EXCHANGE", "")
+
+MISSING = object()
+
+
+class RoomCache:
+    """
+    LRU + TTL cache of rooms_service lookups.
+
+    Values are the room metadata for rooms that exist and None for 404s;
+    the latter are kept for a shorter negative_ttl so a newly created room
+    becomes bookable quickly.
+    """
+
+    def __init__(
+        self,
+        ttl: float = ROOM_CACHE_TTL,
+        negative_ttl: float = ROOM_CACHE_NEGATIVE_TTL,
+        max_size: int = ROOM_CACHE_SIZE,
+        clock=time.monotonic,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, room_id: int):
+        """Return the cached value, or MISSING."""
+        with self._lock:
+            entry = self._entries.get(room_id)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(room_id)
+                    self.hits += 1
+                    return value
+                del self._entries[room_id]
+            self.misses += 1
+            return MISSING
+
+    def put(self, room_id: int, value):
+        if not self.enabled:
+            return
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            self._entries[room_id] = (self.clock() + ttl, value)
+            self._entries.move_to_end(room_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, room_id: int = None):
+        """Drop one room, or everything when room_id is None."""
+        with self._lock:
+            self.invalidations += 1
+            if room_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(room_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+room_cache = RoomCache()
+
+
+# ------------------------------------------------
+# ROOM-CHANGE EVENTS
+# ------------------------------------------------
+def handle_room_event(body: bytes, cache: RoomCache = room_cache):
+    """Apply one room-change event: {"room_id": 7} or {} to flush everything."""
+    try:
+        room_id = json.loads(body).get("room_id")
+        room_id = int(room_id) if room_id is not None else None
+    except (TypeError, ValueError, AttributeError):
+        print(f"❌ Ignoring malformed room event: {body[:200]!r}", flush=True)
+        return
+    cache.invalidate(room_id)
+
+
+def _on_room_event(channel, method, properties, body):
+    try:
+        handle_room_event(body)
+    finally:
+        # Acked even when it could not be applied: redelivery would not fix it
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+
+
+def listen_for_room_events(host: str, exchange: str = ROOM_EVENTS_EXCHANGE):
+    """Blocking loop binding a private queue to the room events exchange."""
+    import pika
+
+    while True:
+        connection = None
+        try:
+            connection = pika.BlockingConnection(pika.ConnectionParameters(host=host))
+            channel = connection.channel()
+            channel.exchange_declare(exchange=exchange, exchange_type="fanout", durable=True)
+            result = channel.queue_declare(queue="", exclusive=True)
+            channel.queue_bind(exchange=exchange, queue=result.method.queue)
+
+            # Anything may have changed while we were disconnected
+            room_cache.invalidate()
+
+            channel.basic_consume(queue=result.method.queue, on_message_callback=_on_room_event)
+            channel.start_consuming()
+
+        except Exception as e:
+            print(f"❌ Room events listener error: {e}. Retrying in 5 seconds...", flush=True)
+        finally:
+            if connection is not None and connection.is_open:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+        time.sleep(5)
+
+
+def start_room_event_listener(host: str):
+    if not ROOM_EVENTS_EXCHANGE or not room_cache.enabled:
+        return
+    threading.Thread(target=listen_for_room_events, args=(host,), daemon=True).start()
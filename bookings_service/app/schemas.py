@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 
 
 # ======================================
@@ -36,3 +36,58 @@ class BookingOut(BookingBase):
 
     class Config:
         orm_mode = True
+
+
+# ======================================
+# AVAILABILITY SEARCH OUTPUT
+# ======================================
+class RoomAvailability(BaseModel):
+    room_id: int
+    busy: List[Tuple[datetime, datetime]]
+    free: List[Tuple[datetime, datetime]]
+
+
+class AvailabilityOut(BaseModel):
+    start: datetime
+    end: datetime
+    rooms: List[RoomAvailability]
+
+
+# ======================================
+# BULK / RECURRING BOOKINGS
+# ======================================
+class Occurrence(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class Recurrence(BaseModel):
+    """RRULE-style series: FREQ, INTERVAL and COUNT or UNTIL."""
+    start_time: datetime
+    end_time: datetime
+    freq: str = Field(..., pattern="^(daily|weekly)$")
+    interval: int = Field(1, ge=1)
+    count: Optional[int] = Field(None, ge=1)
+    until: Optional[datetime] = None
+
+
+class BookingSeriesCreate(BaseModel):
+    room_id: int
+    occurrences: Optional[List[Occurrence]] = None
+    recurrence: Optional[Recurrence] = None
+    all_or_nothing: bool = False
+
+
+class OccurrenceResult(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    status: str  # booked | conflict | invalid | skipped
+    booking_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BookingSeriesOut(BaseModel):
+    room_id: int
+    booked: int
+    failed: int
+    results: List[OccurrenceResult]
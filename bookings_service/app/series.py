@@ -0,0 +1,83 @@
+# bookings_service/app/series.py
+import os
+from bisect import bisect_left
+from datetime import timedelta
+
+from . import schemas
+from .availability import naive_utc
+
+
+BULK_MAX_OCCURRENCES = int(os.getenv("BULK_MAX_OCCURRENCES", "500"))
+
+STEP = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1)}
+
+
+class SeriesError(ValueError):
+    pass
+
+
+def expand(series: schemas.BookingSeriesCreate) -> list:
+    """Turn an explicit list or a recurrence rule into (start, end) pairs."""
+    if (series.occurrences is None) == (series.recurrence is None):
+        raise SeriesError("Provide exactly one of occurrences or recurrence")
+
+    if series.occurrences is not None:
+        occurrences = [(o.start_time, o.end_time) for o in series.occurrences]
+    else:
+        rule = series.recurrence
+        if rule.count is None and rule.until is None:
+            raise SeriesError("recurrence needs count or until")
+
+        # Normalise first: aware and naive datetimes cannot be compared
+        first_start, first_end = naive_utc(rule.start_time), naive_utc(rule.end_time)
+        until = naive_utc(rule.until) if rule.until is not None else None
+        step = STEP[rule.freq] * rule.interval
+        duration = first_end - first_start
+        occurrences, start = [], first_start
+        while (rule.count is None or len(occurrences) < rule.count) and (
+            until is None or start <= until
+        ):
+            occurrences.append((start, start + duration))
+            start += step
+            if len(occurrences) > BULK_MAX_OCCURRENCES:
+                break
+
+    if not occurrences:
+        raise SeriesError("Series has no occurrences")
+    occurrences = [(naive_utc(start), naive_utc(end)) for start, end in occurrences]
+    if len(occurrences) > BULK_MAX_OCCURRENCES:
+        raise SeriesError(f"At most {BULK_MAX_OCCURRENCES} occurrences per request")
+    return occurrences
+
+
+def find_conflicts(occurrences, existing):
+    """
+    Status per occurrence against existing (start, end) pairs sorted by start
+    and against the occurrences accepted before it in the same request.
+    One bisect per occurrence against a running maximum of end times.
+    """
+    existing_starts = [start for start, _ in existing]
+    max_ends = []
+    for _, end in existing:
+        max_ends.append(max(end, max_ends[-1]) if max_ends else end)
+    accepted = []
+    statuses = []
+
+    for start, end in occurrences:
+        if end <= start:
+            statuses.append(("invalid", "end_time must be after start_time"))
+            continue
+
+        i = bisect_left(existing_starts, end) - 1
+        if i >= 0 and max_ends[i] > start:
+            statuses.append(("conflict", "Room already booked"))
+            continue
+
+        if any(s < end and e > start for s, e in accepted):
+            statuses.append(("conflict", "Overlaps another occurrence in this request"))
+            continue
+
+        accepted.append((start, end))
+        statuses.append(("ok", None))
+
+    return statuses
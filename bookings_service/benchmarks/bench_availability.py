@@ -0,0 +1,110 @@
+# bookings_service/benchmarks/bench_availability.py
+"""
+GET /availability at 1,000 rooms x 30 days, compared with the per-room
+approach clients use today (one query per room).
+
+Run from bookings_service/:  python -m benchmarks.bench_availability
+Set DATABASE_URL to benchmark against Postgres instead of a temp SQLite file
+(on SQLite most of the endpoint's time goes to parsing datetime strings).
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_availability.db")
+os.environ.setdefault("RABBITMQ_PUBLISHER", "off")
+
+import jwt  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import main, models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+START = datetime(2030, 3, 1)
+
+
+def seed(rooms, days, per_day):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(1)
+    rows = []
+    for room_id in range(1, rooms + 1):
+        for day in range(days):
+            hours = sorted(rng.sample(range(8, 19), per_day))
+            for hour in hours:
+                start = START + timedelta(days=day, hours=hour)
+                rows.append({
+                    "user_username": "bench", "room_id": room_id,
+                    "start_time": start, "end_time": start + timedelta(minutes=rng.choice((30, 60))),
+                })
+    with engine.begin() as conn:
+        conn.execute(insert(models.Booking.__table__), rows)
+    return len(rows)
+
+
+def per_room_queries(rooms, end):
+    db = SessionLocal()
+    try:
+        result = []
+        for room_id in range(1, rooms + 1):
+            bookings = db.query(models.Booking).filter(
+                models.Booking.room_id == room_id,
+                models.Booking.start_time < end,
+                models.Booking.end_time > START,
+            ).order_by(models.Booking.start_time).all()
+            result.append((room_id, [(b.start_time, b.end_time) for b in bookings]))
+        return result
+    finally:
+        db.close()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--per-day", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    total = seed(args.rooms, args.days, args.per_day)
+    end = START + timedelta(days=args.days)
+
+    token = jwt.encode({"sub": "bench", "role": "user"}, main.SECRET_KEY, algorithm="HS256")
+    client = TestClient(main.app)
+    params = {
+        "room_ids": ",".join(str(i) for i in range(1, args.rooms + 1)),
+        "start": START.isoformat(),
+        "end": end.isoformat(),
+    }
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def json_mode():
+        assert client.get("/availability", params=params, headers=headers).status_code == 200
+
+    def ndjson_mode():
+        response = client.get("/availability", params={**params, "format": "ndjson"}, headers=headers)
+        assert response.status_code == 200
+
+    print(f"{args.rooms} rooms x {args.days} days, {total} bookings")
+    print(f"per-room queries (ORM, no merge): {timed(lambda: per_room_queries(args.rooms, end), args.repeat) * 1000:8.1f}ms")
+    print(f"GET /availability json:            {timed(json_mode, args.repeat) * 1000:8.1f}ms")
+    print(f"GET /availability ndjson:          {timed(ndjson_mode, args.repeat) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,124 @@
+# bookings_service/benchmarks/bench_availability_index.py
+"""
+Conflict-check latency: overlap query vs the in-memory availability index.
+
+Run from bookings_service/:
+    python -m benchmarks.bench_availability_index --sizes 10000,100000,1000000
+    python -m benchmarks.bench_availability_index --database-url postgresql+psycopg2://...
+
+Each size seeds `--rooms` rooms with back-to-back one-hour bookings (years of
+history per room), then times random conflict checks through both paths,
+and crud.create_booking_checked for the conflicting ones: rejected with the
+availability query, or by the index alone.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import crud, models, schemas  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.availability_index import AvailabilityIndex  # noqa: E402
+
+BASE = datetime(2020, 1, 1)
+
+
+def seed(engine, size, rooms):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    per_room = size // rooms
+    table = models.Booking.__table__
+    with engine.begin() as conn:
+        for room_id in range(1, rooms + 1):
+            conn.execute(insert(table), [
+                {
+                    "user_username": "bench",
+                    "room_id": room_id,
+                    "start_time": BASE + timedelta(hours=2 * i),
+                    "end_time": BASE + timedelta(hours=2 * i + 1),
+                }
+                for i in range(per_room)
+            ])
+    return per_room
+
+
+def probes(n, rooms, per_room):
+    rng = random.Random(42)
+    out = []
+    for _ in range(n):
+        start = BASE + timedelta(minutes=rng.randrange(per_room * 120))
+        out.append((rng.randint(1, rooms), start, start + timedelta(minutes=30)))
+    return out
+
+
+def timed(check, checks):
+    samples, answers = [], []
+    for room_id, start, end in checks:
+        t0 = time.perf_counter()
+        answers.append(check(room_id, start, end))
+        samples.append(time.perf_counter() - t0)
+    return samples, answers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_index.db"
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        per_room = seed(engine, size, args.rooms)
+        checks = probes(args.checks, args.rooms, per_room)
+        db = Session()
+
+        # crud.check_room_availability always asks the database
+        db_samples, db_answers = timed(
+            lambda r, s, e: crud.check_room_availability(db, r, s, e), checks
+        )
+
+        index = AvailabilityIndex()
+        t0 = time.perf_counter()
+        index.warm(db)
+        warm = time.perf_counter() - t0
+        idx_samples, idx_answers = timed(index.is_available, checks)
+        assert idx_answers == db_answers, "index disagrees with the database"
+
+        clashes = [c for c, free in zip(checks, db_answers) if not free]
+        reject = {}
+        for name, checker in (("query", AvailabilityIndex()), ("index", index)):
+            crud.availability_index = checker  # a fresh index is not warmed: the database decides
+            samples, answers = timed(
+                lambda r, s, e: crud.create_booking_checked(
+                    db, "bench", schemas.BookingCreate(room_id=r, start_time=s, end_time=e)
+                ),
+                clashes,
+            )
+            assert answers == [None] * len(clashes)
+            reject[name] = statistics.mean(samples)
+
+        print(
+            f"bookings={size:<8} warm={warm:6.2f}s  "
+            f"query mean={statistics.mean(db_samples) * 1e6:8.1f}us  "
+            f"index mean={statistics.mean(idx_samples) * 1e6:6.2f}us  "
+            f"speedup={statistics.mean(db_samples) / statistics.mean(idx_samples):6.0f}x  "
+            f"reject: query {reject['query'] * 1e6:8.1f}us index {reject['index'] * 1e6:6.1f}us"
+        )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bookings_service/benchmarks/bench_outbox.py
+"""
+Booking writes + events with the broker down for the first half of the run:
+the event row is written in the booking transaction and the background
+relay publishes it once the broker is back.
+
+Reports request latency, how many events reached the broker once it came
+back, and whether each room's events arrived in commit order.
+
+Run from bookings_service/:  python -m benchmarks.bench_outbox [-n 2000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_outbox.db")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud, events, messaging, outbox, schemas  # noqa: E402
+from app.database import Base  # noqa: E402
+from benchmarks.stub_broker import StubBroker  # noqa: E402
+
+ROOMS = 50
+BASE = datetime(2040, 1, 1)
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def in_room_order(broker):
+    last = {}
+    for _, body, props in broker.messages:
+        event = events.decode(body, props.content_type)
+        if event["booking_id"] <= last.get(event["room_id"], 0):
+            return False
+        last[event["room_id"]] = event["booking_id"]
+    return True
+
+
+def run(n, Session):
+    broker = StubBroker(connect_latency=0.004, publish_latency=0.0002)
+    broker.down = True
+    messaging.PUBLISHER_MODE = "pooled"
+
+    relay = outbox.OutboxRelay(connection_factory=broker.connection_factory)
+    outbox.outbox_relay = relay
+    relay.start(Session)
+
+    samples = []
+    db = Session()
+    for i in range(n):
+        if i == n // 2:
+            broker.down = False
+        start = BASE + timedelta(hours=i)
+        slot = schemas.BookingCreate(room_id=i % ROOMS, start_time=start, end_time=start + timedelta(minutes=30))
+        t0 = time.perf_counter()
+        crud.create_booking(db, "bench", slot)
+        samples.append(time.perf_counter() - t0)
+    db.close()
+
+    # Give the relay time to catch up after the outage
+    deadline = time.monotonic() + 60
+    while len(broker.messages) < n and time.monotonic() < deadline:
+        time.sleep(0.05)
+    relay.stop()
+
+    print(
+        f"outbox  mean {statistics.mean(samples) * 1000:6.2f} ms  "
+        f"p99 {percentile(samples, 0.99) * 1000:6.2f} ms  "
+        f"delivered {len(broker.messages)}/{n}  room order {'ok' if in_room_order(broker) else 'BROKEN'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    run(args.n, Session)
+
+
+if __name__ == "__main__":
+    main()
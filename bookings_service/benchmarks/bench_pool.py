@@ -0,0 +1,99 @@
+# bookings_service/benchmarks/bench_pool.py
+"""
+Throughput vs connection pool size.
+
+32 worker threads (the default anyio threadpool is 40) each run a small
+booking query and hold the connection for a further --rtt ms, standing in
+for the network round trips of a real Postgres transaction. For each pool
+size: requests/s and the checkout wait histogram from db_pool.
+
+Run from bookings_service/:  python -m benchmarks.bench_pool [-n 3000] [--threads 32] [--rtt 2]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_pool.db")
+
+from sqlalchemy import create_engine, select  # noqa: E402
+
+from app import models  # noqa: E402
+from smartmeeting_common import db_pool  # noqa: E402
+from app.database import Base  # noqa: E402
+
+POOL_SIZES = (1, 2, 4, 8, 16, 32)
+
+
+def seed(url):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    base = datetime(2040, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(models.Booking.__table__.insert(), [
+            {"user_username": "bench", "room_id": i % 20, "start_time": base + timedelta(hours=i),
+             "end_time": base + timedelta(hours=i, minutes=30)}
+            for i in range(2000)
+        ])
+    engine.dispose()
+
+
+def run(url, pool_size, n, threads, rtt):
+    options = dict(db_pool.engine_options(url), pool_size=pool_size, max_overflow=0, pool_timeout=60)
+    engine = create_engine(url, **options)
+    with engine.connect():
+        pass  # open the first connection before timing
+    db_pool.pool_metrics.reset()
+
+    query = select(models.Booking.id).where(models.Booking.room_id == 7).limit(20)
+    remaining = [n]
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            with engine.connect() as conn:
+                conn.execute(query).all()
+                time.sleep(rtt)
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    stats = db_pool.pool_stats(engine)
+    engine.dispose()
+    hist = stats["wait_histogram"]
+    slow = hist["le_500ms"] + hist["le_1000ms"] + hist["le_5000ms"] + hist["inf"]
+    print(
+        f"pool_size={pool_size:<3} {n / elapsed:7.0f} req/s  "
+        f"wait mean {stats['wait_mean_ms']:7.2f} ms  max {stats['wait_max_ms']:7.1f} ms  "
+        f">100ms {slow / stats['checkouts']:5.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=3000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rtt", type=float, default=2.0, help="ms each request holds its connection")
+    args = parser.parse_args()
+
+    url = os.environ["DATABASE_URL"]
+    seed(url)
+    print(f"{args.threads} threads, {args.n} requests, {args.rtt} ms held per request")
+    for size in POOL_SIZES:
+        run(url, size, args.n, args.threads, args.rtt / 1000)
+
+
+if __name__ == "__main__":
+    main()
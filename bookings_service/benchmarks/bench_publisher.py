@@ -0,0 +1,92 @@
+# bookings_service/benchmarks/bench_publisher.py
+"""
+Drain the same outbox backlog through each relay transport against the
+stub broker:
+
+  direct   one connection per message (the original publish path)
+  pooled   long-lived channels, rooms spread over --channels I/O threads
+  async    aio-pika, rooms in flight at once (up to --in-flight)
+
+Reports events/s, connections opened and whether every room's events
+arrived in commit order.
+
+Run from bookings_service/:  python -m benchmarks.bench_publisher
+"""
+import argparse
+import os
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_publisher.db")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import events, messaging, models, outbox  # noqa: E402
+from app.database import Base  # noqa: E402
+from benchmarks.stub_broker import StubBroker  # noqa: E402
+
+
+def seed(Session, n, rooms):
+    db = Session()
+    db.query(models.OutboxEvent).delete()
+    for i in range(n):
+        outbox.enqueue(db, events.booking_event("booking_created", "bench", i % rooms, i + 1))
+    db.commit()
+    db.close()
+
+
+def in_room_order(broker):
+    last = {}
+    for _, body, props in broker.messages:
+        event = events.decode(body, props.content_type)
+        if event["booking_id"] <= last.get(event["room_id"], 0):
+            return False
+        last[event["room_id"]] = event["booking_id"]
+    return True
+
+
+def run(name, publisher, broker, Session, n):
+    db = Session()
+    t0 = time.perf_counter()
+    while outbox.relay_batch(db, publisher)["fetched"]:
+        pass
+    elapsed = time.perf_counter() - t0
+    db.close()
+    publisher.close()
+    print(
+        f"{name:<8} {n / elapsed:8.0f} events/s  connections {broker.connections:<5} "
+        f"delivered {len(broker.messages)}/{n}  room order {'ok' if in_room_order(broker) else 'BROKEN'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=messaging.PUBLISHER_CHANNELS)
+    parser.add_argument("--in-flight", type=int, default=messaging.PUBLISHER_MAX_IN_FLIGHT)
+    parser.add_argument("--connect-ms", type=float, default=4.0)
+    parser.add_argument("--publish-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    messaging.PUBLISHER_MODE = "pooled"  # so enqueue stages the events
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    transports = {
+        "direct": lambda broker: messaging.DirectPublisher(broker.connection_factory),
+        "pooled": lambda broker: messaging.BookingPublisher(broker.connection_factory, channels=args.channels),
+        "async": lambda broker: messaging.AsyncBookingPublisher(broker.aio_connect, max_in_flight=args.in_flight),
+    }
+    print(f"n={args.n} rooms={args.rooms} connect={args.connect_ms}ms publish={args.publish_ms}ms")
+    for name, make in transports.items():
+        seed(Session, args.n, args.rooms)
+        broker = StubBroker(args.connect_ms / 1000, args.publish_ms / 1000)
+        run(name, make(broker), broker, Session, args.n)
+
+
+if __name__ == "__main__":
+    main()
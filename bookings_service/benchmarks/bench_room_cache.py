@@ -0,0 +1,78 @@
+# bookings_service/benchmarks/bench_room_cache.py
+"""
+POST /bookings latency with and without the room-existence cache, against a
+local stand-in rooms server.
+
+Run from bookings_service/:  python -m benchmarks.bench_room_cache
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.stub_rooms import start_in_thread
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench_room_cache.db"
+os.environ.setdefault("RABBITMQ_PUBLISHER", "off")
+
+import jwt  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main  # noqa: E402
+from app.room_cache import RoomCache  # noqa: E402
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def run(label, client, headers, n, rooms, offset):
+    samples = []
+    base = datetime(2030, 1, 1) + timedelta(days=offset)
+    for i in range(n):
+        start = base + timedelta(hours=i)
+        body = {
+            "room_id": (i % rooms) + 1,
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=30)).isoformat(),
+        }
+        t0 = time.perf_counter()
+        response = client.post("/bookings", json=body, headers=headers)
+        samples.append(time.perf_counter() - t0)
+        assert response.status_code == 201, response.text
+
+    print(
+        f"{label:<10} n={n:<5} mean={statistics.mean(samples) * 1000:6.2f}ms "
+        f"p50={statistics.median(samples) * 1000:6.2f}ms "
+        f"p99={percentile(samples, 0.99) * 1000:6.2f}ms  "
+        f"cache={main.room_cache.stats()}"
+    )
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1000)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--rooms-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server, url = start_in_thread(latency=args.rooms_latency_ms / 1000)
+    main.ROOMS_SERVICE_URL = url
+
+    token = jwt.encode({"sub": "bench", "role": "user"}, main.SECRET_KEY, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(main.app)
+
+    for offset, (label, ttl) in enumerate((("uncached", 0), ("cached", 300))):
+        main.room_cache = RoomCache(ttl=ttl)
+        server.requests = 0
+        run(label, client, headers, args.n, args.rooms, offset * 365)
+        print(f"           rooms_service requests: {server.requests}")
+
+
+if __name__ == "__main__":
+    main_()
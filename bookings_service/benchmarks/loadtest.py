@@ -0,0 +1,138 @@
+# bookings_service/benchmarks/loadtest.py
+"""
+Load-test harness for the sync (/bookings) and async (/async/bookings) routes.
+
+Against a running service:
+    python -m benchmarks.loadtest --url http://localhost:8003
+
+Self-contained (uvicorn + stand-in rooms server, broker disabled):
+    python -m benchmarks.loadtest --serve --database-url postgresql+psycopg2://...
+
+Without --database-url, --serve uses a throwaway SQLite file; its single
+writer lock then dominates both numbers.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import jwt
+
+from benchmarks.stub_rooms import start_in_thread
+
+SECRET_KEY = "supersecret_ranim_key"
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+async def run(url, path, total, concurrency, token, room_offset):
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], 0
+    counter = iter(range(total))
+    base = datetime(2030, 1, 1)
+
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                # One room per request so bookings never conflict
+                start = base + timedelta(hours=i % 24)
+                body = {
+                    "room_id": room_offset + i + 1,
+                    "start_time": start.isoformat(),
+                    "end_time": (start + timedelta(minutes=30)).isoformat(),
+                }
+                t0 = time.perf_counter()
+                try:
+                    response = await client.post(path, json=body)
+                    ok = response.status_code == 201
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - t0)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(
+        f"{path:<16} n={total:<6} c={concurrency:<4} "
+        f"rps={total / elapsed:8.1f} "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms "
+        f"p99={percentile(latencies, 0.99) * 1000:7.1f}ms "
+        f"errors={errors}"
+    )
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(rooms_url, database_url=None, **extra_env):
+    """Start the bookings service under uvicorn on a free port."""
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "loadtest.db")
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        ROOMS_SERVICE_URL=rooms_url,
+        RABBITMQ_PUBLISHER="off",
+        **extra_env,
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/")
+            break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    return proc, url
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8003")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("--rooms-latency-ms", type=float, default=5.0)
+    parser.add_argument("--database-url", help="DATABASE_URL for --serve")
+    args = parser.parse_args()
+
+    token = jwt.encode({"sub": "loadtest", "role": "user"}, SECRET_KEY, algorithm="HS256")
+    proc = None
+    url = args.url
+    if args.serve:
+        _, rooms_url = start_in_thread(latency=args.rooms_latency_ms / 1000, max_room_id=10**9)
+        proc, url = serve(rooms_url, args.database_url)
+
+    try:
+        asyncio.run(run(url, "/bookings", args.requests, args.concurrency, token, 0))
+        asyncio.run(run(url, "/async/bookings", args.requests, args.concurrency, token, args.requests))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
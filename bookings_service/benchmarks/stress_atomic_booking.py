@@ -0,0 +1,110 @@
+# bookings_service/benchmarks/stress_atomic_booking.py
+"""
+Concurrency stress test for booking creation: thousands of parallel,
+deliberately overlapping POST /bookings requests on a handful of rooms,
+followed by a check that no room ended up double-booked.
+
+    python -m benchmarks.stress_atomic_booking --serve --mode atomic
+    python -m benchmarks.stress_atomic_booking --serve --mode check
+    python -m benchmarks.stress_atomic_booking --url http://localhost:8003
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+import jwt
+
+from benchmarks.loadtest import SECRET_KEY, serve
+from benchmarks.stub_rooms import start_in_thread
+
+
+async def fire(url, token, total, concurrency, rooms, slots):
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency)
+    rng = random.Random(7)
+    base = datetime(2035, 1, 1, 8)
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as client:
+        async def one():
+            # Random 60-minute windows at 15-minute offsets: most of them overlap
+            start = base + timedelta(minutes=15 * rng.randrange(slots))
+            body = {
+                "room_id": rng.randint(1, rooms),
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=60)).isoformat(),
+            }
+            async with semaphore:
+                try:
+                    response = await client.post("/bookings", json=body)
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError:
+                    statuses["transport error"] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+        listing = await client.get(f"/users/{jwt.decode(token, options={'verify_signature': False})['sub']}/bookings")
+        listing.raise_for_status()
+
+    return statuses, elapsed, listing.json()
+
+
+def double_bookings(bookings):
+    by_room = defaultdict(list)
+    for b in bookings:
+        by_room[b["room_id"]].append((b["start_time"], b["end_time"]))
+    overlaps = 0
+    for intervals in by_room.values():
+        intervals.sort()
+        for (_, prev_end), (start, _) in zip(intervals, intervals[1:]):
+            if start < prev_end:
+                overlaps += 1
+    return overlaps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8003")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--database-url")
+    parser.add_argument("--mode", default="atomic", choices=["atomic", "check"])
+    parser.add_argument("-n", "--requests", type=int, default=3000)
+    parser.add_argument("-c", "--concurrency", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=5)
+    parser.add_argument("--slots", type=int, default=40)
+    args = parser.parse_args()
+
+    # A fresh user per run so the final listing only contains this run
+    username = f"stress-{uuid.uuid4().hex[:8]}"
+    token = jwt.encode({"sub": username, "role": "user"}, SECRET_KEY, algorithm="HS256")
+
+    proc, url = None, args.url
+    if args.serve:
+        _, rooms_url = start_in_thread(latency=0.0)
+        proc, url = serve(rooms_url, args.database_url, BOOKING_MODE=args.mode)
+
+    try:
+        statuses, elapsed, bookings = asyncio.run(
+            fire(url, token, args.requests, args.concurrency, args.rooms, args.slots)
+        )
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print(f"requests={args.requests} concurrency={args.concurrency} elapsed={elapsed:.2f}s "
+          f"rps={args.requests / elapsed:.1f}")
+    print(f"statuses={dict(statuses)}")
+    print(f"bookings created={len(bookings)} double-bookings={double_bookings(bookings)}")
+
+
+if __name__ == "__main__":
+    main()
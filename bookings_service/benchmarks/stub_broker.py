@@ -0,0 +1,95 @@
+# bookings_service/benchmarks/stub_broker.py
+"""
+In-process stand-in for RabbitMQ used by the benchmarks.
+
+It mimics the cost profile of a local broker: opening a connection pays a
+TCP + AMQP handshake, and every confirmed publish pays one round trip.
+aio_connect() is the same broker for the aio-pika publisher, where round
+trips of concurrent publishes overlap.
+"""
+import asyncio
+import threading
+import time
+
+
+class StubBroker:
+    def __init__(self, connect_latency=0.004, publish_latency=0.0002):
+        self.connect_latency = connect_latency
+        self.publish_latency = publish_latency
+        self.messages = []
+        self.connections = 0
+        self.down = False
+        self._lock = threading.Lock()
+
+    def connection_factory(self):
+        if self.down:
+            raise ConnectionError("stub broker is down")
+        time.sleep(self.connect_latency)
+        with self._lock:
+            self.connections += 1
+        return StubConnection(self)
+
+    async def aio_connect(self):
+        if self.down:
+            raise ConnectionError("stub broker is down")
+        await asyncio.sleep(self.connect_latency)
+        with self._lock:
+            self.connections += 1
+        return StubAioConnection(self)
+
+
+class StubConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return StubChannel(self.broker)
+
+    def close(self):
+        self.is_open = False
+
+
+class StubChannel:
+    def __init__(self, broker):
+        self.broker = broker
+
+    def confirm_delivery(self):
+        pass
+
+    def queue_declare(self, queue, durable=False, **kwargs):
+        time.sleep(self.broker.publish_latency)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, **kwargs):
+        if self.broker.down:
+            raise ConnectionError("stub broker is down")
+        time.sleep(self.broker.publish_latency)
+        with self.broker._lock:
+            self.broker.messages.append((routing_key, body, properties))
+
+
+class StubAioConnection:
+    def __init__(self, broker):
+        self.broker = broker
+
+    async def channel(self, publisher_confirms=False):
+        return StubAioChannel(self.broker)
+
+    async def close(self):
+        pass
+
+
+class StubAioChannel:
+    def __init__(self, broker):
+        self.broker = broker
+        self.default_exchange = self
+
+    async def declare_queue(self, name, durable=False, **kwargs):
+        await asyncio.sleep(self.broker.publish_latency)
+
+    async def publish(self, message, routing_key, **kwargs):
+        if self.broker.down:
+            raise ConnectionError("stub broker is down")
+        await asyncio.sleep(self.broker.publish_latency)
+        with self.broker._lock:
+            self.broker.messages.append((routing_key, message.body, message))
@@ -0,0 +1,61 @@
+# bookings_service/benchmarks/stub_rooms.py
+"""
+Local stand-in for rooms_service: GET /rooms/{id} answers 200 for ids up to
+max_room_id and 404 otherwise, after an optional artificial delay.
+
+Run from bookings_service/:  python -m benchmarks.stub_rooms --port 8002
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_server(port=0, latency=0.002, max_room_id=100_000):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            server.requests += 1
+            time.sleep(latency)
+            try:
+                room_id = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+            except ValueError:
+                room_id = -1
+
+            if self.path.startswith("/rooms/") and 0 < room_id <= max_room_id:
+                status, body = 200, {"id": room_id, "name": f"Room {room_id}"}
+            else:
+                status, body = 404, {"detail": "Room not found"}
+
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.requests = 0
+    return server
+
+
+def start_in_thread(**kwargs):
+    """Start the stand-in server on a free port; returns (server, base_url)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    make_server(args.port, args.latency_ms / 1000).serve_forever()
@@ -36,3 +36,757 @@ def test_create_booking_invalid_room():
         headers=headers_user
     )
     assert response.status_code in (400, 404)
+
+
+# ------------------------------------------------
+# RABBITMQ PUBLISHERS (OUTBOX RELAY TRANSPORTS)
+# ------------------------------------------------
+import asyncio
+from types import SimpleNamespace
+from pamqp.commands import Basic
+from app import events, messaging
+
+
+class FakeChannel:
+    def __init__(self, sent, fail):
+        self.sent = sent
+        self.fail = fail
+
+    def confirm_delivery(self):
+        pass
+
+    def queue_declare(self, queue, durable=False):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        if self.fail:
+            self.fail.pop()
+            raise ConnectionError("broker went away")
+        self.sent.append(body)
+
+
+class FakeConnection:
+    is_open = True
+
+    def __init__(self, sent, fail):
+        self._channel = FakeChannel(sent, fail)
+
+    def channel(self):
+        return self._channel
+
+    def close(self):
+        self.is_open = False
+
+
+def _message(room_id, booking_id):
+    body, content_type = events.encode(events.booking_event("booking_created", "ranim", room_id, booking_id))
+    return SimpleNamespace(room_id=room_id, event_type="booking_created", body=body, content_type=content_type)
+
+
+def _sent_by_room(bodies):
+    by_room = {}
+    for body in bodies:
+        event = events.decode(body, events.MSGPACK_CONTENT_TYPE)
+        by_room.setdefault(event["room_id"], []).append(event["booking_id"])
+    return by_room
+
+
+def test_pooled_publisher_reuses_connections_and_keeps_room_order():
+    sent, opened = [], []
+
+    def factory():
+        opened.append(1)
+        return FakeConnection(sent, [])
+
+    publisher = messaging.BookingPublisher(connection_factory=factory, channels=2)
+    messages = [_message(room, n) for n in range(10) for room in (1, 2, 3)]
+    assert publisher.send(messages) == [None] * 30
+    assert publisher.send(messages[:3]) == [None] * 3
+    publisher.close()
+
+    assert len(opened) == 2  # one per channel, kept for the second batch
+    assert _sent_by_room(sent) == {room: list(range(10)) + [0] for room in (1, 2, 3)}
+
+
+def test_direct_publisher_opens_a_connection_per_message():
+    sent, opened = [], []
+
+    def factory():
+        opened.append(1)
+        return FakeConnection(sent, [])
+
+    publisher = messaging.DirectPublisher(connection_factory=factory)
+    assert publisher.send([_message(1, 1), _message(2, 2)]) == [None, None]
+    assert len(opened) == 2 and len(sent) == 2
+
+
+class FakeAioExchange:
+    """Confirms after a short await; nacks every message of the given rooms."""
+
+    def __init__(self, nack_rooms=()):
+        self.nack_rooms = set(nack_rooms)
+        self.sent = []
+        self.in_flight = self.peak = 0
+
+    async def publish(self, message, routing_key):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        event = events.decode(message.body, message.content_type)
+        if event["room_id"] in self.nack_rooms:
+            return Basic.Nack()
+        self.sent.append(message.body)
+        return Basic.Ack()
+
+
+class FakeAioConnection:
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    async def channel(self, publisher_confirms=False):
+        async def declare_queue(name, durable=False):
+            pass
+
+        return SimpleNamespace(default_exchange=self.exchange, declare_queue=declare_queue)
+
+    async def close(self):
+        pass
+
+
+def test_async_publisher_overlaps_rooms_and_skips_after_a_nack():
+    exchange = FakeAioExchange(nack_rooms={2})
+
+    async def connect():
+        return FakeAioConnection(exchange)
+
+    publisher = messaging.AsyncBookingPublisher(connect=connect, max_in_flight=8)
+    results = publisher.send([_message(room, n) for n in range(5) for room in (1, 2, 3, 4)])
+    publisher.close()
+
+    # Room 2: first message nacked, the rest held back; other rooms all confirmed
+    assert messaging.is_rejection(results[1])
+    assert all(isinstance(results[i], messaging.Skipped) for i in range(5, 20, 4))
+    assert [r for i, r in enumerate(results) if i % 4 != 1] == [None] * 15
+    assert _sent_by_room(exchange.sent) == {room: list(range(5)) for room in (1, 3, 4)}
+    assert exchange.peak > 1  # rooms were in flight at the same time
+
+
+# ------------------------------------------------
+# ASYNC BOOKING ROUTES
+# ------------------------------------------------
+import requests
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app import main as main_module
+from app.database import get_async_db
+
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_bookings.db")
+AsyncTestingDB = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+async def override_async_db():
+    async with AsyncTestingDB() as db:
+        yield db
+
+
+app.dependency_overrides[get_async_db] = override_async_db
+
+
+def test_async_booking_create_update_delete(monkeypatch):
+    async def fake_room_exists(room_id):
+        return True
+
+    monkeypatch.setattr(main_module, "room_exists_async", fake_room_exists)
+    monkeypatch.setattr(messaging, "PUBLISHER_MODE", "off")
+
+    slot = {"room_id": 4242, "start_time": "2031-01-01T09:00:00", "end_time": "2031-01-01T10:00:00"}
+    created = client.post("/async/bookings", json=slot, headers=headers_user)
+    assert created.status_code == 201
+    booking_id = created.json()["id"]
+
+    conflict = client.post("/async/bookings", json=slot, headers=headers_user)
+    assert conflict.status_code == 400
+
+    updated = client.put(
+        f"/async/bookings/{booking_id}",
+        json={"end_time": "2031-01-01T11:00:00"},
+        headers=headers_user,
+    )
+    assert updated.status_code == 200
+    assert updated.json()["end_time"].startswith("2031-01-01T11:00:00")
+
+    deleted = client.delete(f"/async/bookings/{booking_id}", headers=headers_user)
+    assert deleted.status_code == 200
+
+
+# ------------------------------------------------
+# ROOM CACHE
+# ------------------------------------------------
+from app.room_cache import RoomCache, MISSING, handle_room_event
+
+
+def test_room_cache_ttl_lru_and_negative_entries():
+    now = [0.0]
+    cache = RoomCache(ttl=60, negative_ttl=5, max_size=2, clock=lambda: now[0])
+
+    cache.put(1, {"id": 1})
+    cache.put(2, None)
+    assert cache.get(1) == {"id": 1}
+    assert cache.get(2) is None
+
+    now[0] = 10  # negative entry expired, positive still fresh
+    assert cache.get(2) is MISSING
+    assert cache.get(1) == {"id": 1}
+
+    cache.put(3, {"id": 3})
+    cache.put(4, {"id": 4})  # evicts room 1 (least recently used)
+    assert cache.get(1) is MISSING
+
+    handle_room_event(b'{"room_id": 3}', cache)
+    assert cache.get(3) is MISSING
+    assert cache.stats()["hits"] == 3
+
+    # Malformed events are dropped without touching the cache
+    handle_room_event(b'{"room_id": "abc"}', cache)
+    handle_room_event(b'{"room_id": [4]}', cache)
+    assert cache.get(4) == {"id": 4}
+
+
+def test_room_exists_hits_rooms_service_once(monkeypatch):
+    calls = []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"id": 77}
+
+    def fake_get(url, timeout):
+        calls.append(url)
+        return Response()
+
+    monkeypatch.setattr(main_module, "room_cache", RoomCache(ttl=60))
+    monkeypatch.setattr(requests, "get", fake_get)
+
+    assert main_module.room_exists(77)
+    assert main_module.room_exists(77)
+    assert len(calls) == 1
+
+
+# ------------------------------------------------
+# AVAILABILITY INDEX
+# ------------------------------------------------
+from datetime import datetime
+from app import crud, models
+from app.availability_index import AvailabilityIndex
+
+
+def test_availability_index_matches_database():
+    db = TestingDB()
+    try:
+        db.query(models.Booking).filter(models.Booking.room_id.in_([901, 902])).delete()
+        db.add_all([
+            models.Booking(user_username="a", room_id=901,
+                           start_time=datetime(2032, 1, 1, 9), end_time=datetime(2032, 1, 1, 10)),
+            models.Booking(user_username="a", room_id=901,
+                           start_time=datetime(2032, 1, 1, 12), end_time=datetime(2032, 1, 1, 13)),
+            # overlapping legacy rows: the index must defer to the database
+            models.Booking(user_username="a", room_id=902,
+                           start_time=datetime(2032, 1, 1, 9), end_time=datetime(2032, 1, 1, 12)),
+            models.Booking(user_username="a", room_id=902,
+                           start_time=datetime(2032, 1, 1, 10), end_time=datetime(2032, 1, 1, 11)),
+        ])
+        db.commit()
+
+        index = AvailabilityIndex()
+        index.warm(db)
+
+        assert index.is_available(901, datetime(2032, 1, 1, 10), datetime(2032, 1, 1, 12)) is True
+        assert index.is_available(901, datetime(2032, 1, 1, 9, 30), datetime(2032, 1, 1, 11)) is False
+        assert index.is_available(901, datetime(2032, 1, 1, 8), datetime(2032, 1, 1, 14)) is False
+        assert index.is_available(902, datetime(2032, 1, 1, 13), datetime(2032, 1, 1, 14)) is None
+
+        first = db.query(models.Booking).filter_by(room_id=901).order_by(models.Booking.start_time).first()
+        assert index.is_available(
+            901, datetime(2032, 1, 1, 9), datetime(2032, 1, 1, 11), exclude_booking_id=first.id
+        ) is True
+
+        index.add(10**9, 901, datetime(2032, 1, 1, 14), datetime(2032, 1, 1, 15))
+        assert index.is_available(901, datetime(2032, 1, 1, 14, 30), datetime(2032, 1, 1, 16)) is False
+        index.remove(10**9, 901, datetime(2032, 1, 1, 14))
+        assert index.is_available(901, datetime(2032, 1, 1, 14, 30), datetime(2032, 1, 1, 16)) is True
+    finally:
+        db.close()
+
+
+def test_availability_index_rejects_conflicts_without_a_query(monkeypatch):
+    from sqlalchemy import event
+
+    db = TestingDB()
+    try:
+        db.query(models.Booking).filter(models.Booking.room_id == 920).delete()
+        db.add(models.Booking(user_username="b", room_id=920,
+                              start_time=datetime(2032, 2, 1, 9), end_time=datetime(2032, 2, 1, 10)))
+        db.commit()
+        index = AvailabilityIndex()
+        index.warm(db)
+        monkeypatch.setattr(crud, "availability_index", index)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            clash = schemas.BookingCreate(room_id=920, start_time=datetime(2032, 2, 1, 9, 30),
+                                          end_time=datetime(2032, 2, 1, 10, 30))
+            assert crud.create_booking_checked(db, "a", clash) is None
+            assert statements == []
+
+            # "free" skips the availability query: one conditional INSERT
+            free = schemas.BookingCreate(room_id=920, start_time=datetime(2032, 2, 1, 11),
+                                         end_time=datetime(2032, 2, 1, 12))
+            assert crud.create_booking_checked(db, "a", free) is not None
+            assert sum(sql.lstrip().upper().startswith("SELECT") for sql in statements) == 0
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert index.is_available(920, datetime(2032, 2, 1, 11), datetime(2032, 2, 1, 12)) is False
+
+        # Not warmed: the database decides
+        monkeypatch.setattr(crud, "availability_index", AvailabilityIndex())
+        assert crud.create_booking_checked(db, "a", clash) is None
+    finally:
+        db.close()
+
+
+def test_availability_index_stays_off_with_several_workers(monkeypatch):
+    from app import availability_index as index_module
+
+    monkeypatch.setattr(index_module, "AVAILABILITY_INDEX", True)
+    monkeypatch.setattr(index_module, "WEB_CONCURRENCY", 4)
+    index_module.start_availability_index(TestingDB)
+    assert index_module.availability_index.ready is False
+
+
+# ------------------------------------------------
+# ATOMIC BOOKING MODE
+# ------------------------------------------------
+from concurrent.futures import ThreadPoolExecutor
+from app import schemas
+
+
+def test_atomic_booking_under_contention():
+    db = TestingDB()
+    db.query(models.Booking).filter(models.Booking.room_id == 903).delete()
+    db.commit()
+    db.close()
+
+    def attempt(i):
+        session = TestingDB()
+        try:
+            # Every request overlaps 09:00-10:00 on the same room
+            booking = schemas.BookingCreate(
+                room_id=903,
+                start_time=datetime(2033, 1, 1, 9, i % 30),
+                end_time=datetime(2033, 1, 1, 10, i % 30),
+            )
+            return crud.create_booking_atomic(session, f"user{i}", booking)
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(attempt, range(64)))
+
+    assert sum(row is not None for row in results) == 1
+
+    db = TestingDB()
+    assert db.query(models.Booking).filter(models.Booking.room_id == 903).count() == 1
+    db.close()
+
+
+def test_atomic_mode_routes(monkeypatch):
+    monkeypatch.setattr(crud, "BOOKING_MODE", "atomic")
+    monkeypatch.setattr(main_module, "room_exists", lambda room_id: True)
+    monkeypatch.setattr(messaging, "PUBLISHER_MODE", "off")
+
+    db = TestingDB()
+    db.query(models.Booking).filter(models.Booking.room_id == 904).delete()
+    db.commit()
+    db.close()
+
+    slot = {"room_id": 904, "start_time": "2033-02-01T09:00:00", "end_time": "2033-02-01T10:00:00"}
+    created = client.post("/bookings", json=slot, headers=headers_user)
+    assert created.status_code == 201
+    assert created.json()["user_username"] == "ranim"
+
+    assert client.post("/bookings", json=slot, headers=headers_user).status_code == 400
+
+    moved = client.put(
+        f"/bookings/{created.json()['id']}",
+        json={"start_time": "2033-02-01T09:30:00", "end_time": "2033-02-01T10:30:00"},
+        headers=headers_user,
+    )
+    assert moved.status_code == 200
+    assert moved.json()["start_time"].startswith("2033-02-01T09:30:00")
+
+
+from sqlalchemy import text
+
+
+def test_check_mode_maps_overlap_constraint_to_400(monkeypatch):
+    # Stand-in for the Postgres exclusion constraint: SQLite raises an
+    # IntegrityError from the trigger, just like the constraint would
+    overlap = """
+        WHEN EXISTS (SELECT 1 FROM bookings b WHERE b.room_id = NEW.room_id AND b.id != NEW.id
+                     AND b.start_time < NEW.end_time AND b.end_time > NEW.start_time)
+        BEGIN SELECT RAISE(ABORT, 'bookings_no_overlap'); END
+    """
+    monkeypatch.setattr(crud, "BOOKING_MODE", "check")
+    monkeypatch.setattr(main_module, "room_exists", lambda room_id: True)
+    # Both racing requests passed the availability check
+    monkeypatch.setattr(crud, "check_room_availability", lambda *args, **kwargs: True)
+
+    db = TestingDB()
+    db.query(models.Booking).filter(models.Booking.room_id == 921).delete()
+    db.commit()
+    db.close()
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TRIGGER test_no_overlap_insert BEFORE INSERT ON bookings {overlap}"))
+        conn.execute(text(f"CREATE TRIGGER test_no_overlap_update BEFORE UPDATE ON bookings {overlap}"))
+    try:
+        first = client.post("/bookings", headers=headers_user, json={
+            "room_id": 921, "start_time": "2033-03-01T09:00:00", "end_time": "2033-03-01T10:00:00"})
+        assert first.status_code == 201
+        later = client.post("/bookings", headers=headers_user, json={
+            "room_id": 921, "start_time": "2033-03-01T11:00:00", "end_time": "2033-03-01T12:00:00"})
+
+        lost = client.post("/bookings", headers=headers_user, json={
+            "room_id": 921, "start_time": "2033-03-01T09:30:00", "end_time": "2033-03-01T10:30:00"})
+        assert lost.status_code == 400 and lost.json()["detail"] == "Room already booked"
+
+        moved = client.put(f"/bookings/{later.json()['id']}", headers=headers_user, json={
+            "start_time": "2033-03-01T09:30:00", "end_time": "2033-03-01T11:30:00"})
+        assert moved.status_code == 400 and moved.json()["detail"] == "Time conflict"
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TRIGGER test_no_overlap_insert"))
+            conn.execute(text("DROP TRIGGER test_no_overlap_update"))
+
+
+# ------------------------------------------------
+# AVAILABILITY SEARCH
+# ------------------------------------------------
+import json
+
+
+def test_availability_free_busy():
+    db = TestingDB()
+    db.query(models.Booking).filter(models.Booking.room_id.in_([905, 906])).delete()
+    db.add_all([
+        models.Booking(user_username="a", room_id=905,
+                       start_time=datetime(2034, 1, 1, 13), end_time=datetime(2034, 1, 1, 14, 30)),
+        models.Booking(user_username="a", room_id=905,
+                       start_time=datetime(2034, 1, 1, 14, 30), end_time=datetime(2034, 1, 1, 16)),
+    ])
+    db.commit()
+    db.close()
+
+    params = {"room_ids": "905,906", "start": "2034-01-01T14:00:00", "end": "2034-01-01T17:00:00"}
+    response = client.get("/availability", params=params, headers=headers_user)
+    assert response.status_code == 200
+
+    rooms = {room["room_id"]: room for room in response.json()["rooms"]}
+    assert rooms[905]["busy"] == [["2034-01-01T14:00:00", "2034-01-01T16:00:00"]]
+    assert rooms[905]["free"] == [["2034-01-01T16:00:00", "2034-01-01T17:00:00"]]
+    assert rooms[906]["busy"] == []
+
+    streamed = client.get("/availability", params={**params, "format": "ndjson"}, headers=headers_user)
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["room_id"] for line in lines] == [905, 906]
+
+
+# ------------------------------------------------
+# BULK / RECURRING BOOKINGS
+# ------------------------------------------------
+def test_weekly_series_reports_partial_failures(monkeypatch):
+    monkeypatch.setattr(main_module, "room_exists", lambda room_id: True)
+    monkeypatch.setattr(messaging, "PUBLISHER_MODE", "off")
+
+    db = TestingDB()
+    db.query(models.Booking).filter(models.Booking.room_id == 907).delete()
+    # Blocks the third week of the series
+    db.add(models.Booking(user_username="other", room_id=907,
+                          start_time=datetime(2036, 1, 15, 9, 30), end_time=datetime(2036, 1, 15, 10, 30)))
+    db.commit()
+    db.close()
+
+    body = {
+        "room_id": 907,
+        "recurrence": {
+            "start_time": "2036-01-01T09:00:00",
+            "end_time": "2036-01-01T10:00:00",
+            "freq": "weekly",
+            "count": 4,
+        },
+    }
+    response = client.post("/bookings/bulk", json=body, headers=headers_user)
+    assert response.status_code == 201
+
+    report = response.json()
+    assert (report["booked"], report["failed"]) == (3, 1)
+    assert [r["status"] for r in report["results"]] == ["booked", "booked", "conflict", "booked"]
+
+    # Same series again: nothing left to book
+    again = client.post("/bookings/bulk", json=body, headers=headers_user)
+    assert again.status_code == 409
+    assert again.json()["booked"] == 0
+
+
+from app import series
+
+
+def test_recurrence_mixes_aware_and_naive_datetimes():
+    rule = {"start_time": "2036-03-01T09:00:00+02:00", "end_time": "2036-03-01T10:00:00+02:00", "freq": "daily"}
+    aware_start = schemas.BookingSeriesCreate(room_id=922, recurrence=dict(rule, until="2036-03-03T07:00:00"))
+    assert series.expand(aware_start) == [
+        (datetime(2036, 3, d, 7), datetime(2036, 3, d, 8)) for d in (1, 2, 3)
+    ]
+
+    naive_start = schemas.BookingSeriesCreate(room_id=922, recurrence={
+        "start_time": "2036-03-01T07:00:00", "end_time": "2036-03-01T08:00:00", "freq": "daily",
+        "until": "2036-03-02T09:00:00+02:00",
+    })
+    assert len(series.expand(naive_start)) == 2
+
+
+# ------------------------------------------------
+# KEYSET PAGINATION / NDJSON STREAMING
+# ------------------------------------------------
+def test_user_bookings_keyset_pagination_and_stream():
+    db = TestingDB()
+    db.query(models.Booking).filter(models.Booking.user_username == "pager").delete()
+    db.add_all([
+        models.Booking(user_username="pager", room_id=908,
+                       start_time=datetime(2037, 1, 1, h), end_time=datetime(2037, 1, 1, h, 30))
+        for h in range(5)
+    ])
+    db.commit()
+    db.close()
+
+    token = jwt.encode({"sub": "pager", "role": "user"}, SECRET_KEY, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.get("/users/pager/bookings", params={"limit": 3}, headers=headers)
+    assert len(first.json()) == 3
+    cursor = first.headers["X-Next-After-Id"]
+
+    second = client.get("/users/pager/bookings", params={"limit": 3, "after_id": cursor}, headers=headers)
+    assert len(second.json()) == 2
+    assert "X-Next-After-Id" not in second.headers
+
+    streamed = client.get("/users/pager/bookings", params={"stream": True}, headers=headers)
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    ids = [json.loads(line)["id"] for line in streamed.text.splitlines()]
+    assert ids == sorted(ids) and len(ids) == 5
+
+
+# ------------------------------------------------
+# VERSIONED EVENTS
+# ------------------------------------------------
+from datetime import timedelta
+from app import events
+
+
+def test_booking_events_are_versioned_msgpack():
+    start = datetime(2031, 1, 6, 9, 0)
+    event = events.booking_event(
+        "booking_created", "ranim", 7, 42, start=start, end=start + timedelta(hours=1)
+    )
+    body, content_type = events.encode(event)
+    assert content_type == events.MSGPACK_CONTENT_TYPE
+
+    decoded = events.decode(body, content_type)
+    assert decoded["v"] == events.EVENT_SCHEMA_VERSION
+    assert decoded["type"] == "booking_created"
+    assert (decoded["username"], decoded["room_id"], decoded["booking_id"]) == ("ranim", 7, 42)
+    assert decoded["end"] - decoded["start"] == 3600
+    assert len(body) < len(json.dumps(decoded))
+
+
+# ------------------------------------------------
+# TRANSACTIONAL OUTBOX
+# ------------------------------------------------
+import pika
+from app import outbox
+
+
+class OutboxChannel:
+    """Records what was published; nacks the given event types/rooms, drops after `drop_after` sends."""
+
+    def __init__(self, nack_types=(), drop_after=None, nack_rooms=()):
+        self.sent = []
+        self.nack_types = set(nack_types)
+        self.nack_rooms = set(nack_rooms)
+        self.drop_after = drop_after
+
+    def confirm_delivery(self):
+        pass
+
+    def queue_declare(self, queue, durable=False):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        event = events.decode(body, properties.content_type)
+        if self.drop_after is not None and len(self.sent) >= self.drop_after:
+            raise pika.exceptions.StreamLostError("connection lost")
+        if event["type"] in self.nack_types or event["room_id"] in self.nack_rooms:
+            raise pika.exceptions.NackError([])
+        self.sent.append((event["type"], event["room_id"], event["booking_id"]))
+
+
+def _through(channel):
+    """A one-channel pooled publisher whose connection hands out `channel`."""
+    return messaging.BookingPublisher(
+        connection_factory=lambda: SimpleNamespace(channel=lambda: channel, is_open=False), channels=1
+    )
+
+
+def _outbox_rows(db):
+    return db.query(models.OutboxEvent).order_by(models.OutboxEvent.id).all()
+
+
+def _outbox_scenario(monkeypatch):
+    monkeypatch.setattr(messaging, "PUBLISHER_MODE", "pooled")
+    db = TestingDB()
+    db.query(models.OutboxEvent).delete()
+    db.query(models.Booking).filter(models.Booking.room_id.in_([910, 911])).delete()
+    db.commit()
+
+    start = datetime(2038, 1, 1, 9)
+    a = crud.create_booking(db, "ranim", schemas.BookingCreate(
+        room_id=910, start_time=start, end_time=start + timedelta(hours=1)))
+    crud.update_booking(db, a.id, schemas.BookingUpdate(end_time=start + timedelta(hours=2)))
+    b = crud.create_booking(db, "eliya", schemas.BookingCreate(
+        room_id=911, start_time=start, end_time=start + timedelta(hours=1)))
+    crud.delete_booking(db, a.id)
+    return db, a.id, b.id
+
+
+def test_outbox_events_commit_with_bookings_and_keep_room_order(monkeypatch):
+    db, a, b = _outbox_scenario(monkeypatch)
+    assert [r.event_type for r in _outbox_rows(db)] == [
+        "booking_created", "booking_updated", "booking_created", "booking_deleted",
+    ]
+
+    # Room 910's update is nacked: its delete waits behind it, room 911 carries on
+    nacking = OutboxChannel(nack_types={"booking_updated"})
+    assert outbox.relay_batch(db, _through(nacking)) == {"fetched": 4, "published": 2, "failed": 1, "dead": 0}
+    assert nacking.sent == [("booking_created", 910, a), ("booking_created", 911, b)]
+    assert [(r.event_type, r.attempts) for r in _outbox_rows(db)] == [
+        ("booking_updated", 1), ("booking_deleted", 0),
+    ]
+
+    retry = OutboxChannel()
+    assert outbox.relay_batch(db, _through(retry))["fetched"] == 0  # retry not due yet
+    later = datetime.utcnow() + timedelta(hours=1)
+    assert outbox.relay_batch(db, _through(retry), now=later)["published"] == 2
+    assert retry.sent == [("booking_updated", 910, a), ("booking_deleted", 910, a)]
+    assert _outbox_rows(db) == []
+    db.close()
+
+
+def test_outbox_poisoned_room_does_not_stall_other_rooms(monkeypatch):
+    db, a, b = _outbox_scenario(monkeypatch)
+    db.query(models.OutboxDeadLetter).delete()
+    db.commit()
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+    poison = OutboxChannel(nack_rooms={910})
+    now = datetime.utcnow()
+
+    # Room 910's head fills the first batch and is rejected...
+    assert outbox.relay_batch(db, _through(poison), batch_size=2, now=now)["failed"] == 1
+    # ...so the next batches leave room 910 out and room 911 goes through
+    assert outbox.relay_batch(db, _through(poison), batch_size=2, now=now)["published"] == 1
+    assert poison.sent == [("booking_created", 911, b)]
+
+    # Second rejection reaches the cap: dead-lettered, the room resumes
+    later = now + timedelta(hours=1)
+    assert outbox.relay_batch(db, _through(poison), batch_size=2, now=later)["dead"] == 1
+    retry = OutboxChannel()
+    assert outbox.relay_batch(db, _through(retry), batch_size=2, now=later)["published"] == 2
+    assert retry.sent == [("booking_updated", 910, a), ("booking_deleted", 910, a)]
+
+    dead = db.query(models.OutboxDeadLetter).all()
+    assert [(d.event_type, d.room_id, d.attempts) for d in dead] == [("booking_created", 910, 2)]
+    assert _outbox_rows(db) == []
+    db.close()
+
+
+def test_outbox_keeps_unpublished_events_when_broker_drops(monkeypatch):
+    db, a, b = _outbox_scenario(monkeypatch)
+
+    with pytest.raises(pika.exceptions.StreamLostError):
+        outbox.relay_batch(db, _through(OutboxChannel(drop_after=1)))
+    # The one confirmed event is gone, the rest is retried from the same row
+    assert [r.event_type for r in _outbox_rows(db)] == [
+        "booking_updated", "booking_created", "booking_deleted",
+    ]
+    db.close()
+
+
+# ------------------------------------------------
+# METRICS
+# ------------------------------------------------
+from smartmeeting_common import metrics
+
+
+def test_metrics_by_route_template_with_db_and_outbound_calls(monkeypatch):
+    class Response:
+        status_code = 404
+
+    monkeypatch.setattr(main_module, "room_cache", RoomCache(ttl=60))
+    monkeypatch.setattr(requests, "get", lambda url, timeout: Response())
+    metrics.reset()
+
+    token = jwt.encode({"sub": "metrics", "role": "user"}, SECRET_KEY, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/users/metrics/bookings", headers=headers).status_code == 200
+    assert client.get("/users/other/bookings", headers=headers).status_code == 403
+    assert client.get("/no/such/page").status_code == 404
+    assert not main_module.room_exists(4242)
+
+    text = client.get("/metrics").text
+    route = 'method="GET",route="/users/{username}/bookings"'
+    assert f'http_requests_total{{{route},status="200"}} 1' in text
+    assert f'http_requests_total{{{route},status="403"}} 1' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in text
+    assert f'http_request_duration_seconds_count{{{route}}} 2' in text
+    assert f'db_queries_per_request_bucket{{{route},le="0"}} 1' in text  # the 403 never queried
+    assert f'db_queries_total{{{route}}} 1' in text
+    assert 'outbound_requests_total{kind="http",target="rooms_service",outcome="ok"} 1' in text
+
+
+import time
+
+
+def test_outbox_relay_reuses_connection_and_reconnects(monkeypatch):
+    db, a, b = _outbox_scenario(monkeypatch)
+    db.close()
+    sent, fail, opened = [], [True], []
+
+    def factory():
+        opened.append(1)
+        return FakeConnection(sent, fail)
+
+    publisher = messaging.BookingPublisher(connection_factory=factory, channels=1)
+    relay = outbox.OutboxRelay(publisher=publisher, poll_interval=0.01)
+    relay.start(TestingDB)
+    deadline = time.monotonic() + 5
+    while len(sent) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    relay.stop(timeout=5)
+
+    assert len(sent) == 4
+    assert len(opened) == 2  # initial connection + one reconnect
+    assert relay.stats()["reconnects"] == 1
+    db = TestingDB()
+    assert _outbox_rows(db) == []
+    db.close()
@@ -0,0 +1,13 @@
+# common/smartmeeting_common/__init__.py
+"""
+Modules shared by the Smart Meeting Room services, installed into each
+service image (see the services' Dockerfiles):
+
+    auth            JWT verification with a verified-token cache
+    db_pool         engine pool settings and pool metrics
+    metrics         Prometheus text metrics middleware
+    migrate         versioned schema migrations runner
+    pagination      keyset pages and NDJSON streaming
+    profiler        on-demand CPU / allocation profiling
+    response_cache  read-through GET response cache with ETags
+"""
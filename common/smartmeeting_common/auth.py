@@ -0,0 +1,115 @@
+# common/smartmeeting_common/auth.py
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from fastapi import HTTPException
+
+
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecret_ranim_key")
+ALGORITHM = "HS256"
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))  # 0 disables the cache
+# Upper bound for tokens without an exp claim
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+
+class TokenCache:
+    """
+    LRU of already verified tokens: sha256(token) -> (expires_at, sub, role).
+
+    Entries expire at the token's own exp (wall clock), so a cached token is
+    never accepted after jwt.decode would have rejected it. Only successful
+    verifications are cached.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], entry[2]
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, payload: dict, username: str, role):
+        if self.max_size <= 0:
+            return
+        expires_at = self.clock() + self.ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        with self._lock:
+            self._entries[key] = (expires_at, username, role)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+token_cache = TokenCache()
+
+
+# ------------------------------------------------
+# JWT DECODE
+# ------------------------------------------------
+def verify_token(token: str):
+    """Full signature and claims check; returns (payload, username, role)."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.DecodeError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    username = payload.get("sub")
+    if not username:
+        raise HTTPException(status_code=401, detail="Invalid token: missing subject")
+    return payload, username, payload.get("role")
+
+
+def decode_token(token: str, cache: TokenCache = token_cache):
+    """Return (username, role), verifying the token only on a cache miss."""
+    key = cache.key(token)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    payload, username, role = verify_token(token)
+    cache.put(key, payload, username, role)
+    return username, role
@@ -0,0 +1,185 @@
+# common/smartmeeting_common/db_pool.py
+"""
+Connection pool settings and metrics for this service's engine.
+
+All services share one Postgres, so each sizes its pool through the
+environment (per worker process):
+
+    DB_POOL_SIZE            persistent connections (5)
+    DB_MAX_OVERFLOW         extra connections under load, closed when returned (10)
+    DB_POOL_TIMEOUT         seconds a checkout may wait before failing (30)
+    DB_POOL_PRE_PING        1 = test connections on checkout (1)
+    DB_POOL_RECYCLE         seconds before a connection is replaced, -1 = never (1800)
+    DB_STATEMENT_TIMEOUT_MS Postgres statement_timeout, 0 = server default (0)
+    DB_PGBOUNCER            1 = behind PgBouncer in transaction mode (0)
+
+In PgBouncer mode PgBouncer does the pooling: the engine uses NullPool,
+sends no startup options (PgBouncer rejects them) and asyncpg's prepared
+statement caches are off. Set statement_timeout on the database role
+instead (ALTER ROLE ... SET statement_timeout).
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Checkout wait histogram plus timeout count, shared by the engine's pool."""
+
+    def __init__(self, buckets=WAIT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        i = 0
+        while i < len(self.buckets) and ms > self.buckets[i]:
+            i += 1
+        with self._lock:
+            self.counts[i] += 1
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"le_{b}ms" for b in self.buckets] + ["inf"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_mean_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_histogram": dict(zip(labels, self.counts)),
+            }
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class _TimedCheckout:
+    # Time spent getting a connection out of the pool: queueing for a free
+    # one, or opening a new one (overflow / NullPool)
+    metrics = pool_metrics
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeout()
+            raise
+        finally:
+            self.metrics.observe(time.perf_counter() - t0)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+def _is_postgres(url: str) -> bool:
+    return url.startswith("postgresql")
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    # One connection per thread/engine; a QueuePool would hand out empty databases
+    return url.startswith("sqlite") and (":memory:" in url or url.split("://", 1)[1] in ("", "/"))
+
+
+def engine_options(url: str) -> dict:
+    """Keyword arguments for create_engine(url, ...)."""
+    if _is_memory_sqlite(url):
+        return {}
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_PGBOUNCER and _is_postgres(url):
+        options["poolclass"] = TimedNullPool
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if DB_STATEMENT_TIMEOUT_MS and _is_postgres(url):
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def async_engine_options(url: str) -> dict:
+    """Keyword arguments for create_async_engine(url, ...)."""
+    if _is_memory_sqlite(url):
+        return {}
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    is_asyncpg = url.startswith("postgresql+asyncpg")
+    if DB_PGBOUNCER and is_asyncpg:
+        options["poolclass"] = NullPool
+        options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+
+    options.update(
+        poolclass=TimedAsyncQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if DB_STATEMENT_TIMEOUT_MS and is_asyncpg:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return options
+
+
+def pool_stats(engine) -> dict:
+    """Current pool occupancy plus the checkout wait metrics."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats = {"pool": type(pool).__name__, "pgbouncer": DB_PGBOUNCER}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+            timeout_s=pool.timeout(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
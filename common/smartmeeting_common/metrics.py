@@ -0,0 +1,294 @@
+# common/smartmeeting_common/metrics.py
+"""
+Prometheus text metrics without a client library.
+
+MetricsMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task
+per request) recording, per method + route template:
+
+    http_requests_total{method,route,status}
+    http_request_duration_seconds (histogram)
+    http_requests_in_flight
+    db_queries_total / db_query_duration_seconds_total
+    db_queries_per_request (histogram, spots N+1 patterns)
+
+DB queries are counted by SQLAlchemy cursor events into a per-request
+context variable (it follows sync routes into the threadpool). Outbound
+calls are wrapped in timed_call("http" | "amqp", target):
+
+    outbound_requests_total{kind,target,outcome}
+    outbound_request_duration_seconds{kind,target} (histogram)
+
+Caches report each lookup through observe_cache(cache, hit):
+
+    cache_requests_total{cache,result}
+    cache_hit_ratio{cache}
+
+Request metrics are only touched from the event loop thread so they need
+no lock; outbound calls and cache lookups come from worker threads and
+take one.
+"""
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Requests that matched no route share one label instead of one per URL
+UNMATCHED = "<unmatched>"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        """Cumulative Prometheus bucket lines."""
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class _RouteStats:
+    __slots__ = ("statuses", "latency", "db_queries", "db_seconds", "queries_per_request")
+
+    def __init__(self):
+        self.statuses = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.queries_per_request = Histogram(QUERY_COUNT_BUCKETS)
+
+
+class _RequestDB:
+    """DB work done while serving one request."""
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_routes = {}
+_outbound = {}
+_outbound_lock = threading.Lock()
+_caches = {}
+_in_flight = 0
+_current_request: ContextVar = ContextVar("metrics_request", default=None)
+
+
+# ------------------------------------------------
+# HTTP
+# ------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_flight
+        status = 500  # if the app raises before sending a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db = _RequestDB()
+        token = _current_request.set(db)
+        _in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            _in_flight -= 1
+            _current_request.reset(token)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED
+            _record(scope["method"], route, status, elapsed, db)
+
+
+def _record(method, route, status, elapsed, db):
+    key = (method, route)
+    stats = _routes.get(key)
+    if stats is None:
+        stats = _routes[key] = _RouteStats()
+    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+    stats.latency.observe(elapsed)
+    stats.db_queries += db.queries
+    stats.db_seconds += db.seconds
+    stats.queries_per_request.observe(db.queries)
+
+
+# ------------------------------------------------
+# DATABASE
+# ------------------------------------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    db = _current_request.get()
+    start = getattr(context, "_metrics_start", None)
+    if db is not None and start is not None:
+        db.queries += 1
+        db.seconds += perf_counter() - start
+
+
+# ------------------------------------------------
+# OUTBOUND CALLS
+# ------------------------------------------------
+def observe_outbound(kind: str, target: str, seconds: float, outcome: str = "ok"):
+    key = (kind, target)
+    with _outbound_lock:
+        entry = _outbound.get(key)
+        if entry is None:
+            entry = _outbound[key] = ({}, Histogram(LATENCY_BUCKETS))
+        outcomes, latency = entry
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latency.observe(seconds)
+
+
+@contextmanager
+def timed_call(kind: str, target: str):
+    """Time an outbound HTTP request / AMQP publish; exceptions count as errors."""
+    start = perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        observe_outbound(kind, target, perf_counter() - start, outcome)
+
+
+# ------------------------------------------------
+# CACHES
+# ------------------------------------------------
+def observe_cache(cache: str, hit: bool):
+    with _outbound_lock:
+        counts = _caches.get(cache)
+        if counts is None:
+            counts = _caches[cache] = [0, 0]
+        counts[0 if hit else 1] += 1
+
+
+# ------------------------------------------------
+# EXPOSITION
+# ------------------------------------------------
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+def render() -> str:
+    routes = sorted(_routes.items())
+    lines = [
+        "# HELP http_requests_total HTTP requests by route and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route), stats in routes:
+        for status, n in sorted(stats.statuses.items()):
+            lines.append(f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {n}")
+
+    lines += [
+        "# HELP http_request_duration_seconds Time to the end of the response.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), stats in routes:
+        lines.extend(stats.latency.samples("http_request_duration_seconds", _labels(method=method, route=route)))
+
+    lines += [
+        "# HELP http_requests_in_flight Requests being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {_in_flight}",
+        "# HELP db_queries_total SQL statements executed while serving requests.",
+        "# TYPE db_queries_total counter",
+    ]
+    for (method, route), stats in routes:
+        lines.append(f"db_queries_total{{{_labels(method=method, route=route)}}} {stats.db_queries}")
+    lines += [
+        "# HELP db_query_duration_seconds_total Time spent in SQL statements while serving requests.",
+        "# TYPE db_query_duration_seconds_total counter",
+    ]
+    for (method, route), stats in routes:
+        lines.append(f"db_query_duration_seconds_total{{{_labels(method=method, route=route)}}} {stats.db_seconds}")
+    lines += [
+        "# HELP db_queries_per_request SQL statements per request.",
+        "# TYPE db_queries_per_request histogram",
+    ]
+    for (method, route), stats in routes:
+        lines.extend(stats.queries_per_request.samples("db_queries_per_request", _labels(method=method, route=route)))
+
+    with _outbound_lock:
+        outbound = sorted((key, (dict(outcomes), latency)) for key, (outcomes, latency) in _outbound.items())
+        lines += [
+            "# HELP outbound_requests_total Outbound HTTP requests and AMQP publishes.",
+            "# TYPE outbound_requests_total counter",
+        ]
+        for (kind, target), (outcomes, _) in outbound:
+            for outcome, n in sorted(outcomes.items()):
+                lines.append(f"outbound_requests_total{{{_labels(kind=kind, target=target, outcome=outcome)}}} {n}")
+        lines += [
+            "# HELP outbound_request_duration_seconds Outbound call latency.",
+            "# TYPE outbound_request_duration_seconds histogram",
+        ]
+        for (kind, target), (_, latency) in outbound:
+            lines.extend(latency.samples("outbound_request_duration_seconds", _labels(kind=kind, target=target)))
+
+        caches = sorted((cache, tuple(counts)) for cache, counts in _caches.items())
+    lines += [
+        "# HELP cache_requests_total Cache lookups by result.",
+        "# TYPE cache_requests_total counter",
+    ]
+    for cache, (hits, misses) in caches:
+        lines.append(f"cache_requests_total{{{_labels(cache=cache, result='hit')}}} {hits}")
+        lines.append(f"cache_requests_total{{{_labels(cache=cache, result='miss')}}} {misses}")
+    lines += [
+        "# HELP cache_hit_ratio Hits over lookups since the process started.",
+        "# TYPE cache_hit_ratio gauge",
+    ]
+    for cache, (hits, misses) in caches:
+        lines.append(f"cache_hit_ratio{{{_labels(cache=cache)}}} {hits / (hits + misses)}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint(request):
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+def reset():
+    """Forget everything recorded so far (tests, benchmarks)."""
+    _routes.clear()
+    with _outbound_lock:
+        _outbound.clear()
+        _caches.clear()
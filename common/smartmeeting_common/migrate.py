@@ -0,0 +1,91 @@
+# common/smartmeeting_common/migrate.py
+"""
+Versioned schema migrations, applied once per deploy by a separate
+command instead of create_all in every worker at import time:
+
+    python -m app.migrations            apply pending migrations
+    python -m app.migrations --status   list applied / pending ones
+
+Each service's app/migrations.py defines SERVICE and MIGRATIONS, ordered
+(version, name, fn(engine)), and hands itself to main(). Applied versions
+are recorded per service in the shared schema_migrations table. On
+Postgres a session advisory lock serialises concurrent runs, so replicas started together never apply a step twice.
+
+Step 1 of every service creates the tables from the models, so a new
+database gets the current schema straight away; every later step runs
+against databases that may already have what it adds (created by step 1,
+or by create_all before migrations existed) and must check first.
+A step that returns False is left pending and retried on the next run.
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+
+# Arbitrary constant shared by every service: one migration run at a time
+ADVISORY_LOCK_KEY = 720_231
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("service", String(64), primary_key=True),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions(conn, service: str) -> set:
+    rows = conn.execute(
+        select(schema_migrations.c.version).where(schema_migrations.c.service == service)
+    )
+    return {version for (version,) in rows}
+
+
+def pending(engine, migrations) -> list:
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        done = applied_versions(conn, migrations.SERVICE)
+    return [m for m in migrations.MIGRATIONS if m[0] not in done]
+
+
+def upgrade(engine, migrations) -> list:
+    """Apply every pending migration in order; returns the versions applied."""
+    applied = []
+    with engine.connect() as lock_conn:
+        if engine.dialect.name == "postgresql":
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            lock_conn.commit()
+        try:
+            # Re-read under the lock: another run may have just finished
+            for version, name, step in pending(engine, migrations):
+                if step(engine) is False:
+                    print(f"❌ Migration {version} ({name}) did not complete; will retry next run", flush=True)
+                    break
+                with engine.begin() as conn:
+                    conn.execute(schema_migrations.insert().values(
+                        service=migrations.SERVICE, version=version, name=name, applied_at=datetime.utcnow()
+                    ))
+                print(f"🚀 Applied migration {version}: {name}", flush=True)
+                applied.append(version)
+        finally:
+            if engine.dialect.name == "postgresql":
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                lock_conn.commit()
+    return applied
+
+
+def main(engine, migrations):
+    parser = argparse.ArgumentParser(description=f"Schema migrations for {migrations.SERVICE}")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying any")
+    args = parser.parse_args()
+
+    if args.status:
+        todo = {m[0] for m in pending(engine, migrations)}
+        for version, name, _ in migrations.MIGRATIONS:
+            print(f"{version:>4}  {'pending' if version in todo else 'applied':<8} {name}")
+        return
+    upgrade(engine, migrations)
+    if not pending(engine, migrations):
+        print(f"Schema of {migrations.SERVICE} is up to date", flush=True)
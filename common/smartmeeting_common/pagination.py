@@ -0,0 +1,54 @@
+# common/smartmeeting_common/pagination.py
+import json
+from datetime import date, datetime
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+
+NEXT_CURSOR_HEADER = "X-Next-After-Id"
+STREAM_BATCH_SIZE = 1000
+
+
+def keyset(query, id_column, limit: int = None, after_id: int = None):
+    """Order by id and return the page after `after_id` (everything if no limit)."""
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    query = query.order_by(id_column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def set_next_cursor(response: Response, items: list, limit: int = None):
+    # A full page means there may be more rows after the last id
+    if limit is not None and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(items[-1].id)
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_ndjson(db: Session, build_query, schema) -> StreamingResponse:
+    """
+    Stream `build_query(session)` as NDJSON, one `schema` object per line.
+
+    Rows come from a server-side cursor in batches, so memory stays flat no
+    matter how large the table is. The stream opens its own session on the
+    same bind because the request-scoped one may be closed before the body
+    has been sent.
+    """
+    bind = db.get_bind()
+    fields = list(getattr(schema, "model_fields", None) or schema.__fields__)
+
+    def generate():
+        with Session(bind=bind) as stream_db:
+            for obj in build_query(stream_db).yield_per(STREAM_BATCH_SIZE):
+                row = {name: getattr(obj, name) for name in fields}
+                yield json.dumps(row, default=_default) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
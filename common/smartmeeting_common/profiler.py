@@ -0,0 +1,123 @@
+# common/smartmeeting_common/profiler.py
+"""
+On-demand profiling for the admin endpoint. Nothing is installed until
+someone asks, and everything stops when the window ends.
+
+    cpu    a background thread samples every thread's Python stack
+           (sys._current_frames) every interval; the request threads
+           themselves run at full speed
+    alloc  tracemalloc for the window; the live allocations made during
+           it, weighted by bytes
+
+Both return folded stacks ("root;caller;callee weight" per line), which
+flamegraph.pl, speedscope and inferno read directly.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_MIN_INTERVAL_MS = 1.0
+# tracemalloc walks this many frames per allocation: 8 costs ~2x on a
+# request while the window is open, 32 costs ~4x (reviews_service/benchmarks/bench_profiler.py)
+PROFILER_ALLOC_FRAMES = int(os.getenv("PROFILER_ALLOC_FRAMES", "8"))
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is still running in this process."""
+
+
+def _short_path(path: str) -> str:
+    if path.startswith(os.getcwd()):
+        return os.path.relpath(path)
+    return "/".join(path.split(os.sep)[-2:])
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _stack(frame, labels: dict) -> list:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+            label = labels[code] = _frame_label(code)
+        stack.append(label)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _folded(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+def _bounded(seconds: float) -> float:
+    return max(0.0, min(seconds, PROFILER_MAX_SECONDS))
+
+
+def _exclusive(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _busy.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already running")
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _busy.release()
+    return wrapper
+
+
+@_exclusive
+def sample_cpu(seconds: float, interval_ms: float = 5.0) -> str:
+    """Sample all threads' stacks for `seconds`; blocks the calling thread."""
+    interval = max(interval_ms, PROFILER_MIN_INTERVAL_MS) / 1000
+    deadline = time.monotonic() + _bounded(seconds)
+    own = threading.get_ident()
+    names, labels = {}, {}
+    counts = Counter()
+
+    while time.monotonic() < deadline:
+        if len(names) != threading.active_count():
+            names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            thread = names.get(ident, str(ident)).replace(";", ":").replace(" ", "_")
+            counts[";".join([thread, *_stack(frame, labels)])] += 1
+        time.sleep(interval)
+    return _folded(counts)
+
+
+@_exclusive
+def sample_alloc(seconds: float) -> str:
+    """Trace allocations for `seconds`; blocks the calling thread."""
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(PROFILER_ALLOC_FRAMES)
+    try:
+        time.sleep(_bounded(seconds))
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    counts = Counter()
+    for stat in snapshot.statistics("traceback"):
+        # tracemalloc frames run oldest first and carry no function names
+        stack = [f"{_short_path(frame.filename)}:{frame.lineno}".replace(";", ":") for frame in stat.traceback]
+        counts[";".join(stack)] += stat.size
+    return _folded(counts)
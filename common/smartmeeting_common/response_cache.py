@@ -0,0 +1,263 @@
+# common/smartmeeting_common/response_cache.py
+"""
+Read-through cache of serialized GET responses, with ETags.
+
+A route asks for an Entry (JSON body, strong ETag and a few fields the
+route still checks itself, e.g. the owner) by tag + variant. On a miss the
+object is loaded, serialized through the response schema once and
+stored; a hit skips the query and Pydantic entirely. Every key belongs to
+a tag ("review:7", "room:3", ...) and crud invalidates tags after each
+committed write. Invalidation bumps the tag's generation, which is part
+of the key, so all variants under it (every page of a room) are orphaned
+at once and simply age out.
+
+Backends (RESPONSE_CACHE_BACKEND):
+
+  memory  per-process LRU + TTL (default); other workers see a write
+          only after RESPONSE_CACHE_TTL, like the user/room caches
+  shared  one SQLite file per host (RESPONSE_CACHE_PATH) read and written
+          by every worker, so invalidations are seen by all of them at
+          once; a local stand-in for a networked cache (get/set/incr is
+          all it needs, the same interface Redis or memcached offer)
+  off     no caching
+
+ETag / If-None-Match works with every backend, "off" included: a client
+holding the current version gets 304 with no body.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from . import metrics
+
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "/tmp/response_cache.db")
+
+
+class Entry(NamedTuple):
+    etag: str
+    body: bytes
+    meta: dict
+
+
+def _encode(entry: Entry) -> bytes:
+    return json.dumps([entry.etag, entry.meta]).encode() + b"\n" + entry.body
+
+
+def _decode(raw: bytes) -> Entry:
+    head, body = raw.split(b"\n", 1)
+    etag, meta = json.loads(head)
+    return Entry(etag, body, meta)
+
+
+# ------------------------------------------------
+# BACKENDS
+# ------------------------------------------------
+class MemoryBackend:
+    """LRU + TTL dict for this process."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, clock=time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, tag: str) -> int:
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag: str):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "evictions": self.evictions}
+
+
+class SharedBackend:
+    """
+    SQLite file shared by every worker on the host. Expired rows are purged
+    every PURGE_EVERY writes; generations never expire.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, clock=time.time):
+        self.path = path
+        self.clock = clock  # wall clock: shared between processes
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS generations (tag TEXT PRIMARY KEY, n INTEGER NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a cache: losing it on power failure is fine
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, self.clock())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        now = self.clock()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, value, now + ttl))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+    def generation(self, tag: str) -> int:
+        row = self._conn().execute("SELECT n FROM generations WHERE tag = ?", (tag,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, tag: str):
+        self._conn().execute(
+            "INSERT INTO generations VALUES (?, 1) ON CONFLICT(tag) DO UPDATE SET n = n + 1", (tag,)
+        )
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM generations")
+
+    def stats(self) -> dict:
+        return {"size": self._conn().execute("SELECT count(*) FROM entries").fetchone()[0]}
+
+
+# ------------------------------------------------
+# CACHE
+# ------------------------------------------------
+class ResponseCache:
+    def __init__(self, backend=None, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._adapters = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl > 0
+
+    def _serialize(self, obj, schema) -> bytes:
+        adapter = self._adapters.get(schema)
+        if adapter is None:
+            adapter = self._adapters[schema] = TypeAdapter(schema)
+        return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+    def entry(self, obj, schema, meta=None) -> Entry:
+        body = self._serialize(obj, schema)
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        return Entry(etag, body, meta(obj) if meta else {})
+
+    def load(self, name: str, tag: str, variant: str, fetch, schema, meta=None):
+        """
+        The cached Entry for tag/variant, or fetch() it (None = not found,
+        never cached). `name` labels the hit/miss metrics; `meta(obj)`
+        returns the small dict stored alongside the body.
+        """
+        if not self.enabled:
+            obj = fetch()
+            return None if obj is None else self.entry(obj, schema, meta)
+
+        # Read the generation once: if a write bumps it while we load, what
+        # we store lands under the old key and is never served
+        key = f"{tag}#{self.backend.generation(tag)}|{variant}"
+        raw = self.backend.get(key)
+        metrics.observe_cache(name, raw is not None)
+        if raw is not None:
+            return _decode(raw)
+
+        obj = fetch()
+        if obj is None:
+            return None
+        entry = self.entry(obj, schema, meta)
+        self.backend.set(key, _encode(entry), self.ttl)
+        return entry
+
+    def invalidate(self, *tags: str):
+        """Call after the write has committed."""
+        if self.backend is not None:
+            for tag in tags:
+                self.backend.bump(tag)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        stats = {"backend": RESPONSE_CACHE_BACKEND if self.backend is not None else "off", "ttl": self.ttl}
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def respond(request: Request, entry: Entry, headers: dict = None) -> Response:
+    """200 with the cached body, or 304 without one if the client already has it."""
+    headers = dict(headers or {}, ETag=entry.etag)
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+def make_backend(kind: str = RESPONSE_CACHE_BACKEND):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "shared":
+        return SharedBackend()
+    if kind == "off":
+        return None
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {kind!r} (memory, shared or off)")
+
+
+response_cache = ResponseCache(make_backend())
@@ -0,0 +1,249 @@
+# notification_service/app/consumer.py
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from . import crud, events, push
+
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+BOOKING_QUEUE = "booking_notifications"
+
+# A batch is written when it reaches CONSUMER_BATCH_SIZE messages or its
+# first message is CONSUMER_BATCH_MS old, whichever comes first
+CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "200"))
+CONSUMER_BATCH_MS = int(os.getenv("CONSUMER_BATCH_MS", "50"))
+# Unacked messages the broker may push ahead; must exceed the batch size
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", str(CONSUMER_BATCH_SIZE * 2)))
+CONSUMER_MAX_BACKOFF = 10.0
+
+
+class BatchingConsumer:
+    """
+    Drains booking_notifications in batches with manual acks.
+
+    Messages are acked (multiple=True) only after their batch is committed,
+    so a crash redelivers instead of losing them. If the database is
+    unreachable the batch is nacked back onto the queue; if a batch fails
+    for any other reason it is retried row by row and only the offending
+    messages are rejected.
+
+    on_stored(rows) is called with the committed rows (ids included) after
+    they were acked; the worker uses it to feed live push.
+    """
+
+    def __init__(
+        self,
+        channel,
+        session_factory,
+        queue: str = BOOKING_QUEUE,
+        batch_size: int = CONSUMER_BATCH_SIZE,
+        flush_interval: float = CONSUMER_BATCH_MS / 1000,
+        prefetch: int = CONSUMER_PREFETCH,
+        stop=None,
+        clock=time.monotonic,
+        on_stored=None,
+    ):
+        self.channel = channel
+        self.session_factory = session_factory
+        self.queue = queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.prefetch = max(prefetch, self.batch_size)
+        self.stop = stop
+        self.clock = clock
+        self.on_stored = on_stored
+        self.stats = {"received": 0, "batches": 0, "stored": 0, "requeued": 0, "rejected": 0}
+
+        self._tags = []
+        self._messages = []
+        self._deadline = None
+        self._last_delivery = None
+
+    def run(self, max_messages: int = None):
+        """
+        Consume until the channel closes, the stop event is set, or
+        max_messages were received. The batch in progress is always flushed
+        and acked before returning; prefetched messages that never reached
+        it are redelivered by the broker once the connection closes.
+        """
+        # prefetch_count also gives fair dispatch across competing consumers
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+        for method, properties, body in self.channel.consume(
+            self.queue, inactivity_timeout=self.flush_interval
+        ):
+            if method is not None:
+                self._add(method.delivery_tag, properties, body)
+
+            if self._messages and (
+                len(self._messages) >= self.batch_size or self.clock() >= self._deadline
+            ):
+                self.flush()
+
+            if max_messages is not None and self.stats["received"] >= max_messages:
+                break
+            if self.stop is not None and self.stop.is_set():
+                break
+
+        self.flush()
+
+    def status(self) -> dict:
+        """Counters plus how far this consumer is behind what it has received."""
+        now = self.clock()
+        status = dict(self.stats)
+        status["buffered"] = len(self._messages)
+        status["oldest_buffered_s"] = (
+            round(now - (self._deadline - self.flush_interval), 3) if self._messages else 0.0
+        )
+        status["idle_s"] = round(now - self._last_delivery, 3) if self._last_delivery else None
+        return status
+
+    def _add(self, delivery_tag: int, properties, body: bytes):
+        self._last_delivery = self.clock()
+        self.stats["received"] += 1
+        if not self._messages:
+            self._deadline = self._last_delivery + self.flush_interval
+        content_type = getattr(properties, "content_type", None)
+        received_at = datetime.utcnow()
+        try:
+            row = events.to_row(body, content_type, received_at)
+        except Exception as e:
+            # Store it untyped rather than let one event stop the queue
+            print(f"❌ Undecodable event stored untyped: {e!r}", flush=True)
+            row = events.untyped_row(body, received_at)
+        self._tags.append(delivery_tag)
+        self._messages.append(row)
+
+    def flush(self):
+        if not self._messages:
+            return
+        tags, messages = self._tags, self._messages
+        self._tags, self._messages = [], []
+
+        db = self.session_factory()
+        try:
+            ids = crud.create_notifications(db, messages)
+        except OperationalError as e:
+            db.rollback()
+            print(f"❌ Notification batch not stored ({e}); requeueing {len(tags)}", flush=True)
+            self.channel.basic_nack(delivery_tag=tags[-1], multiple=True, requeue=True)
+            self.stats["requeued"] += len(tags)
+            raise
+        except DBAPIError:
+            db.rollback()
+            self._store_one_by_one(db, tags, messages)
+            return
+        finally:
+            db.close()
+
+        self.channel.basic_ack(delivery_tag=tags[-1], multiple=True)
+        self.stats["batches"] += 1
+        self.stats["stored"] += len(messages)
+        print(f"📩 Stored {len(messages)} notifications", flush=True)
+        self._stored(messages, ids)
+
+    def _stored(self, rows, ids):
+        if self.on_stored is None or not rows:
+            return
+        try:
+            self.on_stored([dict(row, id=id_) for row, id_ in zip(rows, ids)])
+        except Exception as e:
+            # Push is best effort; the rows are stored and acked already
+            print(f"❌ Live push of {len(rows)} notifications failed: {e}", flush=True)
+
+    def _store_one_by_one(self, db, tags, messages):
+        stored, ids = [], []
+        for tag, row in zip(tags, messages):
+            try:
+                ids += crud.create_notifications(db, [row])
+            except DBAPIError as e:
+                db.rollback()
+                print(f"❌ Rejecting notification {row['message']!r}: {e}", flush=True)
+                self.channel.basic_nack(delivery_tag=tag, requeue=False)
+                self.stats["rejected"] += 1
+            else:
+                self.channel.basic_ack(delivery_tag=tag)
+                self.stats["stored"] += 1
+                stored.append(row)
+        self._stored(stored, ids)
+
+
+class ConsumerHandle:
+    """What a supervisor can see of one start_consumer loop."""
+
+    def __init__(self, name: str = "consumer"):
+        self.name = name
+        self.consumer = None
+        self.connected = False
+        self.reconnects = 0
+        self.last_error = None
+
+    def status(self) -> dict:
+        status = {
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+        if self.consumer is not None:
+            status.update(self.consumer.status())
+        return status
+
+
+def start_consumer(session_factory, host: str = RABBITMQ_HOST, stop=None, handle: ConsumerHandle = None):
+    """
+    Blocking loop: connect, consume in batches, reconnect with backoff.
+
+    Runs until `stop` (a threading/multiprocessing Event) is set; every
+    consumer owns its connection since pika connections are not thread-safe.
+    """
+    import pika  # only processes that consume pay for importing it
+
+    handle = handle or ConsumerHandle()
+    print(f"🔥 Consumer {handle.name} loaded.", flush=True)
+    backoff = 1.0
+
+    while stop is None or not stop.is_set():
+        connection = None
+        try:
+            print(f"🔌 Trying to connect to RabbitMQ at host={host} ...", flush=True)
+            connection = pika.BlockingConnection(pika.ConnectionParameters(host=host))
+            channel = connection.channel()
+
+            # Make sure the queue exists and is durable
+            channel.queue_declare(queue=BOOKING_QUEUE, durable=True)
+            push.declare_exchange(channel)
+
+            print(f"📥 Consumer {handle.name} listening for RabbitMQ messages...", flush=True)
+            backoff = 1.0
+            handle.connected = True
+            handle.consumer = BatchingConsumer(
+                channel, session_factory, stop=stop, on_stored=lambda rows: push.publish_stored(channel, rows)
+            )
+            handle.consumer.run()
+
+        except pika.exceptions.AMQPConnectionError as e:
+            handle.last_error = repr(e)
+            print(f"❌ RabbitMQ connection failed: {e}. Retrying in {backoff:.0f} seconds...", flush=True)
+        except Exception as e:
+            handle.last_error = repr(e)
+            print(f"💥 Unexpected error in consumer: {e}. Retrying in {backoff:.0f} seconds...", flush=True)
+        finally:
+            handle.connected = False
+            if connection is not None and connection.is_open:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+        if stop is not None and stop.is_set():
+            break
+        handle.reconnects += 1
+        if stop is not None:
+            stop.wait(backoff)
+        else:
+            time.sleep(backoff)
+        backoff = min(backoff * 2, CONSUMER_MAX_BACKOFF)
+
+    print(f"👋 Consumer {handle.name} stopped.", flush=True)
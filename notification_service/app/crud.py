@@ -1,5 +1,9 @@
+from datetime import datetime
+from typing import List
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from . import models, schemas
+from smartmeeting_common.pagination import keyset
 
 def create_notification(db: Session, message: str):
     notif = models.Notification(message=message)
@@ -8,5 +12,39 @@ def create_notification(db: Session, message: str):
     db.refresh(notif)
     return notif
 
-def get_notifications(db: Session):
-    return db.query(models.Notification).all()
+def create_notifications(db: Session, rows: List[dict]) -> List[int]:
+    """Insert a batch of notification rows (see events.to_row) with one executemany and one commit; returns their ids in order."""
+    if not rows:
+        return []
+    N = models.Notification
+    ids = db.execute(insert(N).returning(N.id, sort_by_parameter_order=True), rows).scalars().all()
+    db.commit()
+    return ids
+
+def notifications_query(
+    db: Session,
+    limit: int = None,
+    after_id: int = None,
+    username: str = None,
+    room_id: int = None,
+    event_type: str = None,
+    since: datetime = None,
+    until: datetime = None,
+):
+    """Filtered, id-ordered notifications; `since` is inclusive, `until` exclusive."""
+    N = models.Notification
+    query = db.query(N)
+    if username is not None:
+        query = query.filter(N.username == username)
+    if room_id is not None:
+        query = query.filter(N.room_id == room_id)
+    if event_type is not None:
+        query = query.filter(N.event_type == event_type)
+    if since is not None:
+        query = query.filter(N.event_time >= since)
+    if until is not None:
+        query = query.filter(N.event_time < until)
+    return keyset(query, N.id, limit, after_id)
+
+def get_notifications(db: Session, limit: int = None, after_id: int = None, **filters):
+    return notifications_query(db, limit, after_id, **filters).all()
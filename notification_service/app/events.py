@@ -0,0 +1,88 @@
+# notification_service/app/events.py
+"""
+Decoding of booking events (see bookings_service/app/events.py for the
+schema) into notification rows.
+
+Understands msgpack (content_type application/msgpack), JSON, and the
+pre-versioned JSON dicts keyed by "event"; anything else is stored as an
+untyped message so nothing is dropped.
+"""
+import json
+from datetime import datetime
+
+try:
+    import msgpack
+except ImportError:  # only needed for application/msgpack bodies
+    msgpack = None
+
+
+EVENT_SCHEMA_VERSION = 1
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+def decode(body: bytes, content_type: str = None):
+    """The event dict, or None if the body is not a recognisable event."""
+    try:
+        if content_type == MSGPACK_CONTENT_TYPE:
+            event = msgpack.unpackb(body, raw=False)
+        else:
+            event = json.loads(body)
+    except Exception:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+def _time(value):
+    # Out-of-range, NaN or infinite values are valid msgpack but not datetimes
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.utcfromtimestamp(value)
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+    except (OverflowError, ValueError, OSError):
+        return None
+    return None
+
+
+def _int(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, OverflowError, ValueError):
+        return None
+
+
+def untyped_row(body: bytes, received_at: datetime = None) -> dict:
+    """The raw body as a row with no typed columns."""
+    # Every row carries every key so batches insert as one executemany
+    return {
+        "message": body.decode(errors="replace"),
+        "schema_version": None,
+        "event_type": None,
+        "username": None,
+        "room_id": None,
+        "booking_id": None,
+        "event_time": received_at,
+        "created_at": received_at,
+    }
+
+
+def to_row(body: bytes, content_type: str = None, received_at: datetime = None) -> dict:
+    """Column values for one notifications row."""
+    event = decode(body, content_type)
+    if event is None:
+        return untyped_row(body, received_at)
+
+    # v1 events carry "type"/"ts"; older producers sent "event" and no timestamp
+    event_type = event.get("type") or event.get("event")
+    event_time = _time(event.get("ts")) or received_at
+    username = event.get("username") or event.get("user")
+    return {
+        "message": json.dumps(event, separators=(",", ":"), default=str),
+        "schema_version": _int(event.get("v")) or 0,
+        "event_type": str(event_type)[:64] if event_type else None,
+        "username": str(username) if username is not None else None,
+        "room_id": _int(event.get("room_id")),
+        "booking_id": _int(event.get("booking_id")),
+        "event_time": event_time,
+        "created_at": received_at,
+    }
@@ -1,78 +1,164 @@
-import pika
+import os
+import asyncio
+import json
 import threading
-import time
-from fastapi import FastAPI, Depends
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import FastAPI, Depends, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 
-from .database import Base, engine, get_db, SessionLocal
-from . import crud
+from .database import engine, get_db, SessionLocal
+from smartmeeting_common.db_pool import pool_stats
+from smartmeeting_common import metrics
+from . import crud, models
 from . import schemas
-
-Base.metadata.create_all(bind=engine)
+from smartmeeting_common.pagination import set_next_cursor, stream_ndjson
+from .consumer import start_consumer
+from . import push
 
 app = FastAPI(title="Notification Service - Ranim")
 
-RABBITMQ_HOST = "rabbitmq"  # must match service name in docker-compose
+# Per-route request, DB and outbound call metrics, scraped from /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
 
-# -------------------------------------------------------
-# RABBITMQ LISTENER FUNC
-# -------------------------------------------------------
-def start_consumer():
-    print("🔥 Consumer function loaded.", flush=True)
-
-    while True:
-        try:
-            print(f"🔌 Trying to connect to RabbitMQ at host={RABBITMQ_HOST} ...", flush=True)
-            connection = pika.BlockingConnection(
-                pika.ConnectionParameters(host=RABBITMQ_HOST)
-            )
-            channel = connection.channel()
-
-            # Make sure the queue exists and is durable
-            channel.queue_declare(queue="booking_notifications", durable=True)
-
-            def callback(ch, method, properties, body):
-                message = body.decode()
-                print("📩 Received message:", message, flush=True)
-
-                db = SessionLocal()
-                try:
-                    crud.create_notification(db, message)
-                finally:
-                    db.close()
-
-            channel.basic_consume(
-                queue="booking_notifications",
-                durable=True,
-                on_message_callback=callback,
-                auto_ack=True
-            )
-
-            print("📥 Notification service listening for RabbitMQ messages...", flush=True)
-            channel.start_consuming()
-
-        except pika.exceptions.AMQPConnectionError as e:
-            print(f"❌ RabbitMQ connection failed: {e}. Retrying in 5 seconds...", flush=True)
-            time.sleep(5)
-        except Exception as e:
-            print(f"💥 Unexpected error in consumer: {e}. Retrying in 5 seconds...", flush=True)
-            time.sleep(5)
+# Schema changes are applied by `python -m app.migrations`, not at import
+
+# "0" when the consumers run separately (python -m app.worker)
+EMBEDDED_CONSUMER = os.getenv("NOTIFICATION_EMBEDDED_CONSUMER", "1") == "1"
+
+# Page size when the client gives none; full exports use stream=true
+NOTIFICATIONS_DEFAULT_LIMIT = int(os.getenv("NOTIFICATIONS_DEFAULT_LIMIT", "100"))
+
+# Live push: one hub per process, fed from the notification_events exchange
+PUSH_RELAY = os.getenv("NOTIFICATION_PUSH_RELAY", "1") == "1"
+hub = push.Hub()
+relay = push.PushRelay(hub)
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """event_time is stored as naive UTC."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 # -------------------------------------------------------
 # STARTUP EVENT
 # -------------------------------------------------------
 @app.on_event("startup")
 def startup_event():
+    if not EMBEDDED_CONSUMER:
+        print("ℹ️ Embedded consumer disabled; run `python -m app.worker`.", flush=True)
+        return
     print("🚀 RabbitMQ listener thread starting...", flush=True)
-    t = threading.Thread(target=start_consumer, daemon=True)
+    t = threading.Thread(target=start_consumer, args=(SessionLocal,), daemon=True)
     t.start()
 
+@app.on_event("startup")
+async def start_push():
+    hub.bind(asyncio.get_running_loop())
+    asyncio.get_running_loop().create_task(hub.run_heartbeat())
+    if PUSH_RELAY:
+        relay.start()
+
+@app.on_event("shutdown")
+def stop_push():
+    relay.stop.set()
+
 # -------------------------------------------------------
 # API ENDPOINTS
 # -------------------------------------------------------
 @app.get("/notifications", response_model=list[schemas.NotificationOut])
-def get_notifications(db=Depends(get_db)):
-    return crud.get_notifications(db)
+def get_notifications(
+    response: Response,
+    limit: int = Query(NOTIFICATIONS_DEFAULT_LIMIT, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    username: Optional[str] = None,
+    room_id: Optional[int] = None,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    stream: bool = False,
+    db=Depends(get_db),
+):
+    filters = dict(
+        username=username,
+        room_id=room_id,
+        event_type=event_type,
+        since=_utc(since),
+        until=_utc(until),
+    )
+    if stream:
+        return stream_ndjson(
+            db, lambda s: crud.notifications_query(s, after_id=after_id, **filters), schemas.NotificationOut
+        )
+
+    notifications = crud.get_notifications(db, limit, after_id, **filters)
+    set_next_cursor(response, notifications, limit)
+    return notifications
+
+# -------------------------------------------------------
+# LIVE PUSH (SSE / WEBSOCKET)
+# -------------------------------------------------------
+def _backfill(after_id: int, filters: dict) -> list:
+    db = SessionLocal()
+    try:
+        return [push.serialize(n) for n in crud.get_notifications(db, push.PUSH_BACKFILL_LIMIT, after_id, **filters)]
+    finally:
+        db.close()
+
+# Plain ASGI endpoint, see push.SSEEndpoint
+app.add_route("/notifications/stream", push.SSEEndpoint(hub, _backfill), methods=["GET"])
+
+@app.websocket("/ws/notifications")
+async def websocket_notifications(
+    websocket: WebSocket,
+    username: Optional[str] = None,
+    room_id: Optional[int] = None,
+    event_type: Optional[str] = None,
+    after_id: Optional[int] = None,
+):
+    """One JSON notification per text frame; closes with 1013 when the client falls behind."""
+    filters = dict(username=username, room_id=room_id, event_type=event_type)
+    try:
+        sub = hub.subscribe(username, room_id, event_type)
+    except push.HubFull:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+
+    watcher = push.watch_disconnect(websocket.receive, sub, "websocket.disconnect")
+    try:
+        seen = set()
+        if after_id is not None:
+            for n in await run_in_threadpool(_backfill, after_id, filters):
+                seen.add(n["id"])
+                await websocket.send_text(json.dumps(n))
+        while True:
+            n = await sub.get()
+            if n is push.CLOSED:
+                if sub.overflowed:
+                    await websocket.close(code=1013, reason="client too slow")
+                return
+            if n is not push.PING and n["id"] not in seen:
+                await websocket.send_text(json.dumps(n))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(sub)
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "notifications"}
+    return {
+        "status": "ok",
+        "service": "notifications",
+        "embedded_consumer": EMBEDDED_CONSUMER,
+        "push": dict(hub.stats, relay=relay.status()),
+    }
+
+
+@app.get("/health/pool")
+def health_pool():
+    """Connection pool occupancy and checkout wait histogram."""
+    return dict(pool_stats(engine), service="notifications")
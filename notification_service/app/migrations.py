@@ -0,0 +1,27 @@
+# notification_service/app/migrations.py
+"""Schema steps for notification_service, applied in order by python -m app.migrations."""
+from . import models
+from .database import Base
+
+
+SERVICE = "notification_service"
+
+
+def create_tables(engine):
+    Base.metadata.create_all(bind=engine)
+
+
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "typed event columns and composite notification indexes", models.upgrade_schema),
+]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from smartmeeting_common import migrate
+
+    from .database import engine
+
+    migrate.main(engine, sys.modules[__name__])
@@ -1,7 +1,70 @@
-from sqlalchemy import Column, Integer, String
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, String, inspect, text
 from .database import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
     id = Column(Integer, primary_key=True, index=True)
     message = Column(String, nullable=False)
+
+    # Typed copies of the event fields (NULL for untyped legacy messages)
+    schema_version = Column(Integer, nullable=True)
+    event_type = Column(String(64), nullable=True)
+    username = Column(String, nullable=True)
+    room_id = Column(Integer, nullable=True)
+    booking_id = Column(Integer, nullable=True)
+    event_time = Column(DateTime, nullable=True, index=True)
+
+    # Ingest time, used by the retention job
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow, index=True)
+
+    # Equality filter + id keyset pagination are served by one index range scan
+    __table_args__ = (
+        Index("ix_notifications_username_id", "username", "id"),
+        Index("ix_notifications_room_id_id", "room_id", "id"),
+        Index("ix_notifications_event_type_id", "event_type", "id"),
+    )
+
+
+class NotificationArchive(Base):
+    """Same columns as notifications; filled by the retention job when archiving."""
+    __tablename__ = "notifications_archive"
+    id = Column(Integer, primary_key=True)
+    message = Column(String, nullable=False)
+    schema_version = Column(Integer, nullable=True)
+    event_type = Column(String(64), nullable=True)
+    username = Column(String, nullable=True)
+    room_id = Column(Integer, nullable=True)
+    booking_id = Column(Integer, nullable=True)
+    event_time = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=True, index=True)
+
+
+# Superseded by the composite indexes above
+OBSOLETE_INDEXES = ["ix_notifications_username", "ix_notifications_room_id", "ix_notifications_event_type"]
+
+
+def upgrade_schema(engine):
+    """Add columns/indexes introduced after the table was first created."""
+    table = Notification.__table__
+    inspector = inspect(engine)
+    existing = {c["name"] for c in inspector.get_columns(table.name)}
+    indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                if column.name == "created_at":
+                    # Existing rows start ageing from the upgrade
+                    conn.execute(
+                        text(f"UPDATE {table.name} SET created_at = :now WHERE created_at IS NULL"),
+                        {"now": datetime.utcnow()},
+                    )
+        for name in OBSOLETE_INDEXES:
+            if name in indexes:
+                conn.execute(text(f"DROP INDEX {name}"))
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
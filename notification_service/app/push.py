@@ -0,0 +1,397 @@
+# notification_service/app/push.py
+"""
+Live push of stored notifications to WebSocket / SSE clients.
+
+Consumers publish every committed batch to the notification_events fanout
+exchange (publish_stored); each API process binds its own exclusive queue
+to it (PushRelay) and hands the batch to its Hub on the event loop. The
+Hub routes every notification to the subscriptions whose filters match,
+through one bounded mailbox per connection, so a slow client never
+blocks the relay or the other clients: once it is PUSH_QUEUE_SIZE
+notifications behind it is disconnected, and it resumes from its last id
+(Last-Event-ID / after_id), backfilled from the database.
+"""
+import os
+import asyncio
+import json
+import threading
+from collections import defaultdict, deque
+from urllib.parse import parse_qs
+from datetime import date, datetime
+
+from starlette.concurrency import run_in_threadpool
+
+from smartmeeting_common import metrics
+
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+PUSH_EXCHANGE = os.getenv("NOTIFICATION_PUSH_EXCHANGE", "notification_events")
+PUSH_QUEUE_SIZE = int(os.getenv("NOTIFICATION_PUSH_QUEUE_SIZE", "256"))
+PUSH_MAX_CONNECTIONS = int(os.getenv("NOTIFICATION_PUSH_MAX_CONNECTIONS", "50000"))
+PUSH_HEARTBEAT = float(os.getenv("NOTIFICATION_PUSH_HEARTBEAT", "15"))
+PUSH_BACKFILL_LIMIT = int(os.getenv("NOTIFICATION_PUSH_BACKFILL_LIMIT", "500"))
+# Batches an API process may fall behind the exchange before RabbitMQ drops the oldest
+PUSH_RELAY_MAX_BACKLOG = int(os.getenv("NOTIFICATION_PUSH_RELAY_MAX_BACKLOG", "10000"))
+
+FIELDS = ("id", "message", "event_type", "username", "room_id", "booking_id", "event_time")
+
+# Last item a closed subscription yields (overflow or disconnect)
+CLOSED = None
+# Given to idle subscriptions every PUSH_HEARTBEAT seconds (keeps proxies from timing out)
+PING = object()
+
+
+class HubFull(Exception):
+    pass
+
+
+# ------------------------------------------------
+# WIRE FORMAT
+# ------------------------------------------------
+def serialize(row) -> dict:
+    """JSON-safe public fields of a stored row (dict or Notification)."""
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name, None)
+    out = {}
+    for name in FIELDS:
+        value = get(name)
+        out[name] = value.isoformat() if isinstance(value, (datetime, date)) else value
+    return out
+
+
+def encode_batch(rows) -> bytes:
+    return json.dumps([serialize(r) for r in rows], separators=(",", ":")).encode()
+
+
+def decode_batch(body: bytes) -> list:
+    return json.loads(body)
+
+
+def declare_exchange(channel):
+    channel.exchange_declare(exchange=PUSH_EXCHANGE, exchange_type="fanout", durable=True)
+
+
+def publish_stored(channel, rows):
+    """One message per committed batch; rows must carry their ids."""
+    import pika
+
+    with metrics.timed_call("amqp", PUSH_EXCHANGE):
+        channel.basic_publish(
+            exchange=PUSH_EXCHANGE,
+            routing_key="",
+            body=encode_batch(rows),
+            properties=pika.BasicProperties(content_type="application/json"),
+        )
+
+
+# ------------------------------------------------
+# HUB
+# ------------------------------------------------
+class Subscription:
+    """
+    One connection's filters and its bounded mailbox. Lighter than an
+    asyncio.Queue (no Event, no putter queue), which adds up at tens of
+    thousands of idle connections; get() is for the connection's single reader.
+    """
+    __slots__ = ("username", "room_id", "event_type", "maxsize", "overflowed", "closed", "_items", "_waiter")
+
+    def __init__(self, username: str = None, room_id: int = None, event_type: str = None,
+                 maxsize: int = PUSH_QUEUE_SIZE):
+        self.username = username
+        self.room_id = room_id
+        self.event_type = event_type
+        self.maxsize = maxsize
+        self.overflowed = False
+        self.closed = False
+        self._items = deque()
+        self._waiter = None
+
+    def matches(self, n: dict) -> bool:
+        return (
+            (self.username is None or n.get("username") == self.username)
+            and (self.room_id is None or n.get("room_id") == self.room_id)
+            and (self.event_type is None or n.get("event_type") == self.event_type)
+        )
+
+    def _put(self, item):
+        self._items.append(item)
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def offer(self, n: dict) -> bool:
+        """Queue n without waiting; on overflow drop the backlog and close."""
+        if self.closed:
+            return False
+        if len(self._items) >= self.maxsize:
+            self.overflowed = True
+            self._items.clear()
+            self.close()
+            return False
+        self._put(n)
+        return True
+
+    def ping(self):
+        if not self._items and not self.closed:
+            self._put(PING)
+
+    def close(self):
+        """Wake the reader with CLOSED (overflow, or the client went away)."""
+        if not self.closed:
+            self.closed = True
+            self._put(CLOSED)
+
+    def __len__(self):
+        return len(self._items)
+
+    def get_nowait(self):
+        return self._items.popleft()
+
+    async def get(self):
+        while not self._items:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._items.popleft()
+
+
+class Hub:
+    """
+    Subscriptions of one process, indexed by their most selective filter
+    (username, else room, else none) so routing a notification only looks
+    at the connections that can match it. Not thread-safe: everything but
+    publish_threadsafe runs on the event loop.
+    """
+
+    def __init__(self, max_connections: int = PUSH_MAX_CONNECTIONS, queue_size: int = PUSH_QUEUE_SIZE):
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.loop = None
+        self._by_username = defaultdict(set)
+        self._by_room = defaultdict(set)
+        self._everything = set()
+        self.stats = {"connections": 0, "batches": 0, "delivered": 0, "slow_disconnects": 0}
+
+    def bind(self, loop):
+        self.loop = loop
+
+    def _bucket(self, sub: Subscription):
+        if sub.username is not None:
+            return self._by_username, sub.username
+        if sub.room_id is not None:
+            return self._by_room, sub.room_id
+        return None, None
+
+    def subscribe(self, username: str = None, room_id: int = None, event_type: str = None) -> Subscription:
+        if self.stats["connections"] >= self.max_connections:
+            raise HubFull()
+        sub = Subscription(username, room_id, event_type, self.queue_size)
+        index, key = self._bucket(sub)
+        (self._everything if index is None else index[key]).add(sub)
+        self.stats["connections"] += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        index, key = self._bucket(sub)
+        bucket = self._everything if index is None else index.get(key)
+        if bucket is None or sub not in bucket:
+            return
+        bucket.discard(sub)
+        if index is not None and not bucket:
+            del index[key]
+        self.stats["connections"] -= 1
+
+    def publish(self, notifications: list):
+        self.stats["batches"] += 1
+        for n in notifications:
+            for bucket in (
+                self._everything,
+                self._by_username.get(n.get("username")),
+                self._by_room.get(n.get("room_id")),
+            ):
+                if not bucket:
+                    continue
+                for sub in bucket:
+                    if not sub.matches(n):
+                        continue
+                    was_closed = sub.closed
+                    if sub.offer(n):
+                        self.stats["delivered"] += 1
+                    elif not was_closed:
+                        self.stats["slow_disconnects"] += 1
+
+    def heartbeat(self):
+        """One pass over all subscriptions instead of a timer per connection."""
+        for bucket in (self._everything, *self._by_username.values(), *self._by_room.values()):
+            for sub in bucket:
+                sub.ping()
+
+    async def run_heartbeat(self, interval: float = PUSH_HEARTBEAT):
+        while True:
+            await asyncio.sleep(interval)
+            self.heartbeat()
+
+    def publish_threadsafe(self, notifications: list):
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.publish, notifications)
+
+
+# ------------------------------------------------
+# SERVER-SENT EVENTS
+# ------------------------------------------------
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+]
+
+
+def sse_event(n: dict) -> bytes:
+    return f"id: {n['id']}\nevent: notification\ndata: {json.dumps(n, separators=(',', ':'))}\n\n".encode()
+
+
+async def _plain(send, status: int, body: bytes, headers=()):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"text/plain"), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _until_disconnect(receive, disconnect_type: str):
+    while (await receive())["type"] != disconnect_type:
+        pass
+
+
+def watch_disconnect(receive, sub: Subscription, disconnect_type: str = "http.disconnect"):
+    """Close sub when the client goes away, so an idle reader does not linger."""
+    watcher = asyncio.ensure_future(_until_disconnect(receive, disconnect_type))
+    watcher.add_done_callback(lambda _: sub.close())
+    return watcher
+
+
+class SSEEndpoint:
+    """
+    GET ?username=&room_id=&event_type=&after_id= as text/event-stream.
+
+    A plain ASGI app rather than a FastAPI route: an idle stream then costs
+    a mailbox, one disconnect watcher and the server's connection state,
+    without a request/dependency/response object graph per connection.
+    Reconnecting clients resume after Last-Event-ID (or after_id).
+    """
+
+    def __init__(self, hub: Hub, backfill):
+        self.hub = hub
+        self.backfill = backfill  # (after_id, filters) -> serialized rows, blocking
+
+    async def __call__(self, scope, receive, send):
+        params = parse_qs(scope.get("query_string", b"").decode())
+
+        def param(name):
+            values = params.get(name)
+            return values[0] if values else None
+
+        try:
+            room_id = int(param("room_id")) if param("room_id") else None
+            after_id = int(param("after_id")) if param("after_id") else None
+        except ValueError:
+            await _plain(send, 422, b"room_id and after_id must be integers")
+            return
+        last_event_id = dict(scope["headers"]).get(b"last-event-id", b"").decode()
+        if after_id is None and last_event_id.isdigit():
+            after_id = int(last_event_id)
+
+        filters = dict(username=param("username"), room_id=room_id, event_type=param("event_type"))
+        try:
+            sub = self.hub.subscribe(**filters)
+        except HubFull:
+            await _plain(send, 503, b"Too many live connections", [(b"retry-after", b"5")])
+            return
+
+        watcher = watch_disconnect(receive, sub)
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": SSE_HEADERS})
+            seen = set()
+            if after_id is not None:
+                for n in await run_in_threadpool(self.backfill, after_id, filters):
+                    seen.add(n["id"])
+                    await send({"type": "http.response.body", "body": sse_event(n), "more_body": True})
+            while True:
+                n = await sub.get()
+                if n is CLOSED:
+                    if sub.overflowed:
+                        await send({"type": "http.response.body", "body": b"event: overflow\ndata: {}\n\n",
+                                    "more_body": True})
+                    break
+                if n is PING:
+                    chunk = b": ping\n\n"
+                elif n["id"] in seen:
+                    continue
+                else:
+                    chunk = sse_event(n)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            self.hub.unsubscribe(sub)
+
+
+# ------------------------------------------------
+# RELAY (RabbitMQ -> Hub)
+# ------------------------------------------------
+class PushRelay:
+    """Feeds a Hub from the notification_events exchange on a background thread."""
+
+    def __init__(self, hub: Hub, host: str = RABBITMQ_HOST, exchange: str = PUSH_EXCHANGE):
+        self.hub = hub
+        self.host = host
+        self.exchange = exchange
+        self.stop = threading.Event()
+        self.connected = False
+        self.received = 0
+
+    def start(self):
+        t = threading.Thread(target=self.run, name="push-relay", daemon=True)
+        t.start()
+        return t
+
+    def status(self) -> dict:
+        return {"connected": self.connected, "received_batches": self.received}
+
+    def run(self):
+        import pika
+
+        backoff = 1.0
+        while not self.stop.is_set():
+            connection = None
+            try:
+                connection = pika.BlockingConnection(pika.ConnectionParameters(host=self.host))
+                channel = connection.channel()
+                declare_exchange(channel)
+                # Private, bounded queue: pushes are best effort, clients backfill by id
+                queue = channel.queue_declare(
+                    queue="", exclusive=True, auto_delete=True,
+                    arguments={"x-max-length": PUSH_RELAY_MAX_BACKLOG},
+                ).method.queue
+                channel.queue_bind(queue=queue, exchange=self.exchange)
+                self.connected = True
+                backoff = 1.0
+                print("📡 Push relay listening for stored notifications...", flush=True)
+                for method, _, body in channel.consume(queue, auto_ack=True, inactivity_timeout=1):
+                    if self.stop.is_set():
+                        break
+                    if method is None:
+                        continue
+                    self.received += 1
+                    self.hub.publish_threadsafe(decode_batch(body))
+            except Exception as e:
+                print(f"❌ Push relay error: {e}. Retrying in {backoff:.0f} seconds...", flush=True)
+            finally:
+                self.connected = False
+                if connection is not None and connection.is_open:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+            self.stop.wait(backoff)
+            backoff = min(backoff * 2, 10.0)
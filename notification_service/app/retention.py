@@ -0,0 +1,123 @@
+# notification_service/app/retention.py
+"""
+Retention for the notifications table.
+
+    python -m app.retention --days 30 [--archive] [--once]
+
+Rows whose created_at is older than the retention age are removed in
+chunks of RETENTION_CHUNK_SIZE ids, each chunk in its own short
+transaction, so the job never holds long locks or bloats one huge
+transaction. With archiving on, every chunk is copied to
+notifications_archive in the same transaction before it is deleted.
+"""
+import os
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from . import models
+
+
+RETENTION_DAYS = float(os.getenv("NOTIFICATION_RETENTION_DAYS", "0"))  # 0 disables
+RETENTION_CHUNK_SIZE = int(os.getenv("NOTIFICATION_RETENTION_CHUNK_SIZE", "5000"))
+RETENTION_ARCHIVE = os.getenv("NOTIFICATION_RETENTION_ARCHIVE", "0") == "1"
+RETENTION_INTERVAL = float(os.getenv("NOTIFICATION_RETENTION_INTERVAL", "3600"))
+# Breather between chunks so live inserts are not starved
+RETENTION_PAUSE = float(os.getenv("NOTIFICATION_RETENTION_PAUSE", "0.05"))
+
+COLUMNS = [c.name for c in models.Notification.__table__.columns]
+
+
+def purge_chunk(db, cutoff: datetime, chunk_size: int = RETENTION_CHUNK_SIZE, archive: bool = RETENTION_ARCHIVE) -> int:
+    """Delete (and optionally archive) up to chunk_size rows older than cutoff."""
+    N = models.Notification
+    ids = db.execute(
+        select(N.id).where(N.created_at < cutoff).order_by(N.id).limit(chunk_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    if archive:
+        source = select(*[N.__table__.c[name] for name in COLUMNS]).where(N.id.in_(ids))
+        db.execute(insert(models.NotificationArchive).from_select(COLUMNS, source))
+    db.execute(delete(N).where(N.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def purge(
+    session_factory,
+    older_than: timedelta,
+    chunk_size: int = RETENTION_CHUNK_SIZE,
+    archive: bool = RETENTION_ARCHIVE,
+    pause: float = RETENTION_PAUSE,
+    stop=None,
+    now: datetime = None,
+) -> int:
+    """Run chunks until nothing older than the cutoff is left; returns rows removed."""
+    cutoff = (now or datetime.utcnow()) - older_than
+    total = 0
+    while stop is None or not stop.is_set():
+        db = session_factory()
+        try:
+            removed = purge_chunk(db, cutoff, chunk_size, archive)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        total += removed
+        if removed < chunk_size:
+            break
+        time.sleep(pause)
+    if total:
+        print(f"🧹 Retention removed {total} notifications older than {cutoff:%Y-%m-%d %H:%M}", flush=True)
+    return total
+
+
+def run_periodically(session_factory, stop, days: float = RETENTION_DAYS, interval: float = RETENTION_INTERVAL, **kwargs):
+    """Purge every `interval` seconds until stop is set (for the worker)."""
+    while not stop.is_set():
+        try:
+            purge(session_factory, timedelta(days=days), stop=stop, **kwargs)
+        except Exception as e:
+            print(f"❌ Retention run failed: {e}", flush=True)
+        stop.wait(interval)
+
+
+def start_retention_thread(session_factory, stop, days: float = RETENTION_DAYS):
+    """None when retention is disabled."""
+    if days <= 0:
+        return None
+    t = threading.Thread(
+        target=run_periodically, args=(session_factory, stop, days), name="retention", daemon=True
+    )
+    t.start()
+    return t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=float, default=RETENTION_DAYS or 30)
+    parser.add_argument("--chunk-size", type=int, default=RETENTION_CHUNK_SIZE)
+    parser.add_argument("--archive", action="store_true", default=RETENTION_ARCHIVE)
+    parser.add_argument("--once", action="store_true", help="purge once and exit")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    if args.once:
+        purge(SessionLocal, timedelta(days=args.days), args.chunk_size, args.archive)
+        return
+    stop = threading.Event()
+    try:
+        run_periodically(SessionLocal, stop, args.days, chunk_size=args.chunk_size, archive=args.archive)
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
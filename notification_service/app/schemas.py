@@ -1,8 +1,15 @@
+from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
 
 class NotificationOut(BaseModel):
     id: int
     message: str
+    event_type: Optional[str] = None
+    username: Optional[str] = None
+    room_id: Optional[int] = None
+    booking_id: Optional[int] = None
+    event_time: Optional[datetime] = None
 
     class Config:
         from_attributes = True
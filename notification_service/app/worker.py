@@ -0,0 +1,245 @@
+# notification_service/app/worker.py
+"""
+Standalone notification consumers, independent of the HTTP API.
+
+    python -m app.worker --processes 2 --threads 2
+
+Every thread runs its own BatchingConsumer on its own connection, so
+RabbitMQ round-robins booking_notifications across all of them (bounded
+by each consumer's prefetch). SIGTERM/SIGINT stop intake, flush and ack
+the batches in progress and exit. GET /health on the health port reports
+per-consumer lag and the queue backlog. With NOTIFICATION_RETENTION_DAYS
+set, the supervisor also runs the retention job (see app/retention.py).
+"""
+import os
+import argparse
+import json
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pika
+
+from .consumer import BOOKING_QUEUE, RABBITMQ_HOST, ConsumerHandle, start_consumer
+from .retention import start_retention_thread
+
+
+WORKER_PROCESSES = int(os.getenv("NOTIFICATION_WORKER_PROCESSES", "1"))
+WORKER_THREADS = int(os.getenv("NOTIFICATION_WORKER_THREADS", "1"))
+WORKER_HEALTH_PORT = int(os.getenv("NOTIFICATION_WORKER_HEALTH_PORT", "8006"))  # 0 disables
+WORKER_STATUS_INTERVAL = float(os.getenv("NOTIFICATION_WORKER_STATUS_INTERVAL", "2"))
+WORKER_DRAIN_TIMEOUT = float(os.getenv("NOTIFICATION_WORKER_DRAIN_TIMEOUT", "25"))
+
+
+# ------------------------------------------------
+# CONSUMER THREADS (ONE PROCESS)
+# ------------------------------------------------
+def run_threads(prefix: str, threads: int, stop, report, session_factory=None):
+    """Run `threads` consumers until stop is set; report(name, status) periodically."""
+    if session_factory is None:
+        from .database import SessionLocal as session_factory
+
+    handles = [ConsumerHandle(f"{prefix}-{i}") for i in range(threads)]
+    workers = [
+        threading.Thread(
+            target=start_consumer,
+            args=(session_factory, RABBITMQ_HOST, stop, handle),
+            name=handle.name,
+            daemon=True,
+        )
+        for handle in handles
+    ]
+    for t in workers:
+        t.start()
+
+    while not stop.wait(WORKER_STATUS_INTERVAL):
+        for handle in handles:
+            report(handle.name, handle.status())
+
+    for t in workers:
+        t.join(WORKER_DRAIN_TIMEOUT)
+    for handle in handles:
+        report(handle.name, dict(handle.status(), stopped=True))
+
+
+def _child_main(index: int, threads: int, status_queue):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent forwards SIGTERM
+
+    def report(name, status):
+        status_queue.put((name, status))
+
+    run_threads(f"p{index}", threads, stop, report)
+
+
+# ------------------------------------------------
+# SUPERVISOR
+# ------------------------------------------------
+class Supervisor:
+    """Starts the consumers, collects their status and serves /health."""
+
+    def __init__(self, processes: int, threads: int):
+        self.processes = max(1, processes)
+        self.threads = max(1, threads)
+        self.stop = threading.Event()
+        self.consumers = {}
+        self.queue_status = {}
+        self._reported_at = {}
+        self._lock = threading.Lock()
+
+    def report(self, name: str, status: dict):
+        with self._lock:
+            self.consumers[name] = status
+            self._reported_at[name] = time.monotonic()
+
+    def health(self) -> dict:
+        now = time.monotonic()
+        stale_after = WORKER_STATUS_INTERVAL * 3
+        with self._lock:
+            consumers = {
+                name: dict(status, reported_s_ago=round(now - self._reported_at[name], 1))
+                for name, status in self.consumers.items()
+            }
+            backlog = dict(self.queue_status)
+        healthy = len(consumers) == self.processes * self.threads and all(
+            c["connected"] and c["reported_s_ago"] <= stale_after for c in consumers.values()
+        )
+        return {
+            "status": "ok" if healthy else "degraded",
+            "service": "notification_worker",
+            "queue": backlog,
+            "consumers": consumers,
+        }
+
+    # ---- queue backlog ----
+    def _watch_queue(self):
+        connection = None
+        while not self.stop.is_set():
+            try:
+                if connection is None or not connection.is_open:
+                    connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
+                    channel = connection.channel()
+                result = channel.queue_declare(queue=BOOKING_QUEUE, durable=True, passive=True)
+                with self._lock:
+                    self.queue_status = {
+                        "name": BOOKING_QUEUE,
+                        "ready": result.method.message_count,
+                        "consumers": result.method.consumer_count,
+                    }
+            except Exception as e:
+                connection = None
+                with self._lock:
+                    self.queue_status = {"name": BOOKING_QUEUE, "error": repr(e)}
+            self.stop.wait(WORKER_STATUS_INTERVAL)
+
+    # ---- /health ----
+    def _serve_health(self, port: int):
+        supervisor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/health":
+                    self.send_error(404)
+                    return
+                health = supervisor.health()
+                body = json.dumps(health).encode()
+                self.send_response(200 if health["status"] == "ok" else 503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    # ---- lifecycle ----
+    def run(self, health_port: int = WORKER_HEALTH_PORT):
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: self.stop.set())
+
+        server = self._serve_health(health_port) if health_port else None
+        threading.Thread(target=self._watch_queue, daemon=True).start()
+        self._start_retention()
+        print(
+            f"🚀 Notification worker: {self.processes} process(es) x {self.threads} consumer(s)",
+            flush=True,
+        )
+
+        try:
+            if self.processes == 1:
+                run_threads("p0", self.threads, self.stop, self.report)
+            else:
+                self._run_processes()
+        finally:
+            if server is not None:
+                server.shutdown()
+        print("👋 Notification worker stopped.", flush=True)
+
+    def _start_retention(self):
+        # One purger per deployment, in the supervisor rather than every child
+        from .database import SessionLocal
+        if start_retention_thread(SessionLocal, self.stop) is not None:
+            print("🧹 Notification retention enabled", flush=True)
+
+    def _run_processes(self):
+        ctx = multiprocessing.get_context("spawn")
+        status_queue = ctx.Queue()
+
+        def spawn(i):
+            child = ctx.Process(
+                target=_child_main, args=(i, self.threads, status_queue), name=f"consumer-p{i}"
+            )
+            child.start()
+            return child
+
+        children = [spawn(i) for i in range(self.processes)]
+
+        while not self.stop.is_set():
+            self._drain_status(status_queue, timeout=0.5)
+            for i, child in enumerate(children):
+                if not child.is_alive() and not self.stop.is_set():
+                    print(f"💥 Consumer process p{i} exited ({child.exitcode}), restarting", flush=True)
+                    children[i] = spawn(i)
+
+        # Graceful shutdown: children flush and ack their batches, then exit
+        self.stop.set()
+        for child in children:
+            if child.is_alive():
+                child.terminate()  # SIGTERM
+        deadline = time.monotonic() + WORKER_DRAIN_TIMEOUT
+        for child in children:
+            child.join(max(0.0, deadline - time.monotonic()))
+            if child.is_alive():
+                child.kill()
+        self._drain_status(status_queue, timeout=0)
+
+    def _drain_status(self, status_queue, timeout: float):
+        try:
+            name, status = status_queue.get(timeout=timeout)
+            self.report(name, status)
+            while True:
+                name, status = status_queue.get_nowait()
+                self.report(name, status)
+        except queue.Empty:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--threads", type=int, default=WORKER_THREADS)
+    parser.add_argument("--health-port", type=int, default=WORKER_HEALTH_PORT)
+    args = parser.parse_args()
+    Supervisor(args.processes, args.threads).run(args.health_port)
+
+
+if __name__ == "__main__":
+    main()
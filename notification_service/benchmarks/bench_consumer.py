@@ -0,0 +1,94 @@
+# notification_service/benchmarks/bench_consumer.py
+"""
+Messages/sec drained from booking_notifications: the previous consumer
+(auto_ack, one session + INSERT + commit + refresh per message) against
+BatchingConsumer (bulk insert per batch, manual multiple acks).
+
+The broker is an in-process stand-in, so the numbers isolate consumer and
+database cost. Run from notification_service/:
+    python -m benchmarks.bench_consumer [--database-url postgresql+psycopg2://...]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_consumer.db")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.consumer import BatchingConsumer  # noqa: E402
+from app.database import Base  # noqa: E402
+from benchmarks.stub_broker import StubChannel, StubQueue  # noqa: E402
+
+
+def make_messages(n):
+    return [
+        json.dumps({"booking_id": i, "user": f"user{i % 500}", "room_id": i % 40}).encode()
+        for i in range(n)
+    ]
+
+
+def run_legacy(session_factory, messages):
+    queue = StubQueue(messages)
+    channel = StubChannel(queue)
+    for _method, _props, body in channel.consume("booking_notifications", auto_ack=True):
+        db = session_factory()
+        try:
+            crud.create_notification(db, body.decode())
+        finally:
+            db.close()
+    return queue
+
+
+def run_batched(session_factory, messages, batch_size, flush_ms):
+    queue = StubQueue(messages)
+    channel = StubChannel(queue)
+    consumer = BatchingConsumer(
+        channel, session_factory, batch_size=batch_size, flush_interval=flush_ms / 1000
+    )
+    consumer.run(max_messages=len(messages))
+    return queue
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--flush-ms", type=int, default=50)
+    parser.add_argument("--database-url", default=os.environ["DATABASE_URL"])
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    messages = make_messages(args.n)
+
+    runs = [("per-message", lambda: run_legacy(session_factory, messages))]
+    for size in args.batch_size:
+        runs.append(
+            (f"batch={size}", lambda size=size: run_batched(session_factory, messages, size, args.flush_ms))
+        )
+
+    for label, run in runs:
+        with engine.begin() as conn:
+            conn.execute(models.Notification.__table__.delete())
+        t0 = time.perf_counter()
+        queue = run()
+        elapsed = time.perf_counter() - t0
+
+        db = session_factory()
+        stored = db.query(models.Notification).count()
+        db.close()
+        print(
+            f"{label:<12} n={args.n} {args.n / elapsed:10.0f} msg/s  "
+            f"stored={stored} acked={queue.acked} unacked={len(queue.unacked)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# notification_service/benchmarks/bench_events.py
+"""
+Typed msgpack events against the previous raw JSON strings:
+
+1. per-message cost: producer encode + consumer decode into a row, and size
+2. "notifications for user X" latency: LIKE over stored JSON strings vs the
+   indexed username column
+
+Run from notification_service/:  python -m benchmarks.bench_events [-n 200000]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import timeit
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_events.db")
+
+import msgpack  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import events, models  # noqa: E402
+from app.database import Base  # noqa: E402
+
+USERS = 2000
+ROOMS = 200
+BASE = datetime(2030, 1, 1)
+
+
+def legacy_event(i):
+    start = BASE + timedelta(hours=i)
+    return {
+        "event": "booking_created",
+        "username": f"user{i % USERS}",
+        "room_id": i % ROOMS,
+        "start": str(start),
+        "end": str(start + timedelta(hours=1)),
+    }
+
+
+def v1_event(i):
+    start = (BASE - datetime(1970, 1, 1)).total_seconds() + i * 3600
+    return {
+        "v": 1, "type": "booking_created", "ts": time.time(),
+        "username": f"user{i % USERS}", "room_id": i % ROOMS, "booking_id": i,
+        "start": start, "end": start + 3600,
+    }
+
+
+def bench_codec(n):
+    legacy = [legacy_event(i) for i in range(1000)]
+    typed = [v1_event(i) for i in range(1000)]
+    legacy_bodies = [json.dumps(e).encode() for e in legacy]
+    typed_bodies = [msgpack.packb(e) for e in typed]
+    now = datetime.utcnow()
+
+    def per_msg(fn):
+        return min(timeit.repeat(fn, number=max(1, n // 1000), repeat=5)) / (max(1, n // 1000) * 1000) * 1e6
+
+    rows = [
+        ("json encode (before)", lambda: [json.dumps(e).encode() for e in legacy]),
+        ("str decode  (before)", lambda: [b.decode() for b in legacy_bodies]),
+        ("msgpack encode", lambda: [msgpack.packb(e) for e in typed]),
+        ("msgpack -> row", lambda: [events.to_row(b, events.MSGPACK_CONTENT_TYPE, now) for b in typed_bodies]),
+    ]
+    for label, fn in rows:
+        print(f"{label:<22} {per_msg(fn):6.2f} us/msg")
+    print(
+        f"{'body size':<22} json {statistics.mean(map(len, legacy_bodies)):.0f} B, "
+        f"msgpack {statistics.mean(map(len, typed_bodies)):.0f} B"
+    )
+
+
+def timed(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def bench_queries(n):
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    table = models.Notification.__table__
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(table.delete())
+        for lo in range(0, n, 20000):
+            chunk = range(lo, min(n, lo + 20000))
+            # Before: only the raw JSON string; after: typed, indexed columns
+            conn.execute(insert(table), [
+                {"message": json.dumps(legacy_event(i)), "schema_version": None, "event_type": None,
+                 "username": None, "room_id": None, "booking_id": None, "event_time": None}
+                for i in chunk
+            ])
+            conn.execute(insert(table), [
+                events.to_row(msgpack.packb(v1_event(i)), events.MSGPACK_CONTENT_TYPE, now) for i in chunk
+            ])
+
+    db = Session()
+    N = models.Notification
+    user = "user42"
+    like = db.query(N).filter(N.username.is_(None), N.message.like(f'%"username": "{user}"%'))
+    typed = db.query(N).filter(N.username == user)
+    assert like.count() == typed.count()
+
+    print(f"rows per layout={n}, matches for {user}={typed.count()}")
+    print(f"{'LIKE on message (before)':<28} {timed(like.all):8.2f} ms")
+    print(f"{'username = ? (after)':<28} {timed(typed.all):8.2f} ms")
+
+    room = db.query(N).filter(N.room_id == 7, N.event_type == "booking_created")
+    room_like = db.query(N).filter(N.username.is_(None), N.message.like('%"room_id": 7,%'))
+    print(f"{'room LIKE (before)':<28} {timed(room_like.all, 5):8.2f} ms")
+    print(f"{'room_id = ? (after)':<28} {timed(room.all, 5):8.2f} ms")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=200000)
+    args = parser.parse_args()
+    bench_codec(args.n)
+    bench_queries(args.n)
+
+
+if __name__ == "__main__":
+    main()
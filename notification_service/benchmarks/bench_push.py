@@ -0,0 +1,186 @@
+# notification_service/benchmarks/bench_push.py
+"""
+Live push scaling:
+
+1. hub only: memory per subscription and routing cost of one notification
+   with N subscriptions (targeted at one user vs broadcast to filterless ones)
+2. end to end: N idle SSE connections against a real uvicorn process, its
+   RSS per connection, and how long one notification takes to reach all of
+   them / one of them
+
+Run from notification_service/:  python -m benchmarks.bench_push [-n 10000]
+(needs `ulimit -n` above n; the server and the clients are separate processes)
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_push.db")
+os.environ.setdefault("NOTIFICATION_EMBEDDED_CONSUMER", "0")
+os.environ.setdefault("NOTIFICATION_PUSH_RELAY", "0")
+os.environ.setdefault("NOTIFICATION_PUSH_HEARTBEAT", "3600")
+
+USERS = 5000
+
+
+def bench_hub(n):
+    from app import push
+
+    async def run():
+        hub = push.Hub(max_connections=n + 1000)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        subs = [hub.subscribe(username=f"user{i % USERS}") for i in range(n)]
+        per_sub = (tracemalloc.get_traced_memory()[0] - before) / n
+        tracemalloc.stop()
+
+        targeted = [{"id": i, "username": "user42", "room_id": 1} for i in range(100)]
+        t0 = time.perf_counter()
+        hub.publish(targeted)
+        targeted_us = (time.perf_counter() - t0) / len(targeted) * 1e6
+
+        broadcast_subs = [hub.subscribe() for _ in range(1000)] if n >= 1000 else []
+        t0 = time.perf_counter()
+        hub.publish([{"id": 0, "username": "nobody", "room_id": 1}])
+        broadcast_ms = (time.perf_counter() - t0) * 1000
+
+        print(f"hub subscriptions={n}: {per_sub:.0f} B/subscription")
+        print(f"  targeted notification ({n // USERS} matching) {targeted_us:8.1f} us")
+        print(f"  broadcast to {len(broadcast_subs)} filterless     {broadcast_ms:8.2f} ms")
+        del subs
+
+    asyncio.run(run())
+
+
+# ------------------------------------------------
+# END TO END
+# ------------------------------------------------
+def serve(port):
+    """Child process: the real app plus an in-process publish hook."""
+    import uvicorn
+    from fastapi import Body
+    from app import main
+
+    @main.app.post("/_bench/publish")
+    async def publish(rows: list = Body(...)):
+        main.hub.publish(rows)
+        return {"connections": main.hub.stats["connections"]}
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def sse_client(port, path, ready):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")
+    ready.release()
+    return reader, writer
+
+
+async def next_event(reader):
+    while True:
+        chunk = await reader.readuntil(b"\n\n")
+        if b"event: notification" in chunk:
+            return time.perf_counter()
+
+
+async def post(port, rows):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(rows).encode()
+    writer.write(
+        b"POST /_bench/publish HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    await reader.read()
+    writer.close()
+
+
+async def bench_connections(n, port, server_pid):
+    base_rss = rss_kb(server_pid)
+    ready = asyncio.Semaphore(0)
+    gate = asyncio.Semaphore(500)  # connect in waves; the accept backlog is finite
+
+    async def connect(i):
+        async with gate:
+            return await sse_client(port, f"/notifications/stream?username=user{i % USERS}", ready)
+
+    t0 = time.perf_counter()
+    clients = await asyncio.gather(*(connect(i) for i in range(n)))
+    connect_s = time.perf_counter() - t0
+    await asyncio.sleep(1)
+    per_conn = (rss_kb(server_pid) - base_rss) * 1024 / n
+    print(f"end to end: {n} idle SSE connections in {connect_s:.1f}s, server RSS +{per_conn / 1024:.1f} KiB/connection")
+
+    # Targeted: one user's connections
+    user_clients = [c for i, c in enumerate(clients) if i % USERS == 42]
+    waits = [asyncio.create_task(next_event(r)) for r, _ in user_clients]
+    t0 = time.perf_counter()
+    await post(port, [{"id": 1, "username": "user42", "message": "hi"}])
+    done = await asyncio.gather(*waits)
+    print(f"  targeted ({len(user_clients)} receivers)   last after {(max(done) - t0) * 1000:8.2f} ms")
+
+    # Broadcast: one notification per user, every connection gets exactly one
+    waits = [asyncio.create_task(next_event(r)) for r, _ in clients]
+    rows = [{"id": 2 + u, "username": f"user{u}", "message": "hi"} for u in range(USERS)]
+    t0 = time.perf_counter()
+    await post(port, rows)
+    done = await asyncio.gather(*waits)
+    lat = sorted((d - t0) * 1000 for d in done)
+    print(
+        f"  fan-out to all {n}: p50 {statistics.median(lat):.1f} ms, "
+        f"p99 {lat[int(len(lat) * 0.99) - 1]:.1f} ms, last {lat[-1]:.1f} ms"
+    )
+
+    for _, writer in clients:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=10000)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+        return
+
+    bench_hub(max(args.n, 50000))
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_push", "--serve", str(port)])
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.2)
+        asyncio.run(bench_connections(args.n, port, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# notification_service/benchmarks/bench_query.py
+"""
+GET /notifications query cost on a large table:
+
+1. the old unfiltered, unpaginated list vs one filtered keyset page
+2. a deep filtered page (username + after_id) on the single-column index
+   vs the (username, id) composite index
+3. retention throughput (rows purged per second, chunked)
+
+Run from notification_service/:  python -m benchmarks.bench_query [-n 300000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_query.db")
+
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud, models, retention  # noqa: E402
+from app.database import Base  # noqa: E402
+
+USERS = 2000
+ROOMS = 200
+TYPES = ["booking_created", "booking_updated", "booking_deleted"]
+NOW = datetime(2030, 6, 1)
+
+
+def timed(fn, repeat=10):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def seed(engine, n):
+    table = models.Notification.__table__
+    with engine.begin() as conn:
+        conn.execute(table.delete())
+        for lo in range(0, n, 20000):
+            conn.execute(insert(table), [
+                {
+                    "message": f"event {i}", "schema_version": 1, "event_type": TYPES[i % 3],
+                    "username": f"user{i % USERS}", "room_id": i % ROOMS, "booking_id": i,
+                    "event_time": NOW - timedelta(minutes=n - i),
+                    "created_at": NOW - timedelta(days=60 * (n - i) / n),
+                }
+                for i in range(lo, min(n, lo + 20000))
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=300000)
+    args = parser.parse_args()
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    seed(engine, args.n)
+    db = Session()
+
+    user = "user42"
+    first = crud.get_notifications(db, 100, username=user)
+    deep_after = crud.get_notifications(db, 1000, username=user)[-1].id
+
+    print(f"rows={args.n}")
+    print(f"{'list all (before)':<34} {timed(lambda: crud.get_notifications(db), 3):9.2f} ms")
+    print(f"{'username page, limit 100':<34} {timed(lambda: crud.get_notifications(db, 100, username=user)):9.2f} ms")
+    print(f"{'room+type page, limit 100':<34} "
+          f"{timed(lambda: crud.get_notifications(db, 100, room_id=7, event_type='booking_created')):9.2f} ms")
+    assert len(first) == 100
+
+    def deep():
+        return crud.get_notifications(db, 100, after_id=deep_after, username=user)
+
+    with_composite = timed(deep, 50)
+    db.execute(text("DROP INDEX ix_notifications_username_id"))
+    db.execute(text("CREATE INDEX ix_notifications_username ON notifications (username)"))
+    db.commit()
+    with_single = timed(deep, 50)
+    db.execute(text("DROP INDEX ix_notifications_username"))
+    db.execute(text("CREATE INDEX ix_notifications_username_id ON notifications (username, id)"))
+    db.commit()
+    print(f"{'deep page, (username) index':<34} {with_single:9.3f} ms")
+    print(f"{'deep page, (username, id) index':<34} {with_composite:9.3f} ms")
+    db.close()
+
+    for archive in (False, True):
+        seed(engine, args.n)
+        t0 = time.perf_counter()
+        removed = retention.purge(Session, timedelta(days=30), archive=archive, pause=0, now=NOW)
+        elapsed = time.perf_counter() - t0
+        label = "retention archive+delete" if archive else "retention delete"
+        print(f"{label:<34} {removed / elapsed:9.0f} rows/s ({removed} rows)")
+
+
+if __name__ == "__main__":
+    main()
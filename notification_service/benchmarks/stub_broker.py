@@ -0,0 +1,72 @@
+# notification_service/benchmarks/stub_broker.py
+"""
+In-process stand-in for a RabbitMQ queue, seen through the subset of the
+pika BlockingChannel API the consumer uses.
+"""
+import collections
+import time
+from types import SimpleNamespace
+
+
+class StubQueue:
+    def __init__(self, messages=()):
+        self.ready = collections.deque(messages)
+        self.unacked = {}
+        self.acked = 0
+        self.rejected = 0
+        self._next_tag = 1
+
+    def publish(self, body: bytes):
+        self.ready.append(body)
+
+
+class StubChannel:
+    """basic_qos / consume / basic_ack / basic_nack over a StubQueue."""
+
+    def __init__(self, queue: StubQueue, delivery_latency: float = 0.0):
+        self.queue = queue
+        self.delivery_latency = delivery_latency
+        self.prefetch = 0
+        self.is_open = True
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        self.prefetch = prefetch_count
+
+    def consume(self, queue, inactivity_timeout=None, auto_ack=False, **kwargs):
+        q = self.queue
+        while self.is_open:
+            if not q.ready or (not auto_ack and self.prefetch and len(q.unacked) >= self.prefetch):
+                if not q.ready and inactivity_timeout is None:
+                    return
+                time.sleep(0 if q.ready else min(inactivity_timeout or 0, 0.001))
+                yield None, None, None
+                continue
+
+            if self.delivery_latency:
+                time.sleep(self.delivery_latency)
+            body = q.ready.popleft()
+            tag = q._next_tag
+            q._next_tag += 1
+            if auto_ack:
+                q.acked += 1
+            else:
+                q.unacked[tag] = body
+            yield SimpleNamespace(delivery_tag=tag), None, body
+
+    def _settle(self, delivery_tag, multiple):
+        q = self.queue
+        tags = [t for t in q.unacked if t <= delivery_tag] if multiple else [delivery_tag]
+        return [(t, q.unacked.pop(t)) for t in tags]
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.queue.acked += len(self._settle(delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        settled = self._settle(delivery_tag, multiple)
+        if requeue:
+            self.queue.ready.extendleft(body for _, body in reversed(settled))
+        else:
+            self.queue.rejected += len(settled)
+
+    def close(self):
+        self.is_open = False
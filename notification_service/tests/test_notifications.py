@@ -0,0 +1,404 @@
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import Base
+from app.consumer import BatchingConsumer
+
+SQLALCHEMY_TEST_URL = "sqlite:///./test_notifications.db"
+
+engine = create_engine(SQLALCHEMY_TEST_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+Base.metadata.create_all(bind=engine)
+
+
+# ------------------------------------------------
+# BATCHING CONSUMER
+# ------------------------------------------------
+class FakeChannel:
+    """Replays the given bodies through consume() and records acks/nacks."""
+
+    def __init__(self, bodies):
+        self.bodies = list(bodies)
+        self.acks, self.nacks = [], []
+        self.prefetch = None
+
+    def basic_qos(self, prefetch_count):
+        self.prefetch = prefetch_count
+
+    def consume(self, queue, inactivity_timeout=None):
+        for tag, body in enumerate(self.bodies, start=1):
+            yield SimpleNamespace(delivery_tag=tag), None, body
+        yield None, None, None
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acks.append((delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.nacks.append((delivery_tag, multiple, requeue))
+
+
+def _stored():
+    db = TestingSessionLocal()
+    try:
+        return [n.message for n in db.query(models.Notification).order_by(models.Notification.id)]
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def clean_table():
+    with engine.begin() as conn:
+        conn.execute(models.Notification.__table__.delete())
+
+
+def test_consumer_bulk_inserts_and_acks_per_batch():
+    channel = FakeChannel([f"msg {i}".encode() for i in range(5)])
+    consumer = BatchingConsumer(channel, TestingSessionLocal, batch_size=2, flush_interval=60)
+    consumer.run()
+
+    assert _stored() == [f"msg {i}" for i in range(5)]
+    assert channel.prefetch >= 2
+    # Two full batches, then the remainder when the stream goes idle/ends
+    assert channel.acks == [(2, True), (4, True), (5, True)]
+    assert consumer.stats["batches"] == 3
+
+
+def test_consumer_requeues_batch_when_database_is_down(monkeypatch):
+    def down(db, rows):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(crud, "create_notifications", down)
+    channel = FakeChannel([b"a", b"b", b"c"])
+    consumer = BatchingConsumer(channel, TestingSessionLocal, batch_size=3, flush_interval=60)
+
+    with pytest.raises(OperationalError):
+        consumer.run()
+    assert channel.nacks == [(3, True, True)]
+    assert channel.acks == []
+
+
+def test_consumer_rejects_only_poison_messages(monkeypatch):
+    real = crud.create_notifications
+
+    def picky(db, rows):
+        if any(row["message"] == "poison" for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("bad row"))
+        return real(db, rows)
+
+    monkeypatch.setattr(crud, "create_notifications", picky)
+    channel = FakeChannel([b"ok 1", b"poison", b"ok 2"])
+    BatchingConsumer(channel, TestingSessionLocal, batch_size=3, flush_interval=60).run()
+
+    assert _stored() == ["ok 1", "ok 2"]
+    assert channel.nacks == [(2, False, False)]
+    assert channel.acks == [(1, False), (3, False)]
+
+
+# ------------------------------------------------
+# STANDALONE WORKER
+# ------------------------------------------------
+import threading
+from app import worker
+
+
+def test_consumer_drains_batch_in_progress_on_stop():
+    stop = threading.Event()
+
+    class StoppingChannel(FakeChannel):
+        def consume(self, queue, inactivity_timeout=None):
+            for method, props, body in super().consume(queue, inactivity_timeout):
+                if body == b"2":
+                    stop.set()  # SIGTERM arrives while a batch is being filled
+                yield method, props, body
+
+    channel = StoppingChannel([b"1", b"2", b"3", b"4"])
+    consumer = BatchingConsumer(channel, TestingSessionLocal, batch_size=10, flush_interval=60, stop=stop)
+    consumer.run()
+
+    assert _stored() == ["1", "2"]
+    assert channel.acks == [(2, True)]
+    assert consumer.status()["buffered"] == 0
+
+
+def test_supervisor_health_reports_lag_and_staleness(monkeypatch):
+    supervisor = worker.Supervisor(processes=1, threads=2)
+    supervisor.report("p0-0", {"connected": True, "buffered": 3, "oldest_buffered_s": 0.02})
+    assert supervisor.health()["status"] == "degraded"  # p0-1 never reported
+
+    supervisor.report("p0-1", {"connected": True, "buffered": 0, "oldest_buffered_s": 0.0})
+    health = supervisor.health()
+    assert health["status"] == "ok"
+    assert health["consumers"]["p0-0"]["buffered"] == 3
+
+    monkeypatch.setattr(worker, "WORKER_STATUS_INTERVAL", -1)
+    assert supervisor.health()["status"] == "degraded"
+
+
+# ------------------------------------------------
+# TYPED EVENTS
+# ------------------------------------------------
+import json
+import msgpack
+from datetime import datetime
+from sqlalchemy import inspect, text
+from app import events
+
+
+def test_msgpack_and_legacy_events_fill_typed_columns():
+    v1 = msgpack.packb({
+        "v": 1, "type": "booking_created", "ts": 1893456000.0,
+        "username": "ranim", "room_id": 7, "booking_id": 42, "start": 1893484800.0,
+    })
+    legacy = json.dumps({"event": "booking_deleted", "username": "eliya", "room_id": 3}).encode()
+
+    class Props:
+        def __init__(self, content_type):
+            self.content_type = content_type
+
+    class TypedChannel(FakeChannel):
+        def consume(self, queue, inactivity_timeout=None):
+            yield SimpleNamespace(delivery_tag=1), Props(events.MSGPACK_CONTENT_TYPE), v1
+            yield SimpleNamespace(delivery_tag=2), Props(None), legacy
+            yield SimpleNamespace(delivery_tag=3), None, b"plain text"
+
+    BatchingConsumer(TypedChannel([]), TestingSessionLocal, batch_size=10, flush_interval=60).run()
+
+    db = TestingSessionLocal()
+    rows = db.query(models.Notification).order_by(models.Notification.id).all()
+    db.close()
+    assert [(r.event_type, r.username, r.room_id) for r in rows] == [
+        ("booking_created", "ranim", 7),
+        ("booking_deleted", "eliya", 3),
+        (None, None, None),
+    ]
+    assert rows[0].schema_version == 1 and rows[0].booking_id == 42
+    assert rows[0].event_time == datetime(2030, 1, 1)
+    assert rows[1].event_time is not None  # receive time for legacy events
+    assert json.loads(rows[0].message)["type"] == "booking_created"
+    assert rows[2].message == "plain text"
+
+
+
+def test_out_of_range_event_values_do_not_stall_the_consumer(monkeypatch):
+    bodies = [
+        msgpack.packb({"v": 1, "type": "booking_created", "ts": 1e20, "room_id": 1}),
+        msgpack.packb({"v": 1, "type": "booking_created", "ts": float("nan"), "room_id": 2}),
+        msgpack.packb({"v": 1, "type": "booking_created", "ts": 0, "room_id": float("inf")}),
+    ]
+
+    class MsgpackChannel(FakeChannel):
+        def consume(self, queue, inactivity_timeout=None):
+            for tag, body in enumerate(self.bodies, start=1):
+                yield SimpleNamespace(delivery_tag=tag), SimpleNamespace(content_type=events.MSGPACK_CONTENT_TYPE), body
+            yield None, None, None
+
+    channel = MsgpackChannel(bodies)
+    BatchingConsumer(channel, TestingSessionLocal, batch_size=10, flush_interval=60).run()
+
+    db = TestingSessionLocal()
+    rows = db.query(models.Notification).order_by(models.Notification.id).all()
+    db.close()
+    assert channel.acks == [(3, True)]
+    assert [(r.event_type, r.room_id) for r in rows] == [
+        ("booking_created", 1), ("booking_created", 2), ("booking_created", None),
+    ]
+    assert all(r.event_time is not None for r in rows)  # receive time instead
+
+    # Anything else to_row trips over is stored untyped and acked too
+    def broken(body, content_type=None, received_at=None):
+        raise RecursionError("deeply nested event")
+
+    monkeypatch.setattr(events, "to_row", broken)
+    channel = MsgpackChannel(bodies[:1])
+    BatchingConsumer(channel, TestingSessionLocal, batch_size=10, flush_interval=60).run()
+    assert channel.acks == [(1, True)]
+
+
+def test_upgrade_schema_adds_typed_columns(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with old.begin() as conn:
+        conn.execute(text("CREATE TABLE notifications (id INTEGER PRIMARY KEY, message VARCHAR NOT NULL)"))
+        conn.execute(text("INSERT INTO notifications (message) VALUES ('before upgrade')"))
+
+    models.upgrade_schema(old)
+    models.upgrade_schema(old)  # idempotent
+
+    columns = {c["name"] for c in inspect(old).get_columns("notifications")}
+    assert {"event_type", "username", "room_id", "event_time", "created_at"} <= columns
+    indexes = {i["name"] for i in inspect(old).get_indexes("notifications")}
+    assert "ix_notifications_username_id" in indexes
+    with old.connect() as conn:
+        assert conn.execute(text("SELECT created_at FROM notifications")).scalar() is not None
+
+
+# ------------------------------------------------
+# FILTERED QUERIES & RETENTION
+# ------------------------------------------------
+from datetime import timedelta
+from app import retention
+
+
+def _seed(rows):
+    db = TestingSessionLocal()
+    crud.create_notifications(db, [
+        dict(message=f"m{i}", schema_version=1, booking_id=None, created_at=None, **row)
+        for i, row in enumerate(rows)
+    ])
+    db.close()
+
+
+def test_notifications_filtered_with_keyset_pages():
+    t0 = datetime(2030, 1, 1)
+    _seed([
+        dict(event_type="booking_created", username="ranim", room_id=1, event_time=t0),
+        dict(event_type="booking_created", username="eliya", room_id=1, event_time=t0),
+        dict(event_type="booking_deleted", username="ranim", room_id=2, event_time=t0 + timedelta(hours=1)),
+        dict(event_type="booking_created", username="ranim", room_id=1, event_time=t0 + timedelta(hours=2)),
+    ])
+    db = TestingSessionLocal()
+    try:
+        page = crud.get_notifications(db, limit=1, username="ranim", room_id=1)
+        assert [n.message for n in page] == ["m0"]
+        page = crud.get_notifications(db, limit=1, after_id=page[-1].id, username="ranim", room_id=1)
+        assert [n.message for n in page] == ["m3"]
+
+        booked = crud.get_notifications(db, event_type="booking_created")
+        assert [n.message for n in booked] == ["m0", "m1", "m3"]
+        window = crud.get_notifications(db, since=t0 + timedelta(minutes=30), until=t0 + timedelta(hours=2))
+        assert [n.message for n in window] == ["m2"]
+    finally:
+        db.close()
+
+
+def test_retention_purges_in_chunks_and_archives():
+    now = datetime(2030, 6, 1)
+    db = TestingSessionLocal()
+    crud.create_notifications(db, [
+        dict(message=f"old {i}", created_at=now - timedelta(days=40)) for i in range(5)
+    ] + [dict(message="fresh", created_at=now - timedelta(days=1))])
+    db.query(models.NotificationArchive).delete()
+    db.commit()
+    db.close()
+
+    removed = retention.purge(
+        TestingSessionLocal, timedelta(days=30), chunk_size=2, archive=True, pause=0, now=now
+    )
+
+    assert removed == 5
+    assert _stored() == ["fresh"]
+    db = TestingSessionLocal()
+    archived = sorted(a.message for a in db.query(models.NotificationArchive))
+    db.close()
+    assert archived == [f"old {i}" for i in range(5)]
+
+
+# ------------------------------------------------
+# LIVE PUSH
+# ------------------------------------------------
+import asyncio
+from fastapi.testclient import TestClient
+from app import push
+
+
+def test_hub_routes_by_filter_and_disconnects_slow_clients():
+    async def scenario():
+        hub = push.Hub(max_connections=3, queue_size=2)
+        ranim = hub.subscribe(username="ranim")
+        room7 = hub.subscribe(room_id=7, event_type="booking_created")
+        everyone = hub.subscribe()
+        with pytest.raises(push.HubFull):
+            hub.subscribe()
+
+        hub.publish([
+            {"id": 1, "username": "ranim", "room_id": 7, "event_type": "booking_created"},
+            {"id": 2, "username": "eliya", "room_id": 7, "event_type": "booking_deleted"},
+            {"id": 3, "username": "ranim", "room_id": 1, "event_type": "booking_deleted"},
+        ])
+
+        assert [ranim.get_nowait()["id"] for _ in range(2)] == [1, 3]
+        assert room7.get_nowait()["id"] == 1 and len(room7) == 0
+        # everyone is behind after two: its backlog is dropped and it is told to go
+        assert everyone.get_nowait() is push.CLOSED and everyone.overflowed
+        assert hub.stats["slow_disconnects"] == 1
+
+        hub.heartbeat()
+        assert await asyncio.wait_for(ranim.get(), 1) is push.PING
+
+        for sub in (ranim, room7, everyone):
+            hub.unsubscribe(sub)
+        assert hub.stats["connections"] == 0 and not hub._by_username and not hub._by_room
+
+    asyncio.run(scenario())
+
+
+def test_consumer_feeds_live_push_with_ids():
+    pushed = []
+    channel = FakeChannel([b"a", b"b"])
+    BatchingConsumer(channel, TestingSessionLocal, batch_size=10, flush_interval=60, on_stored=pushed.extend).run()
+
+    assert [n["message"] for n in pushed] == ["a", "b"]
+    assert pushed[0]["id"] < pushed[1]["id"]
+    assert json.loads(push.encode_batch(pushed))[0]["id"] == pushed[0]["id"]
+
+
+def test_websocket_backfills_then_pushes(monkeypatch):
+    from app import main, migrations
+    from smartmeeting_common import migrate
+    migrate.upgrade(main.engine, migrations)  # the app's own database; main no longer creates it at import
+    monkeypatch.setattr(main, "PUSH_RELAY", False)
+    monkeypatch.setattr(main, "EMBEDDED_CONSUMER", False)
+
+    db = main.SessionLocal()
+    ids = crud.create_notifications(db, [
+        dict(message=m, username=u, created_at=None) for m, u in [("old", "ranim"), ("other", "eliya"), ("missed", "ranim")]
+    ])
+    db.close()
+
+    with TestClient(main.app) as client:
+        with client.websocket_connect(f"/ws/notifications?username=ranim&after_id={ids[0]}") as ws:
+            assert ws.receive_json()["message"] == "missed"
+            main.hub.publish_threadsafe([
+                {"id": ids[2], "username": "ranim", "message": "missed"},  # already backfilled
+                {"id": ids[2] + 1, "username": "eliya", "message": "not mine"},
+                {"id": ids[2] + 2, "username": "ranim", "message": "live"},
+            ])
+            assert ws.receive_json()["message"] == "live"
+        assert client.get("/health").json()["push"]["delivered"] == 2
+
+
+def test_sse_endpoint_resumes_after_last_event_id():
+    async def scenario():
+        hub = push.Hub()
+        backfilled = []
+
+        def backfill(after_id, filters):
+            backfilled.append((after_id, filters["username"]))
+            return [{"id": after_id + 1, "username": "ranim", "message": "missed"}]
+
+        sent, requests = [], asyncio.Queue()
+        await requests.put({"type": "http.request", "body": b""})
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 3:  # headers, backfill, one live event
+                await requests.put({"type": "http.disconnect"})
+
+        scope = {"type": "http", "query_string": b"username=ranim", "headers": [(b"last-event-id", b"41")]}
+        endpoint = asyncio.create_task(push.SSEEndpoint(hub, backfill)(scope, requests.get, send))
+        while hub.stats["connections"] == 0 or len(sent) < 2:
+            await asyncio.sleep(0.01)
+        hub.publish([{"id": 42, "username": "ranim"}, {"id": 43, "username": "ranim", "message": "live"}])
+        await asyncio.wait_for(endpoint, 2)
+
+        assert backfilled == [(41, "ranim")]
+        assert sent[0]["status"] == 200
+        assert sent[1]["body"].startswith(b"id: 42\nevent: notification")
+        assert sent[2]["body"].startswith(b"id: 43\n")
+        assert hub.stats["connections"] == 0
+
+    asyncio.run(scenario())
@@ -1,7 +1,18 @@
 # reviews_service/app/crud.py
 from sqlalchemy.orm import Session
 
-from . import models, schemas
+from . import models, ratings, schemas, search
+from smartmeeting_common.pagination import keyset
+from smartmeeting_common.response_cache import response_cache
+
+
+# Response cache tags: one per review, one per room's review list
+def review_tag(review_id: int) -> str:
+    return f"review:{review_id}"
+
+
+def room_tag(room_id: int) -> str:
+    return f"room:{room_id}"
 
 
 def create_review(db: Session, user_username: str, review_in: schemas.ReviewCreate):
@@ -12,8 +23,12 @@ def create_review(db: Session, user_username: str, review_in: schemas.ReviewCrea
         comment=review_in.comment.strip(),  # simple sanitization
     )
     db.add(review)
+    db.flush()  # assigns the id the search index is keyed on
+    search.sync(db, review, new_comment=review.comment)
+    ratings.apply(db, review.room_id, review.rating)
     db.commit()
     db.refresh(review)
+    response_cache.invalidate(room_tag(review.room_id))
     return review
 
 
@@ -21,12 +36,22 @@ def get_review(db: Session, review_id: int):
     return db.query(models.Review).filter(models.Review.id == review_id).first()
 
 
-def get_reviews_for_room(db: Session, room_id: int):
-    return db.query(models.Review).filter(models.Review.room_id == room_id).all()
+def search_reviews(db: Session, q: str, limit: int, offset: int = 0, room_id: int = None):
+    return search.search_reviews(db, q, limit, offset, room_id)
+
+
+def room_reviews_query(db: Session, room_id: int, limit: int = None, after_id: int = None):
+    query = db.query(models.Review).filter(models.Review.room_id == room_id)
+    return keyset(query, models.Review.id, limit, after_id)
+
+
+def get_reviews_for_room(db: Session, room_id: int, limit: int = None, after_id: int = None):
+    return room_reviews_query(db, room_id, limit, after_id).all()
 
 
 def update_review(db: Session, review_id: int, data: schemas.ReviewUpdate):
-    review = get_review(db, review_id)
+    # Row lock: two concurrent rating changes must both see the other's result
+    review = db.query(models.Review).filter(models.Review.id == review_id).with_for_update().first()
     if not review:
         return None
 
@@ -34,20 +59,33 @@ def update_review(db: Session, review_id: int, data: schemas.ReviewUpdate):
     if "comment" in data_dict and data_dict["comment"] is not None:
         data_dict["comment"] = data_dict["comment"].strip()
 
+    if data_dict.get("comment") is not None and data_dict["comment"] != review.comment:
+        search.sync(db, review, old_comment=review.comment, new_comment=data_dict["comment"])
+
+    old_rating = review.rating
     for field, value in data_dict.items():
         setattr(review, field, value)
 
+    if data_dict.get("rating") is not None:
+        ratings.change(db, review.room_id, old_rating, data_dict["rating"])
+
     db.commit()
     db.refresh(review)
+    response_cache.invalidate(review_tag(review.id), room_tag(review.room_id))
     return review
 
 
 def delete_review(db: Session, review_id: int) -> bool:
-    review = get_review(db, review_id)
+    # Row lock: of two concurrent deletes only one may subtract from the aggregate
+    review = db.query(models.Review).filter(models.Review.id == review_id).with_for_update().first()
     if not review:
         return False
+    room_id = review.room_id
     db.delete(review)
+    search.sync(db, review, old_comment=review.comment)
+    ratings.apply(db, room_id, review.rating, sign=-1)
     db.commit()
+    response_cache.invalidate(review_tag(review_id), room_tag(room_id))
     return True
 
 
@@ -58,6 +96,7 @@ def flag_review(db: Session, review_id: int) -> models.Review | None:
     review.flagged = True
     db.commit()
     db.refresh(review)
+    response_cache.invalidate(review_tag(review.id), room_tag(review.room_id))
     return review
 
 
@@ -68,8 +107,14 @@ def unflag_review(db: Session, review_id: int) -> models.Review | None:
     review.flagged = False
     db.commit()
     db.refresh(review)
+    response_cache.invalidate(review_tag(review.id), room_tag(review.room_id))
     return review
 
 
-def get_flagged_reviews(db: Session):
-    return db.query(models.Review).filter(models.Review.flagged == True).all()
+def flagged_reviews_query(db: Session, limit: int = None, after_id: int = None):
+    query = db.query(models.Review).filter(models.Review.flagged == True)
+    return keyset(query, models.Review.id, limit, after_id)
+
+
+def get_flagged_reviews(db: Session, limit: int = None, after_id: int = None):
+    return flagged_reviews_query(db, limit, after_id).all()
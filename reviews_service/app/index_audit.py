@@ -0,0 +1,105 @@
+# reviews_service/app/index_audit.py
+"""
+Which reviews indexes do the service's queries actually use?
+
+Runs every query crud issues against reviews through the planner
+(EXPLAIN QUERY PLAN on SQLite, EXPLAIN (FORMAT JSON) on Postgres) and
+reports the indexes each plan touches, then every index on the table that
+no query touched. An unused index still costs a B-tree write on every
+insert and on every update of its columns. On Postgres the
+pg_stat_user_indexes scan counters (what production traffic used since
+the last stats reset) are printed as well.
+
+    python -m app.index_audit
+
+Plans depend on table statistics: run it against a database with
+realistic data (and ANALYZE'd), not an empty one.
+"""
+import re
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from . import crud, models, ratings
+
+
+PRIMARY_KEY = "<primary key>"
+
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def audited_queries(db) -> dict:
+    """name -> SQLAlchemy statement, with representative parameters."""
+    Review = models.Review
+    return {
+        "get_review": db.query(Review).filter(Review.id == 1).statement,
+        "room reviews page": crud.room_reviews_query(db, 1, limit=50, after_id=1000).statement,
+        "flagged reviews page": crud.flagged_reviews_query(db, limit=50, after_id=1000).statement,
+        "ratings rebuild --room": ratings.stats_query(room_id=1),
+    }
+
+
+def _plan_indexes(conn, stmt) -> set:
+    dialect = conn.dialect
+    compiled = stmt.compile(dialect=dialect)
+    if dialect.name == "sqlite":
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params).fetchall()
+        used = set()
+        for row in rows:
+            detail = row[-1]
+            if "INTEGER PRIMARY KEY" in detail:
+                used.add(PRIMARY_KEY)
+            used.update(_SQLITE_INDEX.findall(detail))
+        return used
+    if dialect.name == "postgresql":
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params).scalar()
+        used, nodes = set(), [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if "Index Name" in node:
+                used.add(node["Index Name"])
+            nodes.extend(node.get("Plans", []))
+        return used
+    raise ValueError(f"No plan parser for {dialect.name}")
+
+
+def audit(engine) -> dict:
+    """{"queries": {name: sorted indexes}, "unused": sorted index names}"""
+    table = models.Review.__table__.name
+    existing = {i["name"] for i in inspect(engine).get_indexes(table)}
+    queries = {}
+    with engine.connect() as conn, Session(bind=conn) as db:
+        for name, stmt in audited_queries(db).items():
+            queries[name] = sorted(_plan_indexes(conn, stmt))
+    used = set().union(*queries.values())
+    return {"queries": queries, "unused": sorted(existing - used)}
+
+
+def postgres_index_scans(engine) -> dict:
+    """index name -> idx_scan from pg_stat_user_indexes."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT indexrelname, idx_scan FROM pg_stat_user_indexes WHERE relname = :table"),
+            {"table": models.Review.__table__.name},
+        )
+        return {name: scans for name, scans in rows}
+
+
+def main():
+    from .database import engine
+
+    report = audit(engine)
+    for name, indexes in report["queries"].items():
+        print(f"{name:<24} {', '.join(indexes) or 'FULL SCAN'}")
+    if engine.dialect.name == "postgresql":
+        for name, scans in sorted(postgres_index_scans(engine).items()):
+            print(f"  pg_stat_user_indexes {name:<28} idx_scan={scans}")
+    if report["unused"]:
+        print("❌ Unused by any audited query:", ", ".join(report["unused"]))
+    else:
+        print("🚀 Every index on reviews is used")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,21 @@
 # reviews_service/app/main.py
+import os
+from typing import Optional
 
-import jwt
-from memory_profiler import profile
-import cProfile
-import pstats
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 
-from . import models, schemas, crud
-from .database import Base, engine, get_db
+from . import models, schemas, crud, ratings, search
+from .database import engine, get_db
+from smartmeeting_common.db_pool import pool_stats
+from smartmeeting_common import metrics, profiler
+from smartmeeting_common.pagination import NEXT_CURSOR_HEADER, set_next_cursor, stream_ndjson
+from smartmeeting_common.response_cache import respond, response_cache
+from smartmeeting_common.auth import SECRET_KEY, decode_token, token_cache
 
 
 # ------------------------------------------------
@@ -19,6 +23,10 @@ from .database import Base, engine, get_db
 # ------------------------------------------------
 app = FastAPI(title="Reviews Service - Ranim Tahmoush")
 
+# Per-route request, DB and outbound call metrics, scraped from /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
+
 origins = ["*"]  # allow everything for Codespaces
 app.add_middleware(
     CORSMiddleware,
@@ -28,39 +36,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
+# Schema changes are applied by `python -m app.migrations`, not at import
+
+RATINGS_MAX_ROOMS = int(os.getenv("RATINGS_MAX_ROOMS", "500"))
+NEXT_OFFSET_HEADER = "X-Next-Offset"
 
 
 # ------------------------------------------------
 # SECURITY / JWT
 # ------------------------------------------------
-SECRET_KEY = "supersecret_ranim_key"
-ALGORITHM = "HS256"
-
 auth_scheme = HTTPBearer()   # <<<<<< CHANGED HERE
 
 
-def decode_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        role = payload.get("role")
-
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token: missing subject")
-
-        return username, role
-
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-
-    except jwt.DecodeError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    except Exception:
-        raise HTTPException(status_code=500, detail="Internal server error")
-
-
 def get_current_user(credentials=Depends(auth_scheme)):
     token = credentials.credentials  # HTTPBearer gives object with .credentials
     username, role = decode_token(token)
@@ -72,6 +59,12 @@ def require_moderator_or_admin(current=Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admins or moderators only")
     return current
 
+
+def require_admin(current=Depends(get_current_user)):
+    if current["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    return current
+
 # ------------------------------------------------
 # ROUTES
 # ------------------------------------------------
@@ -83,7 +76,6 @@ def home():
 
 # Create review (any authenticated user)
 @app.post("/reviews", response_model=schemas.ReviewOut, status_code=status.HTTP_201_CREATED)
-@profile
 def create_review(
     review_in: schemas.ReviewCreate,
     current=Depends(get_current_user),
@@ -92,25 +84,93 @@ def create_review(
     return crud.create_review(db, current["username"], review_in)
 
 
+# Full-text search over comments, best match first
+# (declared before /reviews/{review_id} so "search" is not taken for an id)
+@app.get("/reviews/search", response_model=list[schemas.ReviewOut])
+def search_reviews(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    room_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    # Ranked results have no stable keyset, so pages are offsets within the ranked window
+    if offset + limit > search.SEARCH_RANK_WINDOW:
+        raise HTTPException(status_code=400, detail=f"Only the best {search.SEARCH_RANK_WINDOW} matches are paged; refine the query")
+    reviews = crud.search_reviews(db, q, limit, offset, room_id)
+    if len(reviews) == limit and offset + 2 * limit <= search.SEARCH_RANK_WINDOW:
+        response.headers[NEXT_OFFSET_HEADER] = str(offset + limit)
+    return reviews
+
+
 # Get single review by ID
 @app.get("/reviews/{review_id}", response_model=schemas.ReviewOut)
-def get_review(review_id: int, db: Session = Depends(get_db)):
-    review = crud.get_review(db, review_id)
-    if not review:
+def get_review(review_id: int, request: Request, db: Session = Depends(get_db)):
+    entry = response_cache.load(
+        "review", crud.review_tag(review_id), "", lambda: crud.get_review(db, review_id), schemas.ReviewOut
+    )
+    if entry is None:
         raise HTTPException(status_code=404, detail="Review not found")
-    return review
+    return respond(request, entry)
 
 
 # Get all reviews for a room
 @app.get("/rooms/{room_id}/reviews", response_model=list[schemas.ReviewOut])
-@profile
-def get_reviews_for_room(room_id: int, db: Session = Depends(get_db)):
-    return crud.get_reviews_for_room(db, room_id)
+def get_reviews_for_room(
+    room_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    stream: bool = False,
+    db: Session = Depends(get_db),
+):
+    if stream:
+        return stream_ndjson(
+            db, lambda s: crud.room_reviews_query(s, room_id, after_id=after_id), schemas.ReviewOut
+        )
+
+    def next_cursor(reviews):
+        # Kept with the cached page: the cursor header must come back on hits too
+        if limit is not None and len(reviews) == limit:
+            return {NEXT_CURSOR_HEADER: str(reviews[-1].id)}
+        return {}
+
+    entry = response_cache.load(
+        "room_reviews",
+        crud.room_tag(room_id),
+        f"{limit}:{after_id}",
+        lambda: crud.get_reviews_for_room(db, room_id, limit, after_id),
+        list[schemas.ReviewOut],
+        meta=next_cursor,
+    )
+    return respond(request, entry, entry.meta)
+
+
+# Average rating + star histogram, from the room_rating_stats aggregate
+@app.get("/rooms/ratings", response_model=list[schemas.RoomRatingOut])
+def get_room_ratings(
+    ids: str = Query(..., description="Comma-separated room IDs, e.g. 1,2,7"),
+    db: Session = Depends(get_db),
+):
+    try:
+        room_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not room_ids:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(room_ids) > RATINGS_MAX_ROOMS:
+        raise HTTPException(status_code=400, detail=f"At most {RATINGS_MAX_ROOMS} rooms per request")
+    return ratings.get_many(db, room_ids)
+
+
+@app.get("/rooms/{room_id}/rating", response_model=schemas.RoomRatingOut)
+def get_room_rating(room_id: int, db: Session = Depends(get_db)):
+    return ratings.get(db, room_id)
 
 
 # Update review (owner or admin/moderator)
 @app.put("/reviews/{review_id}", response_model=schemas.ReviewOut)
-@profile
 def update_review(
     review_id: int,
     review_update: schemas.ReviewUpdate,
@@ -129,7 +189,6 @@ def update_review(
 
 # Delete review (owner or admin/moderator)
 @app.delete("/reviews/{review_id}")
-@profile
 def delete_review(
     review_id: int,
     current=Depends(get_current_user),
@@ -178,25 +237,49 @@ def unflag_review(
 # List flagged reviews (admin/moderator only)
 @app.get("/admin/reviews/flagged", response_model=list[schemas.ReviewOut])
 def list_flagged_reviews(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    stream: bool = False,
     moderator=Depends(require_moderator_or_admin),
     db: Session = Depends(get_db),
 ):
-    return crud.get_flagged_reviews(db)
+    if stream:
+        return stream_ndjson(
+            db, lambda s: crud.flagged_reviews_query(s, after_id=after_id), schemas.ReviewOut
+        )
+
+    reviews = crud.get_flagged_reviews(db, limit, after_id)
+    set_next_cursor(response, reviews, limit)
+    return reviews
 
 
 # ------------------------------------------------
-# CPU PROFILING HELPER
+# ON-DEMAND PROFILER (admin)
 # ------------------------------------------------
-def run_profiler():
-    profiler = cProfile.Profile()
-    profiler.enable()
-    profiler.disable()
-    stats = pstats.Stats(profiler)
-    stats.strip_dirs()
-    stats.sort_stats("cumulative")
-    stats.print_stats()
+@app.post("/admin/profile", response_class=PlainTextResponse)
+def admin_profile(
+    mode: str = Query("cpu", pattern="^(cpu|alloc)$"),
+    seconds: float = Query(10, gt=0, le=profiler.PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    admin=Depends(require_admin),
+):
+    """Profile this worker for `seconds`; folded stacks for flamegraph.pl / speedscope."""
+    try:
+        if mode == "alloc":
+            return profiler.sample_alloc(seconds)
+        return profiler.sample_cpu(seconds, interval_ms)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "reviews_service"}
+    return {"status": "ok", "service": "reviews_service", "token_cache": token_cache.stats(),
+            "response_cache": response_cache.stats()}
+
+
+@app.get("/health/pool")
+def health_pool():
+    """Connection pool occupancy and checkout wait histogram."""
+    return dict(pool_stats(engine), service="reviews_service")
@@ -0,0 +1,28 @@
+# reviews_service/app/migrations.py
+"""Schema steps for reviews_service, applied in order by python -m app.migrations."""
+from . import models, search
+from .database import Base
+
+
+SERVICE = "reviews_service"
+
+
+def create_tables(engine):
+    Base.metadata.create_all(bind=engine)
+
+
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "replace single-column review indexes", models.upgrade_schema),
+    (3, "review comment search index", search.install_search_index),
+]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from smartmeeting_common import migrate
+
+    from .database import engine
+
+    migrate.main(engine, sys.modules[__name__])
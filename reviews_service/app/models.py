@@ -1,6 +1,6 @@
 # reviews_service/app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, inspect
+from sqlalchemy.sql import func, text
 
 from .database import Base
 
@@ -8,11 +8,65 @@ from .database import Base
 class Review(Base):
     __tablename__ = "reviews"
 
-    id = Column(Integer, primary_key=True, index=True)
-    room_id = Column(Integer, nullable=False, index=True)
-    user_username = Column(String, nullable=False, index=True)
-    rating = Column(Integer, nullable=False, index=True)
-    comment = Column(String, nullable=False, index=True)
-    flagged = Column(Boolean, default=False, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
+    id = Column(Integer, primary_key=True)
+    room_id = Column(Integer, nullable=False)
+    user_username = Column(String, nullable=False)
+    rating = Column(Integer, nullable=False)
+    comment = Column(String, nullable=False)  # searched through app/search.py, not a B-tree
+    flagged = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Only what crud's queries use (python -m app.index_audit): every other
+    # index is one more B-tree each insert and update has to maintain.
+    __table_args__ = (
+        # room pages: room_id filter + id keyset in one range scan
+        Index("ix_reviews_room_id_id", "room_id", "id"),
+        # moderation queue: only the few flagged rows are in the index
+        Index(
+            "ix_reviews_flagged_id", "id",
+            sqlite_where=flagged == True, postgresql_where=flagged == True,  # noqa: E712
+        ),
+    )
+
+
+class RoomRatingStats(Base):
+    """Per-room rating aggregate, kept in step with reviews by crud (see ratings.py)."""
+    __tablename__ = "room_rating_stats"
+
+    room_id = Column(Integer, primary_key=True, autoincrement=False)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_5 = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+# Single-column indexes the reviews table was created with; none of them
+# serves a query the composite / partial indexes above do not
+OBSOLETE_INDEXES = [
+    "ix_reviews_id",
+    "ix_reviews_room_id",
+    "ix_reviews_user_username",
+    "ix_reviews_rating",
+    "ix_reviews_flagged",
+    "ix_reviews_created_at",
+    "ix_reviews_updated_at",
+]
+
+
+def upgrade_schema(engine):
+    """Create the current reviews indexes, then drop the ones they replace."""
+    table = Review.__table__
+    indexes = {i["name"] for i in inspect(engine).get_indexes(table.name)}
+
+    with engine.begin() as conn:
+        # New ones first, so the room and flagged queries are never left without an index
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
+        for name in OBSOLETE_INDEXES:
+            if name in indexes:
+                conn.execute(text(f"DROP INDEX {name}"))
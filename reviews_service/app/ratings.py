@@ -0,0 +1,179 @@
+# reviews_service/app/ratings.py
+"""
+Room rating aggregates in room_rating_stats: review count, rating sum and
+a 1-5 star histogram per room, so a room's average is one primary-key read
+instead of fetching every review.
+
+crud applies each create / rating change / delete as a single atomic
+UPDATE of the room's row, in the same transaction as the review write, so
+concurrent reviews of one room never lose an update and a rolled-back
+review never counts. A room without a row (reviewed before this table
+existed, or never) is counted from the reviews table instead of getting a
+delta, so its first write after the deploy leaves it correct. To fix all
+rooms at once (or one that is suspected to drift) run
+
+    python -m app.ratings rebuild [--room ID]
+"""
+import argparse
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import models
+
+
+STARS = range(1, 6)
+COLUMNS = ["review_count", "rating_sum", *(f"stars_{n}" for n in STARS)]
+
+_ON_CONFLICT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# rating -> statement; only the parameters change from one review to the next
+_deltas = {}
+
+
+def _star(rating: int) -> str:
+    return f"stars_{rating}"
+
+
+def _delta(rating: int):
+    stmt = _deltas.get(rating)
+    if stmt is None:
+        table = models.RoomRatingStats.__table__
+        sign = bindparam("sign")
+        stmt = _deltas[rating] = (
+            update(table).where(table.c.room_id == bindparam("stats_room_id")).values({
+                table.c.review_count: table.c.review_count + sign,
+                table.c.rating_sum: table.c.rating_sum + sign * rating,
+                table.c[_star(rating)]: table.c[_star(rating)] + sign,
+            })
+        )
+    return stmt
+
+
+def count_room(db, room_id: int) -> dict:
+    """The room's aggregate computed from the reviews table, this transaction's writes included."""
+    db.flush()
+    row = db.execute(stats_query(room_id)).first()
+    return dict(zip(COLUMNS, row[1:] if row else [0] * len(COLUMNS)))
+
+
+def _insert_counted(db, room_id: int) -> bool:
+    """Create the room's missing row from count_room(); False if it already exists."""
+    values = dict(count_room(db, room_id), room_id=room_id)
+    dialect = db.get_bind().dialect.name
+    if dialect in _ON_CONFLICT_DIALECTS:
+        table = models.RoomRatingStats.__table__
+        # A concurrent insert of the same room blocks this one until it commits
+        stmt = _ON_CONFLICT_DIALECTS[dialect](table).values(values).on_conflict_do_nothing(index_elements=[table.c.room_id])
+        return bool(db.execute(stmt).rowcount)
+    if db.get(models.RoomRatingStats, room_id) is not None:
+        return False
+    db.add(models.RoomRatingStats(**values))
+    db.flush()
+    return True
+
+
+def _apply_or_count(db, room_id: int, stmt, params: dict = None):
+    if db.execute(stmt, params).rowcount:
+        return
+    # No row: count the room, which already includes this review write.
+    # If another transaction created the row meanwhile, its count could
+    # not see this (uncommitted) write, so the delta still applies.
+    if not _insert_counted(db, room_id):
+        db.execute(stmt, params)
+
+
+def apply(db, room_id: int, rating: int, sign: int = 1):
+    """Count (sign=1) or uncount (sign=-1) one review's rating; call after the review write."""
+    _apply_or_count(db, room_id, _delta(rating), {"stats_room_id": room_id, "sign": sign})
+
+
+def change(db, room_id: int, old_rating: int, new_rating: int):
+    """Move one review from old_rating to new_rating stars; call after the review write."""
+    if old_rating == new_rating:
+        return
+    Stats = models.RoomRatingStats
+    _apply_or_count(db, room_id, update(Stats).where(Stats.room_id == room_id).values({
+        Stats.rating_sum: Stats.rating_sum + (new_rating - old_rating),
+        getattr(Stats, _star(old_rating)): getattr(Stats, _star(old_rating)) - 1,
+        getattr(Stats, _star(new_rating)): getattr(Stats, _star(new_rating)) + 1,
+    }))
+
+
+def to_dict(room_id: int, stats) -> dict:
+    if stats is None or not stats.review_count:
+        return {"room_id": room_id, "count": 0, "average": None, "histogram": {n: 0 for n in STARS}}
+    return {
+        "room_id": room_id,
+        "count": stats.review_count,
+        "average": round(stats.rating_sum / stats.review_count, 2),
+        "histogram": {n: getattr(stats, _star(n)) for n in STARS},
+    }
+
+
+def get(db, room_id: int) -> dict:
+    return to_dict(room_id, db.get(models.RoomRatingStats, room_id))
+
+
+def get_many(db, room_ids: list[int]) -> list[dict]:
+    Stats = models.RoomRatingStats
+    rows = {s.room_id: s for s in db.query(Stats).filter(Stats.room_id.in_(room_ids))}
+    return [to_dict(room_id, rows.get(room_id)) for room_id in room_ids]
+
+
+def stats_query(room_id: int = None):
+    """The aggregate rows, computed from the reviews table."""
+    Review = models.Review
+    columns = [
+        Review.room_id,
+        func.count(),
+        func.sum(Review.rating),
+        *(func.sum(case((Review.rating == n, 1), else_=0)) for n in STARS),
+    ]
+    source = select(*columns).group_by(Review.room_id)
+    if room_id is not None:
+        source = source.where(Review.room_id == room_id)
+    return source
+
+
+def rebuild_room(db, room_id: int):
+    """Recompute one room's aggregate under its row lock and commit."""
+    if not _insert_counted(db, room_id):
+        Stats = models.RoomRatingStats
+        # Writers that already touched the row finish first and are counted;
+        # later ones wait, and their delta lands on the recomputed row
+        db.execute(select(Stats.room_id).where(Stats.room_id == room_id).with_for_update())
+        db.execute(update(Stats).where(Stats.room_id == room_id).values(count_room(db, room_id)))
+    db.commit()
+
+
+def rebuild(db, room_id: int = None) -> int:
+    """Recompute the aggregates from the reviews table, one room per transaction; returns rooms written."""
+    if room_id is not None:
+        rooms = [room_id]
+    else:
+        Review, Stats = models.Review, models.RoomRatingStats
+        rooms = sorted(
+            {r for (r,) in db.execute(select(Review.room_id).distinct())}
+            | {r for (r,) in db.execute(select(Stats.room_id))}
+        )
+        db.commit()
+    for room in rooms:
+        rebuild_room(db, room)
+    return len(rooms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room rating aggregates")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--room", type=int, help="only this room")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        rooms = rebuild(db, args.room)
+    print(f"🚀 Rebuilt rating stats for {rooms} room(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,3 +39,13 @@ class ReviewOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+# ======================================
+# ROOM RATING AGGREGATE
+# ======================================
+class RoomRatingOut(BaseModel):
+    room_id: int
+    count: int
+    average: Optional[float] = None
+    histogram: dict[int, int] = Field(..., description="Number of reviews per star, 1 to 5")
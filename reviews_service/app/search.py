@@ -0,0 +1,162 @@
+# reviews_service/app/search.py
+"""
+Full-text search over review comments.
+
+Postgres: a stored generated tsvector column (comment_tsv) with a GIN
+index; Postgres recomputes it on every insert/update of the row, and
+websearch_to_tsquery accepts whatever the user typed. Results are ranked
+by ts_rank_cd.
+
+SQLite: an external-content FTS5 table (reviews_fts, porter stemming) over
+reviews.comment, with room_id indexed alongside it so a room filter is a
+posting-list intersection instead of a lookup per match. crud keeps it in
+step inside the review's transaction via sync(); results are ranked by
+bm25 on the comment column only.
+
+Ranking scores every candidate, and a common word matches a large share
+of all reviews (10% of 1M takes ~200 ms to score on SQLite), so only the
+newest SEARCH_RANK_WINDOW matches are ranked: exact for selective queries,
+"best of the recent ones" for very broad ones, bounded either way.
+
+Other databases fall back to a case-insensitive scan (no index).
+install_search_index() (a step of python -m app.migrations) creates and
+backfills the index on an existing database and drops the old B-tree on
+comment.
+"""
+import os
+import re
+
+from sqlalchemy import DDL, and_, event, inspect, select, text
+
+from . import models
+
+
+FTS_TABLE = "reviews_fts"
+TSV_COLUMN = "comment_tsv"
+TS_CONFIG = "english"
+OLD_COMMENT_INDEX = "ix_reviews_comment"
+
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "2000"))
+
+_REVIEW_COLUMNS = ", ".join(f"reviews.{c.name}" for c in models.Review.__table__.columns)
+
+search_ddl = {
+    "postgresql": [
+        DDL(
+            f"ALTER TABLE reviews ADD COLUMN IF NOT EXISTS {TSV_COLUMN} tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', comment)) STORED"
+        ),
+        DDL(f"CREATE INDEX IF NOT EXISTS ix_reviews_comment_tsv ON reviews USING gin ({TSV_COLUMN})"),
+    ],
+    "sqlite": [
+        DDL(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "comment, room_id, content='reviews', content_rowid='id', tokenize='porter unicode61')"
+        ),
+    ],
+}
+
+for dialect, ddls in search_ddl.items():
+    for ddl in ddls:
+        event.listen(models.Review.__table__, "after_create", ddl.execute_if(dialect=dialect))
+
+
+def install_search_index(engine) -> bool:
+    """Create and backfill the text index on an existing reviews table."""
+    dialect = engine.dialect.name
+    if dialect not in search_ddl:
+        return False
+    try:
+        with engine.begin() as conn:
+            missing = (
+                FTS_TABLE not in inspect(conn).get_table_names()
+                if dialect == "sqlite"
+                else TSV_COLUMN not in {c["name"] for c in inspect(conn).get_columns("reviews")}
+            )
+            for ddl in search_ddl[dialect]:
+                conn.execute(text(ddl.statement))
+            if missing and dialect == "sqlite":
+                # Index every existing review from the content table
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            conn.execute(text(f"DROP INDEX IF EXISTS {OLD_COMMENT_INDEX}"))
+        return True
+    except Exception as e:
+        print("❌ Could not install review search index:", e, flush=True)
+        return False
+
+
+def sync(db, review, old_comment: str = None, new_comment: str = None):
+    """
+    Mirror a comment change into the SQLite FTS table (Postgres maintains
+    its generated column itself). old_comment must be what was indexed.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    params = {"id": review.id, "room_id": review.room_id}
+    if old_comment is not None:
+        db.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comment, room_id) "
+                "VALUES ('delete', :id, :comment, :room_id)"
+            ),
+            dict(params, comment=old_comment),
+        )
+    if new_comment is not None:
+        db.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, comment, room_id) VALUES (:id, :comment, :room_id)"),
+            dict(params, comment=new_comment),
+        )
+
+
+def _terms(q: str) -> list[str]:
+    return re.findall(r"\w+", q.lower())
+
+
+def search_reviews(db, q: str, limit: int, offset: int = 0, room_id: int = None) -> list:
+    """Reviews matching every word of q, best match first."""
+    terms = _terms(q)
+    if not terms:
+        return []
+    dialect = db.get_bind().dialect.name
+    params = {"limit": limit, "offset": offset, "window": SEARCH_RANK_WINDOW}
+
+    if dialect == "postgresql":
+        room_filter = ""
+        if room_id is not None:
+            params["room_id"] = room_id
+            room_filter = "AND reviews.room_id = :room_id"
+        sql = (
+            f"SELECT {_REVIEW_COLUMNS} FROM ("
+            f"  SELECT reviews.id, ts_rank_cd(reviews.{TSV_COLUMN}, query) AS score"
+            f"  FROM reviews, websearch_to_tsquery('{TS_CONFIG}', :q) AS query"
+            f"  WHERE reviews.{TSV_COLUMN} @@ query {room_filter}"
+            "  ORDER BY reviews.id DESC LIMIT :window"
+            ") AS hits JOIN reviews ON reviews.id = hits.id "
+            "ORDER BY hits.score DESC, reviews.id LIMIT :limit OFFSET :offset"
+        )
+        params["q"] = q
+    elif dialect == "sqlite":
+        # Quoted terms: user input never reaches the FTS5 query syntax
+        match = "comment : (" + " ".join(f'"{t}"' for t in terms) + ")"
+        if room_id is not None:
+            if room_id < 0:
+                return []  # "-7" would tokenize to "7"
+            match += f' AND room_id : "{room_id}"'
+        params["q"] = match
+        sql = (
+            f"SELECT {_REVIEW_COLUMNS} FROM ("
+            f"  SELECT rowid AS id, bm25({FTS_TABLE}, 1.0, 0.0) AS score"
+            f"  FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"
+            "  ORDER BY rowid DESC LIMIT :window"
+            ") AS hits JOIN reviews ON reviews.id = hits.id "
+            "ORDER BY hits.score, reviews.id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        Review = models.Review
+        conditions = [Review.comment.ilike(f"%{t}%") for t in terms]
+        if room_id is not None:
+            conditions.append(Review.room_id == room_id)
+        stmt = select(Review).where(and_(*conditions)).order_by(Review.id).limit(limit).offset(offset)
+        return db.scalars(stmt).all()
+
+    return db.scalars(select(models.Review).from_statement(text(sql)), params).all()
@@ -0,0 +1,151 @@
+# reviews_service/benchmarks/bench_indexes.py
+"""
+Write cost of the reviews indexes, before and after models.upgrade_schema:
+
+  before   the seven single-column indexes the table was created with
+  after    (room_id, id) + partial (id) WHERE flagged
+
+over the same N seeded reviews, measuring crud.create_review and
+crud.update_review throughput (one commit each, as the API does), bulk
+insert throughput (one transaction, so index maintenance is not hidden
+behind the commit) plus the two list queries the indexes
+exist for (room page, flagged page), so the slimmer set is shown not to
+cost the reads anything.
+
+Run from reviews_service/:  python -m benchmarks.bench_indexes [-n 200000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_indexes.db")
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud, index_audit, models, schemas, search  # noqa: E402
+from app.database import Base  # noqa: E402
+
+
+def seed(path, n):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:  # rebuilt from the seeded rows below
+        conn.execute(text(f"DROP TABLE {search.FTS_TABLE}"))
+    rng = random.Random(3)
+    rows = [
+        {"room_id": rng.randrange(2000), "user_username": f"user{rng.randrange(50000)}", "rating": rng.randint(1, 5),
+         "comment": f"review {i} of a meeting room", "flagged": rng.random() < 0.005}
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        for start in range(0, n, 50000):
+            conn.execute(models.Review.__table__.insert(), rows[start:start + 50000])
+    search.install_search_index(engine)
+    engine.dispose()
+
+
+def make_before(path):
+    """Turn a current-schema copy back into the table as it was first created."""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for index in models.Review.__table__.indexes:
+            conn.execute(text(f"DROP INDEX {index.name}"))
+        for name in models.OBSOLETE_INDEXES:
+            conn.execute(text(f"CREATE INDEX {name} ON reviews ({name.removeprefix('ix_reviews_')})"))
+        conn.execute(text("ANALYZE"))
+    return engine
+
+
+def writes_per_second(Session, ops, n):
+    """Half create_review, half update_review (rating + comment)."""
+    rng = random.Random(5)
+    with Session() as db:
+        t0 = time.perf_counter()
+        for i in range(ops):
+            if i % 2:
+                crud.update_review(db, rng.randint(1, n), schemas.ReviewUpdate(rating=rng.randint(1, 5), comment=f"edited {i}"))
+            else:
+                crud.create_review(db, "bench", schemas.ReviewCreate(room_id=rng.randrange(2000), rating=4, comment="fine room"))
+        return ops / (time.perf_counter() - t0)
+
+
+def bulk_rows_per_second(engine, rows=20000):
+    """Plain inserts in one transaction: index maintenance without the per-commit fsync."""
+    rng = random.Random(7)
+    batch = [
+        {"room_id": rng.randrange(2000), "user_username": f"user{rng.randrange(50000)}", "rating": rng.randint(1, 5),
+         "comment": "bulk", "flagged": False}
+        for _ in range(rows)
+    ]
+    with engine.begin() as conn:
+        t0 = time.perf_counter()
+        conn.execute(models.Review.__table__.insert(), batch)
+        return rows / (time.perf_counter() - t0)
+
+
+def read_ms(Session, repeat=200):
+    rng = random.Random(9)
+    with Session() as db:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            crud.get_reviews_for_room(db, rng.randrange(2000), limit=50)
+        room = (time.perf_counter() - t0) / repeat * 1000
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            crud.get_flagged_reviews(db, limit=50, after_id=rng.randrange(1000))
+        flagged = (time.perf_counter() - t0) / repeat * 1000
+    return room, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=200_000)
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    base = os.path.join(_db_dir, "seed.db")
+    t0 = time.perf_counter()
+    seed(base, args.n)
+    print(f"seeded {args.n} reviews in {time.perf_counter() - t0:.1f}s")
+
+    engines = {}
+    for name in ("before", "after"):
+        path = os.path.join(_db_dir, f"{name}.db")
+        shutil.copy(base, path)
+        engines[name] = make_before(path)
+    t0 = time.perf_counter()
+    models.upgrade_schema(engines["after"])
+    print(f"upgrade_schema on {args.n} reviews {time.perf_counter() - t0:.2f}s")
+    with engines["after"].begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    for name, engine in engines.items():
+        report = index_audit.audit(engine)
+        print(f"{name:<7} unused indexes: {', '.join(report['unused']) or 'none'}")
+
+    # This box is noisy: interleave the two databases and keep each one's best round
+    sessions = {name: sessionmaker(bind=engine, autoflush=False) for name, engine in engines.items()}
+    best = {name: [0.0, 0.0, float("inf"), float("inf")] for name in engines}
+    for _ in range(args.rounds):
+        for name, Session in sessions.items():
+            ops = writes_per_second(Session, args.ops, args.n)
+            bulk = bulk_rows_per_second(engines[name])
+            room, flagged = read_ms(Session)
+            b = best[name]
+            best[name] = [max(b[0], ops), max(b[1], bulk), min(b[2], room), min(b[3], flagged)]
+
+    for name, (ops, bulk, room, flagged) in best.items():
+        print(f"{name:<7} crud writes {ops:6.0f}/s   bulk insert {bulk:8.0f} rows/s   "
+              f"room page {room:6.3f} ms   flagged page {flagged:6.3f} ms")
+    before, after = best["before"], best["after"]
+    print(f"after/before: crud writes {after[0] / before[0]:.2f}x, bulk insert {after[1] / before[1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# reviews_service/benchmarks/bench_profiler.py
+"""
+What profiling costs the create_review path:
+
+  plain                 no profiler (the default now)
+  @profile              memory_profiler line tracing on every call (before)
+  sampling window       while POST /admin/profile?mode=cpu is running
+  alloc window          while POST /admin/profile?mode=alloc is running
+
+Run from reviews_service/:  python -m benchmarks.bench_profiler [--seconds 1]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench_profiler.db"
+
+from app import crud, schemas  # noqa: E402
+from smartmeeting_common import profiler  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+
+def create_review():
+    db = SessionLocal()
+    try:
+        crud.create_review(db, "bench", schemas.ReviewCreate(room_id=1, rating=4, comment="fine"))
+    finally:
+        db.close()
+
+
+def per_call(fn, seconds):
+    """Mean ms per call, calling fn back to back for `seconds`."""
+    for _ in range(50):
+        fn()
+    calls = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        fn()
+        calls += 1
+    return (time.perf_counter() - t0) / calls * 1000
+
+
+def during(window, fn, seconds):
+    """Time fn while a profile window slightly longer than the measurement runs."""
+    thread = threading.Thread(target=window, args=(seconds + 1,))
+    thread.start()
+    time.sleep(0.1)
+    try:
+        return per_call(fn, seconds)
+    finally:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+
+    modes = {"plain": lambda: per_call(create_review, args.seconds)}
+    try:
+        from memory_profiler import profile
+    except ImportError:
+        print("(memory_profiler not installed, skipping @profile)")
+    else:
+        traced = profile(create_review, stream=open(os.devnull, "w"))
+        modes["@profile"] = lambda: per_call(traced, args.seconds)
+    modes["sampling window"] = lambda: during(lambda s: profiler.sample_cpu(s, interval_ms=5), create_review, args.seconds)
+    modes["alloc window"] = lambda: during(profiler.sample_alloc, create_review, args.seconds)
+
+    # This box is noisy: interleave the modes and keep each one's fastest round
+    results = {name: float("inf") for name in modes}
+    for _ in range(args.rounds):
+        for name, measure in modes.items():
+            results[name] = min(results[name], measure())
+
+    plain = results["plain"]
+    for name, ms in results.items():
+        print(f"{name:<16} {ms:7.3f} ms/call  ({ms / plain:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
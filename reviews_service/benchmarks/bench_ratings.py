@@ -0,0 +1,86 @@
+# reviews_service/benchmarks/bench_ratings.py
+"""
+A room's average rating: averaging GET /rooms/{id}/reviews on the client
+(before) vs GET /rooms/{id}/rating from the aggregate, for rooms with
+growing review counts; plus what the aggregate upsert adds to create_review.
+
+Run from reviews_service/:  python -m benchmarks.bench_ratings
+"""
+import argparse
+import os
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench_ratings.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import crud, main, migrations, models, ratings, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from smartmeeting_common import migrate  # noqa: E402
+
+COMMENT = "Quiet room, good screen, the chairs could be better. " * 4
+
+
+def per_call(fn, n):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def seed(room_id, count):
+    migrate.upgrade(engine, migrations)
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(models.Review, [
+            {"room_id": room_id, "user_username": f"user{i}", "rating": 1 + i % 5, "comment": COMMENT, "flagged": False}
+            for i in range(count)
+        ])
+        db.commit()
+        ratings.rebuild(db, room_id)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50)
+    args = parser.parse_args()
+    client = TestClient(main.app)
+
+    for room_id, count in ((1, 10), (2, 1000), (3, 10000)):
+        seed(room_id, count)
+
+        def client_side():
+            response = client.get(f"/rooms/{room_id}/reviews")
+            reviews = response.json()
+            return sum(r["rating"] for r in reviews) / len(reviews), len(response.content)
+
+        def aggregate():
+            response = client.get(f"/rooms/{room_id}/rating")
+            return response.json()["average"], len(response.content)
+
+        assert client_side()[0] == aggregate()[0]
+        before = per_call(client_side, max(1, args.n * 10 // count))
+        after = per_call(aggregate, args.n)
+        print(
+            f"{count:>6} reviews: list+average {before:8.2f} ms ({client_side()[1] / 1024:7.1f} KiB)  "
+            f"/rating {after:5.2f} ms ({aggregate()[1]} B)"
+        )
+
+    def create(with_aggregate):
+        original = ratings.apply
+        if not with_aggregate:
+            ratings.apply = lambda *a, **k: None
+        try:
+            with SessionLocal() as db:
+                return per_call(lambda: crud.create_review(db, "bench", schemas.ReviewCreate(room_id=9, rating=4, comment="fine")), args.n * 10)
+        finally:
+            ratings.apply = original
+
+    plain, counted = min(create(False) for _ in range(3)), min(create(True) for _ in range(3))
+    print(f"create_review: {plain:.3f} ms without the aggregate, {counted:.3f} ms with it (+{counted - plain:.3f} ms)")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,134 @@
+# reviews_service/benchmarks/bench_response_cache.py
+"""
+GET /reviews/{id} and GET /rooms/{id}/reviews?limit=50 through the app
+(TestClient, so routing, the query and serialization are all included)
+with the response cache off, in memory and shared (SQLite file), over N
+seeded reviews:
+
+  latency   mean per request over a hot set of ids (after one warm pass,
+            so the cached backends are measured on hits)
+  304       the same requests with If-None-Match: the body is not sent
+  mixed     reads with one update_review of a hot review per --write-every
+            reads (invalidating the review and its room page), and the hit
+            ratio the metrics report for that mix
+
+Run from reviews_service/:  python -m benchmarks.bench_response_cache [-n 200000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_response_cache.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud, migrations, models, schemas, search  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from smartmeeting_common import metrics, migrate, response_cache  # noqa: E402
+
+BACKENDS = {
+    "off": lambda: None,
+    "memory": response_cache.MemoryBackend,
+    "shared": lambda: response_cache.SharedBackend(os.path.join(_db_dir, "shared_cache.db")),
+}
+
+
+def seed(n):
+    migrate.upgrade(engine, migrations)
+    rng = random.Random(3)
+    rows = [
+        {"room_id": rng.randrange(2000), "user_username": f"user{rng.randrange(50000)}", "rating": rng.randint(1, 5),
+         "comment": f"review {i} of a meeting room", "flagged": False}
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        for start in range(0, n, 50000):
+            conn.execute(models.Review.__table__.insert(), rows[start:start + 50000])
+        conn.execute(text(f"DROP TABLE {search.FTS_TABLE}"))  # rebuilt from the seeded rows below
+    search.install_search_index(engine)
+
+
+def paths(n, hot):
+    rng = random.Random(11)
+    return [f"/reviews/{rng.randint(1, n)}" for _ in range(hot)] + \
+           [f"/rooms/{rng.randrange(2000)}/reviews?limit=50" for _ in range(hot)]
+
+
+def latency_ms(client, urls, conditional=False):
+    etags = {}
+    for url in urls:  # warm pass
+        etags[url] = client.get(url).headers["ETag"]
+    t0 = time.perf_counter()
+    for url in urls:
+        headers = {"If-None-Match": etags[url]} if conditional else None
+        client.get(url, headers=headers)
+    return (time.perf_counter() - t0) / len(urls) * 1000
+
+
+def mixed(client, Session, urls, write_every):
+    """(ms per request, hit ratio) with a review update every write_every reads."""
+    metrics.reset()
+    rng = random.Random(13)
+    hot_ids = [int(url.rsplit("/", 1)[1]) for url in urls if url.startswith("/reviews/")]
+    with Session() as db:
+        t0 = time.perf_counter()
+        for i in range(len(urls) * 2):
+            client.get(urls[rng.randrange(len(urls))])
+            if i % write_every == write_every - 1:
+                crud.update_review(db, rng.choice(hot_ids), schemas.ReviewUpdate(comment=f"edited {i}"))
+        ms = (time.perf_counter() - t0) / (len(urls) * 2) * 1000
+    hits = misses = 0
+    for line in metrics.render().splitlines():
+        if line.startswith("cache_requests_total"):
+            value = float(line.rsplit(" ", 1)[1])
+            if 'result="hit"' in line:
+                hits += value
+            else:
+                misses += value
+    return ms, hits / (hits + misses) if hits + misses else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=200_000)
+    parser.add_argument("--hot", type=int, default=200, help="distinct ids / room pages requested")
+    parser.add_argument("--write-every", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    seed(args.n)
+    print(f"seeded {args.n} reviews in {time.perf_counter() - t0:.1f}s")
+
+    client = TestClient(app)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    urls = paths(args.n, args.hot)
+    cache = response_cache.response_cache
+
+    # This box is noisy: interleave the backends and keep each one's best round
+    best = {name: [float("inf")] * 3 + [0.0] for name in BACKENDS}
+    for _ in range(args.rounds):
+        for name, make in BACKENDS.items():
+            cache.backend = make()
+            full = latency_ms(client, urls)
+            not_modified = latency_ms(client, urls, conditional=True)
+            mix, ratio = mixed(client, Session, urls, args.write_every)
+            b = best[name]
+            best[name] = [min(b[0], full), min(b[1], not_modified), min(b[2], mix), ratio]
+
+    for name, (full, not_modified, mix, ratio) in best.items():
+        hit_ratio = f"hit ratio {ratio:.2f}" if name != "off" else ""
+        print(f"{name:<7} GET {full:6.3f} ms   304 {not_modified:6.3f} ms   "
+              f"mixed (1 write / {args.write_every} reads) {mix:6.3f} ms  {hit_ratio}")
+    off = best["off"][0]
+    print("speed-up on hits: " + ", ".join(f"{name} {off / best[name][0]:.1f}x" for name in ("memory", "shared")))
+
+
+if __name__ == "__main__":
+    main()
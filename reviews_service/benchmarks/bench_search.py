@@ -0,0 +1,153 @@
+# reviews_service/benchmarks/bench_search.py
+"""
+Review search at scale (SQLite):
+
+1. search latency over N reviews: LIKE '%word%' scan (all the old comment
+   B-tree allowed) vs the FTS5 index, for a common word, a rare word and
+   a two-word query and a word within one room, first page of 20
+2. write cost: create_review with the old comment B-tree vs with the FTS
+   sync that replaces it
+
+Run from reviews_service/:  python -m benchmarks.bench_search [-n 1000000]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_search.db")
+
+from sqlalchemy import text  # noqa: E402
+
+from app import crud, models, schemas, search  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+COMMON = ["room", "quiet", "screen", "chairs", "clean", "coffee", "meeting", "light", "table", "noise"]
+RARE = ["whiteboard", "projector", "radiator", "acoustics", "skylight"]
+
+
+def vocabulary(size=5000):
+    rng = random.Random(1)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [("".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))) for _ in range(size)]
+
+
+def seed(n):
+    rng = random.Random(7)
+    words = vocabulary()
+    cum_weights, total = [], 0.0
+    for i in range(len(words)):
+        total += 1 / (i + 1)  # Zipf-ish
+        cum_weights.append(total)
+    batch = []
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        for i in range(n):
+            comment = rng.choices(words, cum_weights=cum_weights, k=rng.randint(8, 40))
+            comment.append(rng.choice(COMMON))
+            if rng.random() < 0.001:
+                comment.append(rng.choice(RARE))
+            rng.shuffle(comment)
+            batch.append({"room_id": i % 2000, "user_username": f"user{i % 50000}", "rating": 1 + i % 5,
+                          "comment": " ".join(comment), "flagged": False})
+            if len(batch) == 50000:
+                conn.execute(models.Review.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(models.Review.__table__.insert(), batch)
+    print(f"seeded {n} reviews in {time.perf_counter() - t0:.1f}s")
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), result
+
+
+def like_scan(db, q, limit=20, room_id=None):
+    Review = models.Review
+    query = db.query(Review)
+    if room_id is not None:
+        query = query.filter(Review.room_id == room_id)
+    for term in q.split():
+        query = query.filter(Review.comment.like(f"%{term}%"))
+    return query.order_by(Review.id).limit(limit).all()
+
+
+def bench_queries(db):
+    cases = (
+        ("common word", "quiet", None),
+        ("rare word", "projector", None),
+        ("two words", "quiet projector", None),
+        ("in one room", "quiet", 7),
+    )
+    for label, q, room_id in cases:
+        like_ms, like_rows = timed(lambda: like_scan(db, q, room_id=room_id), 3)
+        fts_ms, fts_rows = timed(lambda: search.search_reviews(db, q, 20, room_id=room_id), 20)
+        print(f"  {label:<12} {q!r:<19} LIKE scan {like_ms:8.1f} ms ({len(like_rows):>2} rows)   "
+              f"FTS5 {fts_ms:6.2f} ms ({len(fts_rows):>2} rows)")
+
+
+def bench_writes(db, n, rounds):
+    def create():
+        crud.create_review(db, "bench", schemas.ReviewCreate(room_id=1, rating=4, comment="Quiet room with a good screen " * 8))
+
+    def per_write():
+        t0 = time.perf_counter()
+        for _ in range(n):
+            create()
+        return (time.perf_counter() - t0) / n * 1000
+
+    original_sync = search.sync
+
+    def with_btree():
+        search.sync = lambda *a, **k: None
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX {search.OLD_COMMENT_INDEX} ON reviews (comment)"))
+        try:
+            return per_write()
+        finally:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP INDEX {search.OLD_COMMENT_INDEX}"))
+            search.sync = original_sync
+
+    # This box is noisy: interleave the two setups and keep each one's fastest round.
+    # (Building the B-tree is outside the timed part.)
+    btree = fts = float("inf")
+    for _ in range(rounds):
+        btree = min(btree, with_btree())
+        fts = min(fts, per_write())
+    print(f"create_review: comment B-tree {btree:.3f} ms/review, FTS sync instead {fts:.3f} ms/review")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1_000_000)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    # Seed without the search index, then build it the way an upgrade would
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {search.FTS_TABLE}"))
+    seed(args.n)
+    t0 = time.perf_counter()
+    search.install_search_index(engine)
+    print(f"install_search_index (FTS5 rebuild) {time.perf_counter() - t0:.1f}s, "
+          f"db {os.path.getsize(engine.url.database) / 2**20:.0f} MiB")
+
+    with SessionLocal() as db:
+        print(f"search over {args.n} reviews, first page of 20:")
+        bench_queries(db)
+        bench_writes(db, args.writes, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
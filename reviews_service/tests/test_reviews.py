@@ -33,3 +33,257 @@ def test_get_reviews_empty():
     response = client.get("/reviews/room/1")
     assert response.status_code == 200
     assert response.json() == []
+
+
+# ------------------------------------------------
+# KEYSET PAGINATION / NDJSON STREAMING
+# ------------------------------------------------
+import json
+from app import models
+
+
+def test_room_reviews_pagination_and_stream():
+    db = TestingDB()
+    db.query(models.Review).filter(models.Review.room_id == 501).delete()
+    db.add_all([
+        models.Review(room_id=501, user_username="ranim", rating=4, comment=f"review {i}")
+        for i in range(5)
+    ])
+    db.commit()
+    db.close()
+
+    first = client.get("/rooms/501/reviews", params={"limit": 2})
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+
+    rest = client.get("/rooms/501/reviews", params={"after_id": first.headers["X-Next-After-Id"]})
+    assert len(rest.json()) == 3
+
+    streamed = client.get("/rooms/501/reviews", params={"stream": True})
+    assert [json.loads(line)["comment"] for line in streamed.text.splitlines()] == [
+        f"review {i}" for i in range(5)
+    ]
+
+
+# ------------------------------------------------
+# ON-DEMAND PROFILER
+# ------------------------------------------------
+import threading
+from smartmeeting_common import profiler
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_cpu_profile_returns_folded_stacks_of_busy_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        folded = profiler.sample_cpu(0.2, interval_ms=1)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = folded.splitlines()
+    spinner = [l for l in lines if l.startswith("spinner;")]
+    assert spinner and all("_spin (tests/test_reviews.py:" in l for l in spinner)
+    assert all(l.rsplit(" ", 1)[1].isdigit() for l in lines)
+
+
+def test_profile_endpoint_is_admin_only():
+    assert client.post("/admin/profile", params={"seconds": 0.05}, headers=headers_user).status_code == 403
+
+    admin_token = jwt.encode({"sub": "boss", "role": "admin"}, SECRET_KEY, algorithm="HS256")
+    headers_admin = {"Authorization": f"Bearer {admin_token}"}
+    response = client.post("/admin/profile", params={"mode": "alloc", "seconds": 0.05}, headers=headers_admin)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert client.post("/admin/profile", params={"seconds": 3600}, headers=headers_admin).status_code == 422
+
+
+# ------------------------------------------------
+# ROOM RATING AGGREGATES
+# ------------------------------------------------
+from app import crud, ratings, schemas
+
+
+def test_room_rating_follows_create_update_delete_and_rebuild():
+    db = TestingDB()
+    db.query(models.Review).filter(models.Review.room_id.in_([601, 602])).delete()
+    db.query(models.RoomRatingStats).delete()
+    db.commit()
+
+    first = crud.create_review(db, "ranim", schemas.ReviewCreate(room_id=601, rating=5, comment="great"))
+    second = crud.create_review(db, "sara", schemas.ReviewCreate(room_id=601, rating=2, comment="noisy"))
+    crud.create_review(db, "sara", schemas.ReviewCreate(room_id=602, rating=4, comment="ok"))
+    crud.update_review(db, second.id, schemas.ReviewUpdate(rating=3))
+    crud.update_review(db, first.id, schemas.ReviewUpdate(comment="still great"))
+
+    rating = client.get("/rooms/601/rating").json()
+    assert rating == {"room_id": 601, "count": 2, "average": 4.0, "histogram": {"1": 0, "2": 0, "3": 1, "4": 0, "5": 1}}
+
+    crud.delete_review(db, first.id)
+    bulk = client.get("/rooms/ratings", params={"ids": "602,601,999"}).json()
+    assert [(r["room_id"], r["count"], r["average"]) for r in bulk] == [(602, 1, 4.0), (601, 1, 3.0), (999, 0, None)]
+    assert client.get("/rooms/ratings", params={"ids": "1,x"}).status_code == 400
+
+    # Drifted (or pre-existing) aggregates are recomputed from the reviews
+    db.query(models.RoomRatingStats).delete()
+    db.commit()
+    assert ratings.rebuild(db) >= 2
+    assert ratings.get(db, 601)["histogram"] == {1: 0, 2: 0, 3: 1, 4: 0, 5: 0}
+    assert ratings.get(db, 602)["count"] == 1
+    db.close()
+
+
+def test_room_without_stats_row_is_counted_on_delete_and_change():
+    db = TestingDB()
+    db.query(models.Review).filter(models.Review.room_id.in_([611, 612])).delete()
+    old = [crud.create_review(db, u, schemas.ReviewCreate(room_id=room, rating=r, comment="before the deploy"))
+           for room, u, r in [(611, "ranim", 5), (611, "sara", 4), (611, "omar", 1), (612, "ranim", 2), (612, "sara", 3)]]
+    # As if reviewed before room_rating_stats existed: no aggregate rows
+    db.query(models.RoomRatingStats).delete()
+    db.commit()
+
+    crud.delete_review(db, old[2].id)
+    assert ratings.get(db, 611) == {"room_id": 611, "count": 2, "average": 4.5, "histogram": {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}}
+
+    crud.update_review(db, old[3].id, schemas.ReviewUpdate(rating=5))
+    assert ratings.get(db, 612) == {"room_id": 612, "count": 2, "average": 4.0, "histogram": {1: 0, 2: 0, 3: 1, 4: 0, 5: 1}}
+
+    # Once the row exists the writes are deltas again, and rebuild agrees with them
+    crud.delete_review(db, old[4].id)
+    assert ratings.get(db, 612)["count"] == 1
+    before = ratings.get_many(db, [611, 612])
+    assert ratings.rebuild(db, 611) == 1 and ratings.rebuild(db) >= 2
+    assert ratings.get_many(db, [611, 612]) == before
+    db.close()
+
+
+# ------------------------------------------------
+# FULL-TEXT SEARCH
+# ------------------------------------------------
+from app import search
+
+
+def test_search_ranks_stems_and_follows_edits():
+    search.install_search_index(engine)
+    db = TestingDB()
+    for review in db.query(models.Review).filter(models.Review.room_id.in_([701, 702])).all():
+        crud.delete_review(db, review.id)
+    quiet = crud.create_review(db, "ranim", schemas.ReviewCreate(room_id=701, rating=5, comment="Quiet room, quiet neighbours"))
+    crud.create_review(db, "sara", schemas.ReviewCreate(room_id=702, rating=3, comment="Projector was quiet but the room was cold"))
+    loud = crud.create_review(db, "sara", schemas.ReviewCreate(room_id=701, rating=2, comment="Loud air conditioning"))
+
+    found = client.get("/reviews/search", params={"q": "quiet"}).json()
+    assert [r["id"] for r in found][:2] == [quiet.id, quiet.id + 1]  # two hits beat one
+    assert client.get("/reviews/search", params={"q": "neighbour"}).json()[0]["id"] == quiet.id  # stemmed
+    assert client.get("/reviews/search", params={"q": "quiet", "room_id": 702}).json()[0]["room_id"] == 702
+    assert client.get("/reviews/search", params={"q": 'quiet" OR *'}).status_code == 200
+
+    crud.update_review(db, loud.id, schemas.ReviewUpdate(comment="Quiet after the repair"))
+    assert loud.id in [r["id"] for r in client.get("/reviews/search", params={"q": "repair quiet"}).json()]
+    assert client.get("/reviews/search", params={"q": "conditioning"}).json() == []
+
+    crud.delete_review(db, quiet.id)
+    page = client.get("/reviews/search", params={"q": "quiet", "limit": 1})
+    assert page.headers["X-Next-Offset"] == "1"
+    assert quiet.id not in [r["id"] for r in client.get("/reviews/search", params={"q": "quiet"}).json()]
+    db.close()
+
+
+# ------------------------------------------------
+# INDEX AUDIT / SLIMMED INDEXES
+# ------------------------------------------------
+from sqlalchemy import text
+from app import index_audit
+
+
+def test_upgrade_schema_replaces_unused_indexes(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path}/old.db")
+    Base.metadata.create_all(bind=old)
+    with old.begin() as conn:  # the table as it was first created
+        for index in models.Review.__table__.indexes:
+            conn.execute(text(f"DROP INDEX {index.name}"))
+        for name in models.OBSOLETE_INDEXES:
+            conn.execute(text(f"CREATE INDEX {name} ON reviews ({name.removeprefix('ix_reviews_')})"))
+    assert "ix_reviews_rating" in index_audit.audit(old)["unused"]
+
+    models.upgrade_schema(old)
+    models.upgrade_schema(old)  # idempotent
+    report = index_audit.audit(old)
+    assert report["unused"] == []
+    assert report["queries"]["room reviews page"] == ["ix_reviews_room_id_id"]
+    assert report["queries"]["flagged reviews page"] == ["ix_reviews_flagged_id"]
+
+
+# ------------------------------------------------
+# MIGRATIONS
+# ------------------------------------------------
+from sqlalchemy import inspect
+from smartmeeting_common import migrate
+from app import migrations
+
+
+def test_migrate_applies_each_step_once(tmp_path):
+    fresh = create_engine(f"sqlite:///{tmp_path}/fresh.db")
+    assert [m[0] for m in migrate.pending(fresh, migrations)] == [1, 2, 3]
+    assert migrate.upgrade(fresh, migrations) == [1, 2, 3]
+    assert migrate.upgrade(fresh, migrations) == []
+    assert {"reviews", "room_rating_stats", "reviews_fts"} <= set(inspect(fresh).get_table_names())
+    assert index_audit.audit(fresh)["unused"] == []
+
+
+# ------------------------------------------------
+# RESPONSE CACHE / ETAGS
+# ------------------------------------------------
+from smartmeeting_common import metrics
+from smartmeeting_common.response_cache import MemoryBackend, SharedBackend, response_cache
+
+
+def test_cached_review_revalidates_with_etag_and_follows_writes():
+    metrics.reset()
+    db = TestingDB()
+    review = crud.create_review(db, "ranim", schemas.ReviewCreate(room_id=801, rating=4, comment="bright room"))
+
+    first = client.get(f"/reviews/{review.id}")
+    assert first.json()["comment"] == "bright room"
+    etag = first.headers["ETag"]
+    again = client.get(f"/reviews/{review.id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert again.status_code == 304 and again.content == b""
+    assert client.get("/reviews/999999").status_code == 404
+
+    page = client.get("/rooms/801/reviews", params={"limit": 1})
+    assert client.get("/rooms/801/reviews", params={"limit": 1}).headers["X-Next-After-Id"] == str(review.id)
+
+    crud.update_review(db, review.id, schemas.ReviewUpdate(comment="dim room"))
+    changed = client.get(f"/reviews/{review.id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert client.get("/rooms/801/reviews", params={"limit": 1}).json()[0]["comment"] == "dim room"
+    assert page.json()[0]["comment"] == "bright room"
+
+    crud.delete_review(db, review.id)
+    assert client.get(f"/reviews/{review.id}").status_code == 404
+    db.close()
+
+    text_metrics = metrics.render()
+    assert 'cache_requests_total{cache="review",result="hit"} 1' in text_metrics
+    assert 'cache_requests_total{cache="room_reviews",result="hit"} 1' in text_metrics
+
+
+@pytest.mark.parametrize("make", [lambda tmp: MemoryBackend(max_size=2), lambda tmp: SharedBackend(str(tmp / "c.db"))])
+def test_cache_backends_expire_and_bump_generations(tmp_path, make):
+    now = [100.0]
+    backend = make(tmp_path)
+    backend.clock = lambda: now[0]
+    backend.set("a", b"1", ttl=10)
+    assert backend.get("a") == b"1"
+    now[0] += 11
+    assert backend.get("a") is None
+    assert backend.generation("room:1") == 0
+    backend.bump("room:1")
+    backend.bump("room:1")
+    assert backend.generation("room:1") == 2
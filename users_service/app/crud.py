@@ -1,19 +1,57 @@
 # users_service/app/crud.py
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from . import models, schemas
-from passlib.context import CryptContext
+from . import hashing, models, schemas
+from smartmeeting_common.pagination import keyset
+from smartmeeting_common.response_cache import response_cache
+from .user_cache import user_cache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def user_tag(username: str) -> str:
+    """Response cache tag of GET /users/{username}."""
+    return f"user:{username}"
 
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.username == username).first()
 
+def get_user_cached(db: Session, username: str) -> Optional[models.User]:
+    """Like get_user_by_username, but served from the user cache when possible."""
+    user = user_cache.get(username)
+    if user is None:
+        user = get_user_by_username(db, username)
+        if user is not None:
+            user = user_cache.put(user)
+    return user
+
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session) -> List[models.User]:
-    return db.query(models.User).all()
+def get_login_credentials(db: Session, username: str):
+    """
+    (username, role, hashed_password) or None.
+
+    Ends the read transaction before returning, so the pooled connection is
+    not held while the password is checked.
+    """
+    user = get_user_by_username(db, username)
+    credentials = (user.username, user.role, user.hashed_password) if user else None
+    db.rollback()
+    return credentials
+
+def find_registration_conflict(db: Session, username: str, email: str) -> Optional[str]:
+    """'username' or 'email' if already taken; releases the connection like above."""
+    conflict = None
+    if get_user_by_username(db, username):
+        conflict = "username"
+    elif get_user_by_email(db, email):
+        conflict = "email"
+    db.rollback()
+    return conflict
+
+def users_query(db: Session, limit: int = None, after_id: int = None):
+    return keyset(db.query(models.User), models.User.id, limit, after_id)
+
+def get_users(db: Session, limit: int = None, after_id: int = None) -> List[models.User]:
+    return users_query(db, limit, after_id).all()
 
 def create_user(db: Session, user: schemas.UserCreate, hashed_password: str) -> models.User:
     db_user = models.User(
@@ -43,22 +81,35 @@ def update_user(db: Session, username: str, update_data: schemas.UserUpdate) ->
         user.hashed_password = update_data.password  # should already be hashed
 
     db.commit()
+    user_cache.invalidate(username)
+    response_cache.invalidate(user_tag(username))
     db.refresh(user)
     return user
 
+def update_password_hash(db: Session, username: str, hashed_password: str) -> None:
+    """Store a rehashed password (cost factor changed since it was set)."""
+    db.query(models.User).filter(models.User.username == username).update(
+        {models.User.hashed_password: hashed_password}
+    )
+    db.commit()
+    user_cache.invalidate(username)
+    response_cache.invalidate(user_tag(username))
+
 def delete_user(db: Session, username: str) -> bool:
     user = get_user_by_username(db, username)
     if not user:
         return False
     db.delete(user)
     db.commit()
+    user_cache.invalidate(username)
+    response_cache.invalidate(user_tag(username))
     return True
 
 
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing.verify_and_update(plain_password, hashed_password)[0]
 
 def authenticate_user(db: Session, username: str, password: str):
     user = get_user(db, username)
@@ -0,0 +1,146 @@
+# users_service/app/hashing.py
+import os
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# "process" runs bcrypt in worker processes, "thread" in a thread pool
+# (bcrypt releases the GIL, so threads also scale across cores)
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "process")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Seconds of hashing work the queue may hold before logins are turned away
+# with 503 (Retry-After: 1). Keep it above the Retry-After: a shorter queue
+# drains while shed clients wait to come back, and the workers sit idle.
+PASSWORD_HASH_MAX_WAIT = float(os.getenv("PASSWORD_HASH_MAX_WAIT", "2"))
+# One bcrypt hash at 12 rounds on one core (0.25-0.35s); each round doubles it
+HASH_SECONDS_AT_12_ROUNDS = 0.3
+
+
+def default_max_pending(workers: int = PASSWORD_HASH_WORKERS, rounds: int = BCRYPT_ROUNDS,
+                        max_wait: float = PASSWORD_HASH_MAX_WAIT) -> int:
+    """Hashes the workers get through in max_wait seconds (6 per worker at 12 rounds)."""
+    per_hash = HASH_SECONDS_AT_12_ROUNDS * 2 ** (rounds - 12)
+    return max(1, workers) * max(1, int(max_wait / per_hash))
+
+
+# Hashes queued or running before new logins are turned away with 503
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASH_MAX_PENDING", str(default_max_pending()))
+)
+
+# Built on first use: with the process pool only the hashing workers need passlib
+_pwd_context = None
+
+
+def password_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        # Hashes with a different cost factor are rehashed on the next login
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
+
+def hash_password(password: str) -> str:
+    return password_context().hash(password)
+
+
+def verify_and_update(password: str, hashed_password: str):
+    """(valid, new_hash); new_hash is None unless the stored hash is outdated."""
+    return password_context().verify_and_update(password, hashed_password)
+
+
+class HashingBusy(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING hashes are already in flight."""
+
+
+class PasswordHasher:
+    """
+    Bounded executor for password hashing.
+
+    Keeps bcrypt off the request threadpool and the event loop. At most
+    max_pending calls may be queued or running; beyond that submit() fails
+    fast with HashingBusy instead of letting a login storm build an
+    unbounded queue.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        pool: str = PASSWORD_HASH_POOL,
+    ):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.pool = pool
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.completed = self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.pool == "thread":
+                        self._executor = ThreadPoolExecutor(self.workers, "password-hash")
+                    else:
+                        # spawn: forking a threaded server can copy held locks into the child
+                        self._executor = ProcessPoolExecutor(
+                            self.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+        return self._executor
+
+    def _release(self, _future):
+        with self._lock:
+            self.completed += 1
+        self._slots.release()
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenExecutor:
+                # A worker process died: start a fresh pool and retry once
+                self.shutdown(wait=False)
+                future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def call(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        return {
+            "pool": self.pool,
+            "workers": self.workers,
+            "rounds": BCRYPT_ROUNDS,
+            "in_flight": self.max_pending - self._slots._value,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+hasher = PasswordHasher()
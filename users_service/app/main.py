@@ -1,22 +1,25 @@
 # users_service/app/main.py
 
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 
-from memory_profiler import profile
-import cProfile
-import pstats
-
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.openapi.utils import get_openapi
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
 import jwt
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from . import models, schemas, crud
-from .database import Base, engine, get_db
+from . import models, schemas, crud, hashing
+from .database import engine, get_db
+from smartmeeting_common.db_pool import pool_stats
+from smartmeeting_common import metrics, profiler
+from smartmeeting_common.pagination import set_next_cursor, stream_ndjson
+from smartmeeting_common.auth import SECRET_KEY, ALGORITHM, decode_token, token_cache
+from smartmeeting_common.response_cache import respond, response_cache
+from .user_cache import user_cache
 
 
 # ------------------------------------------------
@@ -24,6 +27,10 @@ from .database import Base, engine, get_db
 # ------------------------------------------------
 app = FastAPI(title="Users Service - Ranim Tahmoush")
 
+# Per-route request, DB and outbound call metrics, scraped from /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
+
 # For simplicity, allow all origins (you can restrict later)
 origins = ["*"]
 
@@ -35,16 +42,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
+# Schema changes are applied by `python -m app.migrations`, not at import
 
 
 # ------------------------------------------------
 # SECURITY / JWT
 # ------------------------------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-SECRET_KEY = "supersecret_ranim_key"
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 # IMPORTANT: tokenUrl is only used by Users Swagger for /login
@@ -57,12 +60,16 @@ oauth2_scheme = OAuth2PasswordBearer(
 # ------------------------------------------------
 # PASSWORD UTILS
 # ------------------------------------------------
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def run_hashing(fn, *args):
+    """Run a hashing call in the password pool without blocking the event loop."""
+    try:
+        return await hashing.hasher.run(fn, *args)
+    except hashing.HashingBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many password checks in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
 
 
 # ------------------------------------------------
@@ -75,37 +82,13 @@ def create_access_token(data: dict) -> str:
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-# ------------------------------------------------
-# JWT DECODE WITH FULL ERROR HANDLING
-# ------------------------------------------------
-def decode_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        role = payload.get("role")
-
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token: missing subject")
-
-        return username, role
-
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-
-    except jwt.DecodeError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    except Exception:
-        raise HTTPException(status_code=500, detail="Internal server error")
-
-
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> models.User:
     username, role = decode_token(token)
 
-    user = crud.get_user_by_username(db, username)
+    user = crud.get_user_cached(db, username)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
@@ -128,33 +111,43 @@ def home():
 
 
 # REGISTER USER
+# Async so bcrypt runs in the hashing pool; each DB step is a single
+# threadpool hop that returns its connection before the next await.
 @app.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-@profile
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
-    if crud.get_user_by_username(db, user_in.username):
+async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+    conflict = await run_in_threadpool(
+        crud.find_registration_conflict, db, user_in.username, user_in.email
+    )
+    if conflict == "username":
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    if crud.get_user_by_email(db, user_in.email):
+    if conflict == "email":
         raise HTTPException(status_code=400, detail="Email already exists")
 
-    hashed_pw = get_password_hash(user_in.password)
-    db_user = crud.create_user(db, user_in, hashed_password=hashed_pw)
+    hashed_pw = await run_hashing(hashing.hash_password, user_in.password)
+    db_user = await run_in_threadpool(crud.create_user, db, user_in, hashed_pw)
     return db_user
 
 
 # LOGIN
 @app.post("/login", response_model=schemas.Token)
-@profile
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
-    user = crud.get_user_by_username(db, form_data.username)
+    credentials = await run_in_threadpool(crud.get_login_credentials, db, form_data.username)
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    username, role, hashed_password = credentials
+    valid, new_hash = await run_hashing(hashing.verify_and_update, form_data.password, hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    access_token = create_access_token({"sub": user.username, "role": user.role})
+    if new_hash:
+        await run_in_threadpool(crud.update_password_hash, db, username, new_hash)
+
+    access_token = create_access_token({"sub": username, "role": role})
 
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -168,28 +161,41 @@ def get_profile(current_user: models.User = Depends(get_current_user)):
 # ADMIN GET ALL USERS
 @app.get("/admin/users", response_model=List[schemas.UserOut])
 def admin_list_users(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    stream: bool = False,
     admin: models.User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
-    return crud.get_users(db)
+    if stream:
+        return stream_ndjson(db, lambda s: crud.users_query(s, after_id=after_id), schemas.UserOut)
+
+    users = crud.get_users(db, limit, after_id)
+    set_next_cursor(response, users, limit)
+    return users
 
 
 # GET USER BY USERNAME
 @app.get("/users/{username}", response_model=schemas.UserOut)
 def get_user(
     username: str,
+    request: Request,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = crud.get_user_by_username(db, username)
-    if not user:
+    entry = response_cache.load(
+        "user", crud.user_tag(username), "", lambda: crud.get_user_cached(db, username), schemas.UserOut
+    )
+    if entry is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return respond(request, entry)
 
 
 # UPDATE USER
+# Async like /register: a new password is hashed in the hashing pool
 @app.put("/users/{username}", response_model=schemas.UserOut)
-def update_user(
+async def update_user(
     username: str,
     update_data: schemas.UserUpdate,
     current_user: models.User = Depends(get_current_user),
@@ -199,9 +205,9 @@ def update_user(
         raise HTTPException(status_code=403, detail="Not allowed")
 
     if update_data.password:
-        update_data.password = get_password_hash(update_data.password)
+        update_data.password = await run_hashing(hashing.hash_password, update_data.password)
 
-    user = crud.update_user(db, username, update_data)
+    user = await run_in_threadpool(crud.update_user, db, username, update_data)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -220,6 +226,30 @@ def delete_user(
     return {"message": f"User '{username}' deleted"}
 
 
+@app.on_event("shutdown")
+def shutdown_event():
+    hashing.hasher.shutdown()
+
+
+# ------------------------------------------------
+# ON-DEMAND PROFILER (admin)
+# ------------------------------------------------
+@app.post("/admin/profile", response_class=PlainTextResponse)
+def admin_profile(
+    mode: str = Query("cpu", pattern="^(cpu|alloc)$"),
+    seconds: float = Query(10, gt=0, le=profiler.PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    admin: models.User = Depends(require_admin),
+):
+    """Profile this worker for `seconds`; folded stacks for flamegraph.pl / speedscope."""
+    try:
+        if mode == "alloc":
+            return profiler.sample_alloc(seconds)
+        return profiler.sample_cpu(seconds, interval_ms)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 # ------------------------------------------------
 # CUSTOM OPENAPI
 # ------------------------------------------------
@@ -250,4 +280,17 @@ app.openapi = custom_openapi
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "users_service"}
+    return {
+        "status": "ok",
+        "service": "users_service",
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "password_hashing": hashing.hasher.stats(),
+    }
+
+
+@app.get("/health/pool")
+def health_pool():
+    """Connection pool occupancy and checkout wait histogram."""
+    return dict(pool_stats(engine), service="users_service")
@@ -0,0 +1,26 @@
+# users_service/app/migrations.py
+"""Schema steps for users_service, applied in order by python -m app.migrations."""
+from . import models  # noqa: F401  (registers the tables on Base)
+from .database import Base
+
+
+SERVICE = "users_service"
+
+
+def create_tables(engine):
+    Base.metadata.create_all(bind=engine)
+
+
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from smartmeeting_common import migrate
+
+    from .database import engine
+
+    migrate.main(engine, sys.modules[__name__])
@@ -0,0 +1,88 @@
+# users_service/app/user_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from . import models
+
+
+# Short by default: other workers' updates are only seen after expiry
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))  # 0 disables the cache
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+_COLUMNS = [c.name for c in models.User.__table__.columns]
+
+
+def snapshot(user: models.User) -> models.User:
+    """Detached copy of a user row that never touches a session again."""
+    return models.User(**{name: getattr(user, name) for name in _COLUMNS})
+
+
+class UserCache:
+    """
+    LRU + TTL cache of user rows by username.
+
+    Holds transient snapshots rather than session-bound instances, so cached
+    users can be returned from any request. Writes in this process invalidate
+    the entry through crud; only existing users are cached.
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, username: str):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(username)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[username]
+            self.misses += 1
+            return None
+
+    def put(self, user: models.User) -> models.User:
+        if not self.enabled:
+            return user
+        user = snapshot(user)
+        with self._lock:
+            self._entries[user.username] = (self.clock() + self.ttl, user)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, username: str = None):
+        """Drop one user, or everything when username is None."""
+        with self._lock:
+            self.invalidations += 1
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = UserCache()
@@ -0,0 +1,74 @@
+# users_service/benchmarks/bench_auth.py
+"""
+Per-request authentication overhead: token verification with and without
+the verified-token cache, and GET /me / GET /users/{username} with and
+without the user-record cache.
+
+Run from users_service/:  python -m benchmarks.bench_auth
+"""
+import argparse
+import os
+import tempfile
+import time
+import timeit
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench_auth.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main, models  # noqa: E402
+from smartmeeting_common.auth import TokenCache, decode_token, verify_token  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+
+
+def per_call(fn, n):
+    return min(timeit.repeat(fn, number=n, repeat=5)) / n * 1e6
+
+
+def bench_decode(n):
+    token = main.create_access_token({"sub": "benchuser", "role": "regular"})
+    cache = TokenCache()
+    decode_token(token, cache)
+
+    print(f"verify (no cache)  {per_call(lambda: verify_token(token), n):7.2f} us/call")
+    print(f"decode (cached)    {per_call(lambda: decode_token(token, cache), n):7.2f} us/call")
+
+
+def bench_routes(n, user_cache_enabled):
+    main.user_cache.invalidate()
+    main.user_cache.ttl = 30 if user_cache_enabled else 0
+    client = TestClient(main.app)
+    token = main.create_access_token({"sub": "benchuser", "role": "regular"})
+    headers = {"Authorization": f"Bearer {token}"}
+    label = "user cache on " if user_cache_enabled else "user cache off"
+
+    for path in ("/me", "/users/benchuser"):
+        client.get(path, headers=headers)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            assert client.get(path, headers=headers).status_code == 200
+        elapsed = (time.perf_counter() - t0) / n * 1e6
+        print(f"{label}  GET {path:<16} {elapsed:8.1f} us/request")
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    db.add(models.User(name="Bench", username="benchuser", email="bench@example.com",
+                       hashed_password="x", role="regular"))
+    db.commit()
+    db.close()
+
+    bench_decode(args.n * 10)
+    for enabled in (False, True):
+        bench_routes(args.n, enabled)
+    print("token cache:", main.token_cache.stats())
+    print("user cache: ", main.user_cache.stats())
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,181 @@
+# users_service/benchmarks/bench_login_storm.py
+"""
+Login storm: many concurrent POST /login against a uvicorn server, while a
+probe measures GET /health latency on the same server. A login shed with
+503 is retried after its Retry-After, and its latency includes the wait.
+
+"before" serves the previous handler (sync route, bcrypt on the request
+threadpool); "after" serves app.main with the password hashing pool.
+
+Run from users_service/:  python -m benchmarks.bench_login_storm --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_login_storm.db")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from fastapi.security import OAuth2PasswordRequestForm  # noqa: E402
+from passlib.context import CryptContext  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import crud, hashing, models  # noqa: E402
+from app.database import Base, SessionLocal, engine, get_db  # noqa: E402
+
+
+# ------------------------------------------------
+# PREVIOUS HANDLER
+# ------------------------------------------------
+legacy_app = FastAPI()
+legacy_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=int(os.getenv("BCRYPT_ROUNDS", "12"))
+)
+
+
+@legacy_app.post("/login")
+def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = crud.get_user_by_username(db, form_data.username)
+    if not user or not legacy_context.verify(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    return {"access_token": "x", "token_type": "bearer"}
+
+
+@legacy_app.get("/health")
+def legacy_health():
+    return {"status": "ok"}
+
+
+# ------------------------------------------------
+# HARNESS
+# ------------------------------------------------
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(target, env):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ, **env),
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/health")
+            break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    return proc, url
+
+
+async def storm(url, total, concurrency):
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    latencies, probes, statuses = [], [], {}
+    counter = iter(range(total))
+    done = asyncio.Event()
+    form = {"username": "stormuser", "password": "secret123"}
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        async def worker():
+            for _ in counter:
+                t0 = time.perf_counter()
+                while True:
+                    response = await client.post("/login", data=form)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    if response.status_code != 503:
+                        break
+                    # Shed: come back when told to, as a well-behaved client would
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                latencies.append(time.perf_counter() - t0)
+
+        async def probe():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await client.get("/health")
+                probes.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.05)
+
+        # Warm-up (first login also starts the hashing pool)
+        await client.post("/login", data=form)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "logins_per_s": statuses.get(200, 0) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "statuses": statuses,
+        "health_p99": percentile(probes, 0.99) * 1000 if probes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--requests", type=int, default=400)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-pending", type=int)
+    parser.add_argument("--pool", choices=["process", "thread"], default="thread")
+    args = parser.parse_args()
+
+    env = {
+        "BCRYPT_ROUNDS": str(args.rounds),
+        "PASSWORD_HASH_POOL": args.pool,
+        "PASSWORD_HASH_WORKERS": str(args.workers),
+    }
+    os.environ.update(env)
+    env["PASSWORD_HASH_MAX_PENDING"] = str(
+        args.max_pending or hashing.default_max_pending(args.workers, args.rounds)
+    )
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds)
+    db.add(models.User(name="Storm", username="stormuser", email="storm@example.com",
+                       hashed_password=context.hash("secret123"), role="regular"))
+    db.commit()
+    db.close()
+
+    print(f"rounds={args.rounds} pool={args.pool} workers={args.workers} max_pending={env['PASSWORD_HASH_MAX_PENDING']} "
+          f"n={args.requests} c={args.concurrency}")
+    for label, target in (
+        ("before", "benchmarks.bench_login_storm:legacy_app"),
+        ("after", "app.main:app"),
+    ):
+        proc, url = serve(target, env)
+        try:
+            r = asyncio.run(storm(url, args.requests, args.concurrency))
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(
+            f"{label:<7} logins/s={r['logins_per_s']:7.1f} "
+            f"p50={r['p50']:8.1f}ms p99={r['p99']:8.1f}ms "
+            f"health_p99={r['health_p99']:7.1f}ms statuses={r['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
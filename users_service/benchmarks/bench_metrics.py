@@ -0,0 +1,132 @@
+# users_service/benchmarks/bench_metrics.py
+"""
+Cost of the metrics instrumentation:
+
+1. per request: a bare ASGI app called directly, alone / behind
+   MetricsMiddleware / behind an equivalent BaseHTTPMiddleware
+2. per SQL statement: SELECT 1 with and without the cursor event listeners
+3. end to end: GET /health through the real app with and without the middleware
+
+Run from users_service/:  python -m benchmarks.bench_metrics [-n 20000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench_metrics.db"
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from smartmeeting_common import metrics  # noqa: E402
+
+
+class Route:
+    path = "/bench/{id}"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def scope():
+    return {"type": "http", "method": "GET", "path": "/bench/1", "headers": [], "query_string": b""}
+
+
+def bench_asgi(n):
+    async def base_metrics(request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        metrics._record(request.method, Route.path, response.status_code, time.perf_counter() - start, metrics._RequestDB())
+        return response
+
+    async def run(app):
+        for _ in range(200):
+            await app(scope(), receive, send)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await app(scope(), receive, send)
+        return (time.perf_counter() - t0) / n * 1e6
+
+    results = {}
+    for name, app in (
+        ("bare ASGI app", bare_app),
+        ("MetricsMiddleware", metrics.MetricsMiddleware(bare_app)),
+        ("BaseHTTPMiddleware", BaseHTTPMiddleware(bare_app, dispatch=base_metrics)),
+    ):
+        results[name] = min(asyncio.run(run(app)) for _ in range(3))
+    base = results["bare ASGI app"]
+    for name, us in results.items():
+        extra = "" if name == "bare ASGI app" else f"  (+{us - base:.2f} us)"
+        print(f"{name:<20} {us:7.2f} us/request{extra}")
+
+
+def bench_queries(n):
+    engine = create_engine(os.environ["DATABASE_URL"])
+    token = metrics._current_request.set(metrics._RequestDB())
+
+    def run():
+        with engine.connect() as conn:
+            t0 = time.perf_counter()
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+            return (time.perf_counter() - t0) / n * 1e6
+
+    with_listeners = min(run() for _ in range(3))
+    event.remove(Engine, "before_cursor_execute", metrics._before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", metrics._after_cursor_execute)
+    # A new engine, so no listeners are cached on its dispatch
+    engine = create_engine(os.environ["DATABASE_URL"])
+    without = min(run() for _ in range(3))
+    event.listen(Engine, "before_cursor_execute", metrics._before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", metrics._after_cursor_execute)
+    metrics._current_request.reset(token)
+    print(f"SELECT 1             {without:7.2f} us/query, with listeners {with_listeners:7.2f} us (+{with_listeners - without:.2f} us)")
+
+
+def bench_app(n):
+    from fastapi.testclient import TestClient
+    from app import main
+
+    def run(app):
+        with TestClient(app) as client:
+            for _ in range(200):
+                client.get("/health")
+            t0 = time.perf_counter()
+            for _ in range(n):
+                client.get("/health")
+            return (time.perf_counter() - t0) / n * 1e6
+
+    with_metrics = min(run(main.app) for _ in range(3))
+    main.app.user_middleware = [m for m in main.app.user_middleware if m.cls is not metrics.MetricsMiddleware]
+    main.app.middleware_stack = None
+    without = min(run(main.app) for _ in range(3))
+    print(f"GET /health (TestClient) {without:7.1f} us, with metrics {with_metrics:7.1f} us (+{with_metrics - without:.1f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    args = parser.parse_args()
+
+    bench_asgi(args.n)
+    bench_queries(args.n)
+    bench_app(max(1, args.n // 10))
+
+
+if __name__ == "__main__":
+    main()
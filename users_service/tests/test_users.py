@@ -68,3 +68,188 @@ def test_login_wrong_password():
         data={"username": "ranim", "password": "wrongpass"}
     )
     assert response.status_code == 401
+
+
+# ------------------------------------------------
+# KEYSET PAGINATION / NDJSON STREAMING
+# ------------------------------------------------
+import json
+import jwt
+from app import models
+from app.main import SECRET_KEY
+
+
+def _ensure_user(db, username, role="regular"):
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if not user:
+        user = models.User(name=username, username=username, email=f"{username}@example.com",
+                           hashed_password="x", role=role)
+        db.add(user)
+        db.commit()
+    return user
+
+
+def _headers(username, role):
+    token = jwt.encode({"sub": username, "role": role}, SECRET_KEY, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_admin_list_users_pagination_and_stream():
+    db = TestingSessionLocal()
+    _ensure_user(db, "pageadmin", role="admin")
+    for i in range(3):
+        _ensure_user(db, f"pageuser{i}")
+    total = db.query(models.User).count()
+    db.close()
+
+    headers = _headers("pageadmin", "admin")
+    first = client.get("/admin/users", params={"limit": 2}, headers=headers)
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+
+    rest = client.get(
+        "/admin/users", params={"after_id": first.headers["X-Next-After-Id"]}, headers=headers
+    )
+    assert len(first.json()) + len(rest.json()) == total
+
+    streamed = client.get("/admin/users", params={"stream": True}, headers=headers)
+    assert len([json.loads(line) for line in streamed.text.splitlines()]) == total
+
+
+# ------------------------------------------------
+# TOKEN / USER CACHES
+# ------------------------------------------------
+from fastapi import HTTPException
+from smartmeeting_common.auth import TokenCache, decode_token
+from app.user_cache import user_cache
+
+
+def test_token_cache_expires_with_token():
+    now = [1000.0]
+    cache = TokenCache(max_size=10, ttl=300, clock=lambda: now[0])
+    key = cache.key("some.token")
+
+    cache.put(key, {"exp": 1010}, "cacheduser", "regular")
+    assert cache.get(key) == ("cacheduser", "regular")
+    now[0] = 1010.0
+    assert cache.get(key) is None
+
+    # Valid tokens are verified once, forged ones are rejected every time
+    cache = TokenCache(max_size=10)
+    token = jwt.encode({"sub": "cacheduser", "role": "regular"}, SECRET_KEY, algorithm="HS256")
+    assert decode_token(token, cache) == ("cacheduser", "regular")
+    assert decode_token(token, cache) == ("cacheduser", "regular")
+    assert cache.stats()["hits"] == 1
+
+    forged = jwt.encode({"sub": "cacheduser", "role": "admin"}, "not-the-key", algorithm="HS256")
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            decode_token(forged, cache)
+
+
+def test_user_cache_invalidated_on_update_and_delete():
+    db = TestingSessionLocal()
+    _ensure_user(db, "cacheadmin", role="admin")
+    _ensure_user(db, "cachetarget")
+    db.close()
+    user_cache.invalidate()
+
+    headers = _headers("cachetarget", "regular")
+    assert client.get("/me", headers=headers).json()["name"] == "cachetarget"
+    hits = user_cache.stats()["hits"]
+    assert client.get("/users/cachetarget", headers=headers).status_code == 200
+    assert user_cache.stats()["hits"] > hits
+
+    client.put("/users/cachetarget", json={"name": "Renamed"}, headers=headers)
+    assert client.get("/me", headers=headers).json()["name"] == "Renamed"
+
+    client.delete("/users/cachetarget", headers=_headers("cacheadmin", "admin"))
+    assert client.get("/me", headers=headers).status_code == 401
+
+
+# ------------------------------------------------
+# PASSWORD HASHING POOL
+# ------------------------------------------------
+import threading
+from passlib.context import CryptContext
+from app import hashing
+
+
+def test_login_rehashes_outdated_password():
+    db = TestingSessionLocal()
+    user = _ensure_user(db, "rehashuser")
+    cheap = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    user.hashed_password = cheap.hash("secret123")
+    db.commit()
+    db.close()
+
+    response = client.post("/login", data={"username": "rehashuser", "password": "secret123"})
+    assert response.status_code == 200
+
+    db = TestingSessionLocal()
+    stored = db.query(models.User).filter(models.User.username == "rehashuser").first().hashed_password
+    db.close()
+    assert stored.startswith(f"$2b${hashing.BCRYPT_ROUNDS:02d}$")
+    assert hashing.password_context().verify("secret123", stored)
+
+
+def test_password_hasher_backpressure(monkeypatch):
+    db = TestingSessionLocal()
+    _ensure_user(db, "rehashuser")
+    db.close()
+
+    release = threading.Event()
+    busy = hashing.PasswordHasher(workers=1, max_pending=1, pool="thread")
+    blocked = busy.submit(release.wait)
+    with pytest.raises(hashing.HashingBusy):
+        busy.submit(release.wait)
+
+    monkeypatch.setattr(hashing, "hasher", busy)
+    response = client.post("/login", data={"username": "rehashuser", "password": "secret123"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    # A password change is shed the same way
+    response = client.put("/users/rehashuser", json={"password": "newsecret123"}, headers=_headers("rehashuser", "regular"))
+    assert response.status_code == 503
+
+    release.set()
+    blocked.result()
+    busy.shutdown()
+    assert busy.stats()["rejected"] == 3
+
+
+def test_hash_queue_bound_scales_with_bcrypt_cost():
+    # Two seconds of work per worker: a few slow hashes, many cheap ones
+    assert hashing.default_max_pending(workers=1, rounds=12, max_wait=2) == 6
+    assert hashing.default_max_pending(workers=4, rounds=12, max_wait=2) == 24
+    assert hashing.default_max_pending(workers=1, rounds=8, max_wait=2) == 106
+    assert hashing.default_max_pending(workers=1, rounds=16, max_wait=2) == 1
+
+
+def test_pool_stats_record_checkout_waits_and_timeouts(tmp_path):
+    from sqlalchemy import exc
+    from smartmeeting_common import db_pool
+
+    class Pool(db_pool.TimedQueuePool):
+        metrics = db_pool.PoolMetrics()
+
+    url = f"sqlite:///{tmp_path}/pool.db"
+    options = dict(db_pool.engine_options(url), poolclass=Pool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    pool_engine = create_engine(url, **options)
+
+    held = pool_engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool_engine.connect()
+    stats = db_pool.pool_stats(pool_engine)
+    assert stats["checked_out"] == 1 and stats["overflow"] == 0
+    assert stats["checkouts"] == 2 and stats["timeouts"] == 1
+    assert stats["wait_histogram"]["le_100ms"] == 1  # the 50 ms timeout
+
+    held.close()
+    assert db_pool.pool_stats(pool_engine)["checked_in"] == 1
+    pool_engine.dispose()
+
+    response = client.get("/health/pool")
+    assert response.status_code == 200
+    assert response.json()["pool"] == "TimedQueuePool"